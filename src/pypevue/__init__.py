@@ -352,13 +352,16 @@ class Cylinder:
 
 #==========5==========Layout===========================
 class Layout:
-    def __init__(self, BP=Point(0,0,0), OP=Point(0,0,0),
-                 posts=[], cyls=[],  edgeList={}):
-        self.BP = BP  # Current basepoint value
-        self.OP = OP  # Origin point of net
-        self.posts = posts
-        self.cyls  = cyls
-        self.edgeList = edgeList
+    def __init__(self, BP=None, OP=None, posts=None, cyls=None, edgeList=None):
+        # Defaults are made anew for each layout, since layouts get
+        # changed in place (eg, OP gets scaled)
+        self.BP = Point(0,0,0) if BP is None else BP  # Current basepoint value
+        self.OP = Point(0,0,0) if OP is None else OP  # Origin point of net
+        self.posts = [] if posts is None else posts
+        self.cyls  = [] if cyls is None else cyls
+        self.edgeList = {} if edgeList is None else edgeList
+        self.instances = []  # 3x4 affine matrices of copies, if any
+        self.faces = None    # Lists of post numbers around faces, if known
     def get4(self):
         return  self.BP, self.OP, self.posts, self.cyls
     def __str__( self):
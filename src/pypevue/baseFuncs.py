@@ -5,10 +5,18 @@ supports visualization of arrangements of edges in geodesic dome
 structures. -- jiw March 2020...'''
 
 from sys import argv, exit, exc_info, stderr
-import datetime
-from math import sqrt, cos, sin, asin, atan2, pi, radians, degrees
+import datetime, os, gc, io
+from contextlib import contextmanager
+from math import sqrt, cos, sin, asin, atan2, pi, radians, degrees, ceil, floor
+from itertools import repeat, accumulate
+from operator import add
 from pypevue import ssq, sssq, rotate2, isTrue
 from pypevue import Point, Post, Cylinder, Layout, FunctionList
+from pypevue.workers import mapRanges
+from pypevue.struts import strutLengths, strutClasses, valenceCounts, cutListText
+from pypevue.spool import CylSpool
+from pypevue.pointFile import readPoints
+from pypevue.halfEdge import layoutMesh, dualPoints, dualStruts, dualFaces
 
 #---------------------------------------------------------
 def arithmetic(line, xTrace):
@@ -43,6 +51,28 @@ def thickLet(thix):
         expo = max(0, ord(thix)-ord('q'))
         return round(ref.SF * ref.qDiam * pow(ref.dRatio, expo), 2)
 
+def layoutExtent(layout):
+    '''Return length of the diagonal of the box around layout's posts'''
+    feet = [p.foot for p in layout.posts]
+    if not feet: return 0
+    xs, ys, zs = [f.x for f in feet], [f.y for f in feet], [f.z for f in feet]
+    return sssq(max(xs)-min(xs), max(ys)-min(ys), max(zs)-min(zs))
+
+def lodSegments(diam):
+    '''Return number of facets ($fn) for a cylinder of diameter diam in
+    draft output.  A facet is about lodRes times the layout extent
+    wide, so a cylinder gets facets in proportion to its size on
+    screen when the whole layout is in view.  Count is kept between
+    lodFacets and cylSegments, except that struts thinner than lodThin
+    become lodPrism-sided prisms.    '''
+    ref = FunctionList
+    if diam < ref.lodThin:
+        return ref.lodPrism
+    if ref.lodExtent <= 0:
+        return ref.cylSegments
+    facets = ceil(pi*diam/(ref.lodRes*ref.lodExtent))
+    return max(ref.lodFacets, min(ref.cylSegments, facets))
+
 def addEdge(v,w, layout):
     if v in layout.edgeList:
         if w not in layout.edgeList[v]:
@@ -54,6 +84,104 @@ def addEdges(v,w, layout):
     ref = FunctionList
     ref.addEdge(v,w,layout); ref.addEdge(w,v,layout)
 #---------------------------------------------------------
+@contextmanager
+def gcPaused():
+    '''Turn off cyclic garbage collection for a with block.  Making a
+    great many objects otherwise triggers repeated collections that
+    each scan all of the objects made so far.'''
+    on = gc.isenabled()
+    gc.disable()
+    try:  yield
+    finally:
+        if on:  gc.enable()
+
+def flatOrTuples(items):
+    '''Return items (eg a list, a flat array, or a NumPy array, via its
+    tolist method) as a list or tuple'''
+    if hasattr(items, 'tolist'):  items = items.tolist()
+    return items if isinstance(items, (list, tuple)) else list(items)
+
+def addPosts(points, relative=True):
+    '''Add posts at points, in bulk, and return the number of the first
+    added post.  points is a flat sequence of x,y,z numbers, or a
+    sequence of points with x,y,z attributes, or of x,y,z triples; eg
+    a list, an array.array('d'), or a NumPy array of shape (n,3) or
+    (3n,).  If relative is true, locations are relative to the base
+    point BP, as with layout code C.    '''
+    ref = FunctionList
+    LO = ref.LO;  p0 = len(LO.posts)
+    pts = flatOrTuples(points)
+    if not pts: return p0
+    B = LO.BP if relative else Point(0,0,0)
+    bx, by, bz = B.x, B.y, B.z
+    with gcPaused():
+        if isinstance(pts[0], (int, float)):    # Flat list of numbers
+            n = len(pts) - len(pts)%3
+            if n < len(pts):
+                print (f'Anomaly: addPosts has {pts[n:]} left over')
+            xs, ys, zs = (map(add, pts[k:n:3], repeat(b)) for k, b in ((0,bx), (1,by), (2,bz)))
+            LO.posts.extend(map(Post, map(Point, xs, ys, zs)))
+        elif hasattr(pts[0], 'x'):
+            LO.posts.extend([Post(Point(p.x+bx, p.y+by, p.z+bz)) for p in pts])
+        else:
+            LO.posts.extend([Post(Point(x+bx, y+by, z+bz)) for x, y, z in pts])
+    return p0
+
+def addCylinders(pairs, colo='G', thix='p', lev1='c', lev2='c', offset=0):
+    '''Add cylinders, in bulk, of color colo and thickness thix from
+    level lev1 to lev2, between posts given by pairs, and add their
+    edges.  pairs is a flat sequence of post numbers (2 per cylinder)
+    or a sequence of (j,k) pairs, as for addPosts; offset is added to
+    each post number.  Returns number of the first added cylinder.'''
+    ref = FunctionList
+    LO = ref.LO;  c0 = len(LO.cyls)
+    ps = flatOrTuples(pairs)
+    if ps and isinstance(ps[0], (int, float)):
+        if len(ps)%2:
+            print (f'Anomaly: addCylinders has {ps[-1:]} left over')
+        ps = zip(ps[0::2], ps[1::2])
+    diam, gap = ref.thickLet(thix), ref.endGap
+    cyls = []
+    with gcPaused():
+        for n, (j, k) in enumerate(ps, c0):
+            j, k = int(j)+offset, int(k)+offset
+            cyls.append(Cylinder(j, k, lev1, lev2, colo, diam, gap, 0, n))
+            ref.addEdges(j, k, LO)
+        LO.cyls.extend(cyls)
+    return c0
+#---------------------------------------------------------
+# Instancing: layout codes A, M, Q record copies of the whole layout
+# as 3x4 affine matrices [[a,b,c,tx], [d,e,f,ty], [g,h,i,tz]] in
+# LO.instances, rather than as more posts and cylinders.  Output
+# makes the layout once, as a module, and places each copy of it via
+# multmatrix; see instanceCode.
+def affineMul(A, B):
+    '''Return 3x4 affine matrix for transform A applied after B'''
+    return [[sum(A[i][k]*B[k][j] for k in range(3)) + (A[i][3] if j==3 else 0)
+             for j in range(4)] for i in range(3)]
+
+def aboutPoint(M, P):
+    '''Return 3x4 matrix for linear transform M (3x3) about point P'''
+    t = [P.x, P.y, P.z]
+    return [M[i] + [t[i] - sum(M[i][k]*t[k] for k in range(3))] for i in range(3)]
+
+def addInstances(mats):
+    '''Replace LO.instances by all products m*I, for m in mats and I in
+    current instances (or the identity, if there are none yet)'''
+    ref = FunctionList
+    eye = [[1,0,0,0], [0,1,0,0], [0,0,1,0]]
+    old = ref.LO.instances or [eye]
+    ref.LO.instances = [affineMul(m, I) for m in mats for I in old]
+
+def instanceCode(instances, SF):
+    '''Return OpenSCAD code placing module makeInstance once per matrix
+    in instances; translations get scaled by SF.'''
+    out = []
+    for m in instances:
+        rows = ', '.join('[' + ', '.join(f'{round(u, 6)}' for u in r[:3] + [SF*r[3]]) + ']' for r in m)
+        out.append(f'multmatrix([{rows}, [0, 0, 0, 1]]) makeInstance();\n')
+    return ''.join(out)
+#---------------------------------------------------------
 def generatePosts(code, numberTexts, func):
     '''Modify layout LO according to provided code and numbers'''
     ref = FunctionList
@@ -74,8 +202,20 @@ def generatePosts(code, numberTexts, func):
             return None
         return nums
 
-    def postAt(x,y,z): ref.LO.posts.append(Post(Point(x,y,z)))
+    def postsAt(xs, ys, zs):    # Add posts at x,y,z values, in bulk
+        with gcPaused():
+            ref.LO.posts.extend(map(Post, map(Point, xs, ys, zs)))
     
+    if code=='A':               # Array: n copies, each offset dx,dy,dz
+        nums = getNums(4,4)     # Need exactly 4 numbers
+        if nums:
+            n, dx, dy, dz = int(nums[0]), nums[1], nums[2], nums[3]
+            if n < 1:
+                print (f'Anomaly: code {code}, {numberTexts} has bad count')
+                return
+            addInstances([[[1,0,0,k*dx], [0,1,0,k*dy], [0,0,1,k*dz]] for k in range(n)])
+        return
+
     if code=='B':               # Set base point, BP
         nums = getNums(3,3)     # Need exactly 3 numbers
         if nums:   ref.LO.BP = Point(*nums);  return
@@ -83,13 +223,49 @@ def generatePosts(code, numberTexts, func):
     if code=='C':               # Create a collection of posts
         nums = getNums(3,Lots) # Need at least 3 numbers
         if nums:
-            while len(nums) >= 3:
-                postAt(nums[0]+bx,  nums[1]+by, nums[2]+bz)
-                nums = nums[3:]
-            if len(nums)>0:
-                print (f'Anomaly: code {code}, {numberTexts} has {nums} left over')
+            n = len(nums) - len(nums)%3
+            ref.addPosts(nums[:n])
+            if n < len(nums):
+                print (f'Anomaly: code {code}, {numberTexts} has {nums[n:]} left over')
             return
 
+    if code=='F':               # Import posts from a file of x,y,z values
+        try:
+            pts = readPoints(func)
+        except (OSError, ValueError, SyntaxError, KeyError) as e:
+            print (f'Anomaly: code {code} {func}: {e}')
+            return
+        ref.addPosts(pts)       # Relative to BP, as in code C
+        return
+
+    if code=='V':               # Make dual: posts at centers of faces
+        nums = getNums(0,1)     # Optional keep flag
+        if nums is None: return
+        LO = ref.LO
+        try:
+            mesh, points = layoutMesh(LO)
+        except ValueError as e:
+            print (f'Anomaly: code {code} needs a layout of oriented triangles; {e}')
+            return
+        OP = LO.OP
+        coords = dualPoints(mesh, points, (OP.x, OP.y, OP.z))
+        struts = dualStruts(mesh)
+        if not (nums and nums[0]):  # Replace layout with its dual
+            LO.posts, LO.edgeList, LO.faces = [], {}, []
+            LO.cyls = CylSpool() if isinstance(LO.cyls, CylSpool) else []
+        p0 = ref.addPosts(coords, relative=False)
+        # Record faces, for topoCheck and V; triangles needn't be recorded
+        LO.faces = (LO.faces or []) + [[p0+f for f in fs] for fs in dualFaces(mesh)]
+        # Color struts on pentagons (around valence-5 hubs) like G does
+        val = {}
+        for f, g, u, v in struts:
+            for w in (u, v):
+                if w not in val:  val[w] = mesh.valence(w)
+        pent, other = ref.geoColors[0], ref.geoColors[1]
+        ref.addCylinders([(f, g) for f, g, u, v in struts if 5 in (val[u], val[v])], colo=pent, offset=p0)
+        ref.addCylinders([(f, g) for f, g, u, v in struts if 5 not in (val[u], val[v])], colo=other, offset=p0)
+        return
+
     if code=='D':      # Remove specified posts and references to them
         nums = getNums(1,Lots)     # Accept 1 or more numbers
         if not nums: return
@@ -116,13 +292,18 @@ def generatePosts(code, numberTexts, func):
         # We've deleted some posts; install into layout
         del lopo;  ref.LO.posts = polout[:nout]
         # Remove obsolete post numbers from cylinders list
-        locy = ref.LO.cyls;   cylout = []
+        locy = ref.LO.cyls
+        cylout = CylSpool() if isinstance(locy, CylSpool) else []
         for c in locy:
             if not(c.post1 in nums or c.post2 in nums):
                 c.post1 = transi[c.post1]
                 c.post2 = transi[c.post2]
                 cylout.append(c)
+        if isinstance(locy, CylSpool):  locy.close()
         del locy;  ref.LO.cyls = cylout
+        if ref.LO.faces:        # Renumber faces; drop those of deleted posts
+            ref.LO.faces = [[transi[v] for v in vs] for vs in ref.LO.faces
+                            if all(transi.get(v, ninf) < ninf for v in vs)]
         # If we wanted autoAdder to work ok after a D operation, at this
         # point we would clean up LO.edgeList.  But maybe we don't care...
         return
@@ -138,46 +319,63 @@ def generatePosts(code, numberTexts, func):
         pairs = [(int(x),int(y)) for x,y in zip(nums[::2],nums[1::2])]
         print (f'To remove: {pairs}')
         pairs = [edgecode(x,y) for x,y in pairs]
-        drops = [];   locy = ref.LO.cyls
-        for k in range(len(locy)):
-            c = locy[k]
+        # Copy the kept cylinders, to a new spool if cyls are spooled
+        locy = ref.LO.cyls;   ndrop = 0
+        cylout = CylSpool() if isinstance(locy, CylSpool) else []
+        for c in locy:
             if edgecode(c.post1, c.post2) in pairs:
-                drops.append(k)
-        if drops:
-            drops.reverse()
-            for k in drops: del locy[k]
+                ndrop += 1
+            else:
+                cylout.append(c)
+        if ndrop:
+            if isinstance(locy, CylSpool):  locy.close()
+            ref.LO.cyls = cylout
         else:
+            if isinstance(cylout, CylSpool):  cylout.close()
             print (f'=  Error: None of edges {nums} found')
         return
         
     if code=='G':               # Create geodesic posts and cylinders
-        from pypevue.makeIcosaGeo import genIcosahedron
+        from pypevue.makeIcosaGeo import cachedIcosahedron
         nums = getNums(2,2)     # Need exactly 2 numbers
         if not nums: return
         geoFreq, geoScale = int(round(nums[0])), nums[1]
         elo = Layout(posts=[], cyls=[],  edgeList={}) # Init an empty layout
         rlo = ref.LO
         # Rotation in following is not yet as advertised -- ie is normalizer not opt
-        genIcosahedron(elo, geoFreq, rlo.clip1, rlo.clip2, rlo.rotavec.y, rlo.rotavec.z)
+        cachedIcosahedron(elo, geoFreq, rlo.clip1, rlo.clip2, rlo.rotavec.y, rlo.rotavec.z)
         epo = elo.posts;  eel = elo.edgeList;  nLoPo = len(rlo.posts)
         # Scale the generated posts by given scale; and copy to LO
         for p in epo:
             p.scale(geoScale)
             rlo.posts.append(Post(p))
-        # Generate sets of cylinders in various colors.
-        colorTrans = {'Y':ref.geoColors[0], 'B':ref.geoColors[1], 'R':ref.geoColors[2], 'C':ref.geoColors[3] }
-        for co in ('Y', 'B', 'R', 'C'):
-            for j in sorted(eel.keys()):
-                for k in sorted(eel[j]):
-                    if j<k:   # Both of j,k and k,j are in the list
-                        p, q = epo[j], epo[k]
-                        oB = p.rank == q.rank
-                        oY = p.nnbrs==5 or q.nnbrs==5
-                        oC = p.dupl>1 and q.dupl>1 and not (oB or oY)
-                        oR = not (oB or oY or oC)
-                        if (co=='B' and oB and not oY) or (co=='Y' and oY) or (co=='R' and oR) or (co=='C' and oC):
-                            cyl = Cylinder(j+nLoPo,k+nLoPo, 'c', 'c', colorTrans[co], 'p', ref.endGap, 0, 0)
-                            rlo.cyls.append(cyl)
+        # Classify each edge once, into the color for its kind of
+        # strut; then make cylinders color by color
+        edges = [(j,k) for j in sorted(eel.keys()) for k in sorted(eel[j]) if j<k]
+        ends1, ends2 = [j for j,k in edges], [k for j,k in edges]
+        classOf, classes = strutClasses(strutLengths(epo, ends1, ends2), ref.strutTol)
+        if isTrue(ref.cutList):
+            print (f'=  Cut list for G {geoFreq} {geoScale}:')
+            print (cutListText(classes, valenceCounts(ends1, ends2), ref.SF), end='')
+        if ref.strutColors:     # Color by strut class
+            sc = ref.strutColors
+            groups = [[] for c in sc]
+            for e, (j,k) in enumerate(edges):
+                groups[classOf[e] % len(sc)].append((j,k))
+            cols = list(sc)
+        else:                   # Color by pentagons, rings, rays, seams
+            groups = [[], [], [], []]   # Y, B, R, C groups
+            for j,k in edges:
+                p, q = epo[j], epo[k]
+                oB = p.rank == q.rank
+                oY = p.nnbrs==5 or q.nnbrs==5
+                oC = p.dupl>1 and q.dupl>1 and not (oB or oY)
+                groups[0 if oY else 1 if oB else 3 if oC else 2].append((j,k))
+            cols = ref.geoColors[:4]
+        for co, group in zip(cols, groups):
+            for j,k in group:
+                cyl = Cylinder(j+nLoPo,k+nLoPo, 'c', 'c', co, 'p', ref.endGap, 0, 0)
+                rlo.cyls.append(cyl)
         return
         
     if code=='H':               # Create a clip box (particularly for geodesics)
@@ -191,11 +389,23 @@ def generatePosts(code, numberTexts, func):
         nums = getNums(4,4)     # Need exactly 4 numbers
         if nums:
             n, dx, dy, dz = int(nums[0]), nums[1], nums[2], nums[3]
-            x, y, z = bx, by, bz
-            for k in range(n):
-                postAt(x+dx, y+dy, z+dz)
+            ks = range(n)       # First post is at BP; then step by d
+            postsAt([bx+k*dx for k in ks], [by+k*dy for k in ks], [bz+k*dz for k in ks])
             return
 
+    if code=='M':               # Mirror: add a copy reflected in plane
+        nums = getNums(3,3)     # Need exactly 3 numbers (plane normal)
+        if nums:
+            a, b, c = nums
+            d = a*a + b*b + c*c
+            if d == 0:
+                print (f'Anomaly: code {code}, {numberTexts} is not a plane normal')
+                return
+            n = (a, b, c)       # Plane through BP, normal to a,b,c
+            refl = [[(i==j) - 2*n[i]*n[j]/d for j in range(3)] for i in range(3)]
+            addInstances([aboutPoint([[1,0,0],[0,1,0],[0,0,1]], B), aboutPoint(refl, B)])
+        return
+
     if code=='O':               # Set origin point, OP
         nums = getNums(3,3)     # Need exactly 3 numbers
         if nums:   ref.LO.OP = Point(*nums);  return
@@ -205,26 +415,48 @@ def generatePosts(code, numberTexts, func):
         if nums:
             n, r, a0 = int(nums[0]), nums[1], nums[2]
             theta = 2*pi/n
+            # Rotate by theta via one sin and cos, as rotate2 would
+            st, ct = sin(theta), cos(theta)
             x, y = rotate2(r, 0, radians(a0)) # a0 in degrees
-            for post in range(n):
-                postAt(bx+x, by+y, bz)
-                x, y = rotate2(x, y,theta)
+            xs, ys = [x], [y]
+            for post in range(n-1):
+                x, y = x*ct-y*st, x*st+y*ct
+                xs.append(x);  ys.append(y)
+            postsAt(map(add, xs, repeat(bx)), map(add, ys, repeat(by)), repeat(bz, n))
             return
     
+    if code=='Q':               # n copies rotated about an axis
+        nums = getNums(4,4)     # Need exactly 4 numbers
+        if nums:
+            n, ax, ay, az = int(nums[0]), nums[1], nums[2], nums[3]
+            d = sssq(ax, ay, az)
+            if n < 1 or d == 0:
+                print (f'Anomaly: code {code}, {numberTexts} has bad count or axis')
+                return
+            ux, uy, uz = ax/d, ay/d, az/d   # Unit axis through BP
+            mats = []
+            for k in range(n):
+                t = 2*pi*k/n;  c, s = cos(t), sin(t);  C = 1-c
+                mats.append(aboutPoint([[c+ux*ux*C, ux*uy*C-uz*s, ux*uz*C+uy*s],
+                                        [uy*ux*C+uz*s, c+uy*uy*C, uy*uz*C-ux*s],
+                                        [uz*ux*C-uy*s, uz*uy*C+ux*s, c+uz*uz*C]], B))
+            addInstances(mats)
+        return
+
     if code in 'RT':            # Create an array of posts
         nums = getNums(4,4)     # Need exactly 4 numbers
         if nums:
             r, c, dx, dy = int(nums[0]), int(nums[1]), nums[2], nums[3]
-            y, z = by, bz
-            for rr in range(r):
-                x, roLen = bx, c
-                # For odd rows of triangular arrays, offset the row
-                if code=='T' and (rr&1)==1:
-                    x, roLen = bx - dx/2, c+1
-                for cc in range(roLen):
-                    postAt(x,y,z)
-                    x += dx
-                y += dy
+            # Make x values of even and odd rows once; for triangular
+            # arrays, odd rows are offset and have an extra post.
+            # Values accumulate by adding dx or dy, as in a loop.
+            xe = list(accumulate(repeat(dx, c-1), initial=bx)) if c > 0 else []
+            xo = list(accumulate(repeat(dx, c), initial=bx-dx/2)) if code=='T' else xe
+            xs, ys = [], []
+            for rr, y in zip(range(r), accumulate(repeat(dy), initial=by)):
+                row = xo if rr&1 else xe
+                xs += row;  ys += repeat(y, len(row))
+            postsAt(xs, ys, repeat(bz, len(xs)))
             return
     if code=='U':               # Call a function
         f = ref.uDict[func](*getNums(0,Lots))
@@ -232,20 +464,22 @@ def generatePosts(code, numberTexts, func):
 #===============================================
 def scriptPost(ss, prePost):
     ref = FunctionList
-    codes = 'BCDEGHILOPRSTU'
+    codes = 'ABCDEFGHILMOPQRSTUV'
     pc, code, numbers, glom = '?', '?', prePost.data, ''
     getGlom = False
     for cc in ss:   # Process characters of script
-        # Add character to number, or store a number, or what?
+        # Get a function name or file name, ended by space or ;.  Its
+        # characters aren't digits of numbers or codes.
         if getGlom:
             if getGlom > 1:
                 if cc==' ' or cc==';':
                     getGlom = 0
-                else: glom = glom + cc
-            else:
-                if cc != ' ':
-                    getGlom = 2;
-                    glom = cc
+                else:
+                    glom = glom + cc;  continue
+            elif cc != ' ':
+                getGlom = 2;  glom = cc
+                continue
+        # Add character to number, or store a number, or what?
         if pc == '#':       # Set or use a simple variable
             if code=='?':   # If between codes, store post count
                 ref.userLocals[cc] = len(ref.LO.posts)
@@ -261,7 +495,7 @@ def scriptPost(ss, prePost):
             code = '?'
         elif cc in codes:
             pc, code, numbers, glom = '?', cc, [], ''
-            getGlom = 1 if code=='U' else 0
+            getGlom = 1 if code in 'FU' else 0
         pc = cc             # Prep to get next character
     prePost.data = numbers
     return
@@ -307,6 +541,10 @@ def runScript(scripts):
     prePost = Post(0, data=[])
     mode = 0                    # mode 0 = comments at start
     numbers = []
+    def spoolCheck():  # With stream=t, cylinders go into a spool file
+        if isTrue(ref.stream) and not isinstance(ref.LO.cyls, CylSpool):
+            ref.LO.cyls = CylSpool(ref.LO.cyls, ref.chunkSize)
+    spoolCheck()
     for line in scripts:
         l1, l2, ss, ll = line[:1], line[:2], line[2:], line
         if   l2=='=C': mode = 'C'; ll=ss # Cylinders
@@ -316,6 +554,7 @@ def runScript(scripts):
             # Process current line of params, and let command params
             # in paramTxt override if necessary
             ref.installParams((ss, ref.paramTxt));
+            spoolCheck()
             continue
         elif l2=='=A':          # Process Arithmetic line
             ref.arithmetic(ss, ref.traceExec);
@@ -329,6 +568,47 @@ def runScript(scripts):
             preCyl.gap = ref.endGap
             ref.scriptCyl (ll, preCyl)
 #===============================================
+def mergePosts(layout, tol):
+    '''Weld together posts of layout that are within distance tol of
+    each other, renumbering cylinder ends and edges to match.  Then
+    drop cylinders that have become zero-length (same post and level
+    at both ends) and cylinders that duplicate earlier ones.  Returns
+    counts of removed posts, duplicate cylinders, and zero-length
+    cylinders.    '''
+    from pypevue.spatial import weldPoints
+    posts = layout.posts;  nPosts = len(posts)
+    if not posts: return 0, 0, 0
+    coords = [u for p in posts for u in (p.foot.x, p.foot.y, p.foot.z)]
+    remap, reps = weldPoints(coords, tol)
+    layout.posts = [posts[k] for k in reps]
+    seen, nDup, nZero = set(), 0, 0
+    cylout = CylSpool() if isinstance(layout.cyls, CylSpool) else []
+    for c in layout.cyls:
+        # Clamp post numbers like writeCylinders does, then renumber
+        c.post1 = remap[min(c.post1, nPosts-1)]
+        c.post2 = remap[min(c.post2, nPosts-1)]
+        e1, e2 = (c.post1, c.lev1), (c.post2, c.lev2)
+        if e1 == e2:
+            nZero += 1;  continue
+        key = (e1, e2) if e1 < e2 else (e2, e1)
+        if key in seen:
+            nDup += 1;   continue
+        seen.add(key)
+        c.num = len(cylout)
+        cylout.append(c)
+    layout.cyls = cylout
+    if layout.faces:            # Renumber faces; drop collapsed ones
+        faces = ([remap[min(v, nPosts-1)] for v in vs] for vs in layout.faces)
+        layout.faces = [vs for vs in faces if len(set(vs)) == len(vs)]
+    edges = layout.edgeList;  layout.edgeList = {}
+    for v in edges:
+        for w in edges[v]:
+            rv, rw = remap[min(v, nPosts-1)], remap[min(w, nPosts-1)]
+            if rv != rw:  addEdge(rv, rw, layout)
+    nDrop = nPosts - len(reps)
+    print (f'=  Merge with tolerance {tol} removed {nDrop} posts, {nDup} duplicate cylinders, and {nZero} zero-length cylinders')
+    return nDrop, nDup, nZero
+#===============================================
 def postTop(p, OP):   # Given post p, return loc. of post top
     ref = FunctionList
     x, y, z = p.foot.x, p.foot.y, p.foot.z # Location of post foot
@@ -349,7 +629,124 @@ def postTop(p, OP):   # Given post p, return loc. of post top
     #print (f'postTop  diff zangle: {zt-zAxisAngle:6.6e}   zt {zt}   zA {zAxisAngle}')
     return Point(tx,ty,tz), round(yAxisAngle,2), round(zAxisAngle,2)
 #===============================================
-def writePosts(fout):
+# Chunk workers for writePosts, writeLabels, and writeCylinders.  Via
+# mapRanges, each processes a range of items and returns results
+# instead of writing them, so that chunks can run in worker processes.
+def postTops(lo, hi):
+    ref = FunctionList
+    return [ref.postTop(p, ref.LO.OP) for p in ref.LO.posts[lo:hi]]
+
+def postsLines(lo, hi, step):
+    ref = FunctionList
+    # The onePost calls in following should match params in onePost def.
+    return [f'''  onePost({p.diam}, {p.hite}, {p.yAngle:7.3f}, {p.zAngle:7.3f},   {p.foot.x:1.2f}, {p.foot.y:1.2f}, {p.foot.z:1.2f} );
+''' for p in ref.LO.posts[lo*step:hi*step:step]]
+
+def postsText(lo, hi, step):
+    return ''.join(postsLines(lo, hi, step))
+
+def labelSelection(step=1):
+    '''Return list of numbers of posts to label: those named in
+    labelPosts (eg 0-99,120; all if empty), less geodesic posts whose
+    rank is not in labelRanks (eg 0-3; all if empty), then every
+    labelEvery'th one of those times step, then if labelSpacing > 0,
+    just the first one in each cube of side labelSpacing.  Call after
+    preparePosts.'''
+    ref = FunctionList
+    nPosts = len(ref.LO.posts)
+    def ranges(name, hi):       # Numbers below hi in ranges param name
+        nums, text = [], getattr(ref, name)
+        try:
+            for term in text.split(','):
+                a, dash, b = term.partition('-')
+                nums.extend(range(int(a), min(hi, int(b if dash else a)+1)))
+        except ValueError:
+            print (f'=  Error: {name}={text} is not like 0-99,120; ignoring it')
+            return None
+        return nums
+    nums = range(nPosts)
+    if ref.labelPosts:
+        nums = ranges('labelPosts', nPosts)
+        if nums is None:  nums = range(nPosts)
+    ranks = ranges('labelRanks', float('inf')) if ref.labelRanks else None
+    if ranks is not None:       # Posts without a rank are not filtered
+        ranks = set(ranks) | {None}
+        nums = [k for k in nums if getattr(ref.LO.posts[k].foot, 'rank', None) in ranks]
+    nums = list(nums[::max(1, ref.labelEvery)*step])
+    if ref.labelSpacing > 0:    # Keep first post in each cell of a grid
+        inv, cells, keep = 1/(ref.SF*ref.labelSpacing), set(), []
+        for k in nums:
+            f = ref.LO.posts[k].foot
+            cell = (floor(f.x*inv), floor(f.y*inv), floor(f.z*inv))
+            if cell not in cells:
+                cells.add(cell);  keep.append(k)
+        nums = keep
+    return nums
+
+def labelsLines(lo, hi):
+    '''Return oneLabel calls for posts ref.labelNums[lo:hi]'''
+    ref = FunctionList
+    posts = ref.LO.posts
+    lev = 'e'                   # Label level is last level in postLabel
+    for cc in ref.postLabel:
+        if cc in ref.levels: lev = cc
+    a = (ord(lev)-ord(ref.levels[0]))/(len(ref.levels)-1);  b = 1-a
+    out = []
+    for k in ref.labelNums[lo:hi]:
+        p = posts[k];  pf, pt = p.foot, p.top
+        out.append(f'''  oneLabel({p.diam/3:0.3f}, {p.yAngle:0.3f}, "{p.num}",  {round(b*pf.x+a*pt.x, 2)}, {round(b*pf.y+a*pt.y, 2)}, {round(b*pf.z+a*pt.z, 2)});\n''')
+    return out
+
+def labelsText(lo, hi):
+    return ''.join(labelsLines(lo, hi))
+
+def cylindersLines(clo, chi, listIt, grouped=False, withCyls=False):
+    '''Return oneCyl calls for cylinders clo to chi-1; or if grouped,
+    (color, diameter, bareCyl call) triples for them; or if withCyls,
+    (cylinder, oneCyl call) pairs, for the cylinders hookCylRecords
+    returned'''
+    ref = FunctionList
+    posts = ref.LO.posts
+    nPosts = len(posts)
+    lod = ref.lodActive    # Draft output gives each cylinder its own $fn
+    out = []
+    for cyl in ref.hookCylRecords(ref.LO.cyls[clo:chi]):
+        post1, post2, lev1, lev2, colo, thix, gap, data, num = cyl.get9()
+        gap = ref.SF*gap            # gap needs scaling
+        p1, p2 = min(post1,nPosts-1), min(post2,nPosts-1)
+        try:
+            pp, qq = posts[p1], posts[p2]
+        except:
+            print (f'Fatal Error with p1= {p1},   p2= {p2},  nPosts {nPosts}')
+            exit(0)
+        p = ref.levelAt(lev1, pp)
+        q = ref.levelAt(lev2, qq)
+        qmp = q.diff(p)
+        L = round(max(0.1, qmp.mag()), 2) # Round L to 2 places
+        cName = ref.colorSet[colo]
+        alpha = gap/L
+        cc = p + alpha * qmp    # Add scaled qmp to p
+        cylNum= 1000*p1 + p2
+        if isTrue(listIt):
+            print (f'Make {cyl}  L {L:2.2f}  {cName}')
+        # Use min/max to avoid exception from dz/L numerical error
+        ##yAngle = round(degrees(pi/2 - asin(min(1, max(-1, dz/L)))), 2)
+        ##zAngle = round(degrees(atan2(dy, dx)), 2)
+        yAngle = round(degrees(pi/2 - asin(min(1, max(-1, qmp.z/L)))), 2)
+        zAngle = round(degrees(atan2(qmp.y, qmp.x)), 2)
+        fn = f', {ref.lodSegments(cyl.diam)}' if lod else ''
+        if grouped:
+            out.append((colo, cyl.diam, f'''  bareCyl ({cyl.diam:0.3f}, {L-2*gap:0.3f}, [0, {yAngle:0.3f}, {zAngle:0.3f}], [{cc.x:0.3f}, {cc.y:0.3f}, {cc.z:0.3f}]{fn});\n'''))
+        else:
+            line = f'''  oneCyl ({cyl.diam:0.3f}, {L-2*gap:0.3f}, [0, {yAngle:0.3f}, {zAngle:0.3f}], [{cc.x:0.3f}, {cc.y:0.3f}, {cc.z:0.3f}], {cName}{fn});\n'''
+            out.append((cyl, line) if withCyls else line)
+    return out
+
+def cylindersText(clo, chi, listIt):
+    return ''.join(cylindersLines(clo, chi, listIt))
+#===============================================
+def preparePosts():
+    '''Scale the posts, and compute their tops and angles'''
     ref = FunctionList
     try:
         ref.LO.OP.scale(ref.SF) # Get ready to orient the posts: scale the OP
@@ -366,87 +763,275 @@ def writePosts(fout):
         if isTrue(ref.postList):
             print (f'p{k:<2}=Point( {p.foot})')
         p.diam, p.hite = pDi, pHi
-        p.top, p.yAngle, p.zAngle = ref.postTop(p, ref.LO.OP)
+    posts, k = ref.LO.posts, 0
+    for tops in mapRanges(postTops, 0, len(posts), ref.workers, ref.chunkSize):
+        for top in tops:
+            p = posts[k];  k += 1
+            p.top, p.yAngle, p.zAngle = top
 
-    fout.write('''
+def postDefCode():
+    '''Return OpenSCAD definition of module onePost'''
+    ref = FunctionList
+    # In draft output, posts get fewer facets
+    fn = f', $fn={ref.lodSegments(ref.SF*ref.postDiam)}' if ref.lodActive else ''
+    return f'''
 module onePost (diam, hi, yA, zA, px, py, pz)
   translate (v=[px, py, pz]) rotate(a=[0, yA, zA])
-      cylinder(d=diam, h=hi);
-module makePosts() {
-''')
-    # The onePost calls in following should match params in above def.
-    for p in ref.LO.posts:
-        fout.write(f'''  onePost({p.diam}, {p.hite}, {p.yAngle:7.3f}, {p.zAngle:7.3f},   {p.foot.x:1.2f}, {p.foot.y:1.2f}, {p.foot.z:1.2f} );
+      cylinder(d=diam, h=hi{fn});
+'''
+
+def writePosts(fout):
+    ref = FunctionList
+    ref.preparePosts()
+    posts = ref.LO.posts
+    # In draft output, posts may get decimated
+    step = max(1, ref.lodPosts) if ref.lodActive else 1
+    fout.write(f'''{postDefCode()}module makePosts() {'{'}
 ''')
+    nOut = len(range(0, len(posts), step))
+    for text in mapRanges(postsText, 0, nOut, ref.workers, ref.chunkSize, step):
+        fout.write(text)
     fout.write('}\n')           # close the module
 
 #===============================================
-def writeLabels(fout):
+def labelStyle():
+    '''Return color name and text size for labels, per postLabel'''
     ref = FunctionList
-    if not isTrue(ref.postLabel):
-        fout.write('module makeLabels() {}\n') # Make an empty module
-        return
     cName = ref.colorSet['B']
     thik  = ref.thickLet('t')
     for cc in ref.postLabel:
         if cc in ref.colors: cName = ref.colorSet[cc]
         if cc in ref.thixx:  thik  = ref.thickLet(cc)
-    fout.write(f'''module oneLabel (offset, yA, txt, lx, ly, lz) 
+    return cName, thik
+
+def labelDefCode(colored=True):
+    '''Return OpenSCAD definition of module oneLabel; without a color
+    if not colored'''
+    cName, thik = labelStyle()
+    colo = f'color(c={cName}) ' if colored else ''
+    return f'''module oneLabel (offset, yA, txt, lx, ly, lz) 
   translate (v=[lx+offset, ly+offset, lz+offset])
-    rotate([0, yA, 0]) color(c={cName}) text(size={thik:0.3f}, text=txt);
-module makeLabels() {'{'}\n''')
-    for p in ref.LO.posts:
-        lxyz  = ref.levelAt('e', p)
-        for cc in ref.postLabel:
-            if cc in ref.levels: lxyz  = ref.levelAt(cc, p)
-        fout.write(f'''  oneLabel({p.diam/3:0.3f}, {p.yAngle:0.3f}, "{str(p.num)}",  {str(lxyz)});\n''')
-    fout.write('}\n')           # close the module
+    rotate([0, yA, 0]) {colo}text(size={thik:0.3f}, text=txt);
+'''
+
+def writeLabels(fout):
+    '''Write module makeLabels, with labels for posts from
+    labelSelection.  If labelFile is true, labels go into a file of
+    their own, as module allLabels, and makeLabels calls it if
+    OpenSCAD variable showLabels is true.'''
+    ref = FunctionList
+    if not isTrue(ref.postLabel):
+        fout.write('module makeLabels() {}\n') # Make an empty module
+        return
+    step = max(1, ref.lodLabels) if ref.lodActive else 1
+    ref.labelNums = ref.labelSelection(step)
+    out, name = fout, 'makeLabels'
+    if isTrue(ref.labelFile):
+        base = ref.scadFile[:-5] if ref.scadFile.endswith('.scad') else ref.scadFile
+        out, name = io.StringIO(), 'allLabels'
+    grouped = isTrue(ref.cylGroups)  # If so, one color() for all labels
+    out.write(f'''{labelDefCode(not grouped)}module {name}() {'{'}\n''')
+    if grouped:  out.write(f'  color(c={labelStyle()[0]}) {"{"}\n')
+    for text in mapRanges(labelsText, 0, len(ref.labelNums), ref.workers, ref.chunkSize):
+        out.write(text)
+    out.write('  }\n}\n' if grouped else '}\n')  # close the module
+    if out is not fout:         # Labels file leaves out the date
+        fn = f'{base}-labeltext.scad'
+        front = ref.frontCode.split('\n', 2)[2]
+        writeIfChanged(fn, f'''// Labels of {ref.scadFile}, by pypevu.py from script "{ref.f}"
+{front}{out.getvalue()}''')
+        fout.write(f'''showLabels = true;  // Set false to hide labels
+use <{os.path.basename(fn)}>
+module makeLabels() {'{'} if (showLabels) allLabels(); {'}'}
+''')
 
 #==================================================
+def cylDefCode():
+    '''Return OpenSCAD definition of module oneCyl, and of bareCyl
+    (oneCyl without a color) if cylGroups is on'''
+    ref = FunctionList
+    # Draft output gives each cylinder its own $fn
+    fn = (', fn', ', $fn=fn') if ref.lodActive else ('', '')
+    bare = f'''module bareCyl(diam, cylLen, rota, trans{fn[0]})
+    translate (v=trans) rotate(a=rota)
+      cylinder(d=diam, h=cylLen{fn[1]});
+''' if isTrue(ref.cylGroups) else ''
+    return f'''module oneCyl(diam, cylLen, rota, trans, colo{fn[0]})
+    translate (v=trans) rotate(a=rota)
+      color(c=colo) cylinder(d=diam, h=cylLen{fn[1]});
+{bare}'''
+
+def groupName(colo, dText):
+    '''Return name of module for cylinders of color colo and diameter
+    text dText (as from f'{diam:0.3f}') in grouped output, eg cyls_G_6p000'''
+    return f'cyls_{colo}_{dText}'.replace('.', 'p').replace('-', 'm')
+
+def writeGroups(fout, clo, chi, listIt, startFin):
+    '''Write cylinders clo to chi-1 grouped by color and diameter, with
+    one color() per group.  With startFin & 1, each group becomes a
+    module cyls_<color>_<diam>, each color a module cyls_<color>, and
+    makeCylinders calls the color modules; else (eg for an autoAdder's
+    cylinders, inside makeCylinders) each group is a color() block.'''
+    ref = FunctionList
+    workers = 0 if isTrue(listIt) else ref.workers
+    # Key groups by diameter text, as in module names, so that diameters
+    # that differ only by rounding error share a group
+    groups = {}                 # (color, diam text) -> lines of bareCyl calls
+    for part in mapRanges(cylindersLines, clo, chi, workers, ref.chunkSize, listIt, True):
+        for colo, diam, line in part:
+            groups.setdefault((colo, f'{diam:0.3f}'), []).append(line)
+    keys = sorted(groups, key=lambda k: (k[0], float(k[1])))
+    if startFin & 1:
+        fout.write(cylDefCode())
+        for colo, diam in keys:
+            fout.write(f'''module {groupName(colo, diam)}() color(c={ref.colorSet[colo]}) {'{'}
+{''.join(groups[colo, diam])}{'}'}
+''')
+        colos = sorted(set(colo for colo, diam in keys))
+        for colo in colos:
+            calls = ' '.join(f'{groupName(c, d)}();' for c, d in keys if c == colo)
+            fout.write(f'''module cyls_{colo}() {'{'} {calls} {'}'}\n''')
+        calls = ''.join(f'  cyls_{colo}();\n' for colo in colos)
+        fout.write(f'''module makeCylinders() {'{'}\n{calls}''')
+    else:
+        for colo, diam in keys:
+            fout.write(f'''  color(c={ref.colorSet[colo]}) {'{'}\n{''.join(groups[colo, diam])}  {'}'}\n''')
+    if startFin & 2:
+        fout.write('}\n')           # close the module
+
 def writeCylinders(fout, clo, chi, listIt, startFin):
     '''Write openSCAD code to generate pipes between posts.  We process
     from cylinder clo to chi-1, printing cylinder data if listIt is
     true.  Integer startFin controls whether module prefix and suffix
-    code is written.  0=neither, 1=prefix, 2=suffix, 3=both    '''
+    code is written.  0=neither, 1=prefix, 2=suffix, 3=both.  With
+    parameter workers > 1, chunks of chunkSize cylinders are formatted
+    in parallel; output is the same as with workers=0.  With parameter
+    cylGroups on, cylinders are grouped by color (see writeGroups).'''
     ref = FunctionList
-    posts = ref.LO.posts
-    nPosts = len(posts)
+    if isinstance(ref.LO.cyls, CylSpool):
+        ref.LO.cyls.flush()     # So workers need only read the spool
+    if isTrue(ref.cylGroups):
+        return writeGroups(fout, clo, chi, listIt, startFin)
     if startFin & 1:
-        fout.write('''module oneCyl(diam, cylLen, rota, trans, colo)
-    translate (v=trans) rotate(a=rota)
-      color(c=colo) cylinder(d=diam, h=cylLen);
-module makeCylinders() {\n''')
+        fout.write(f'''{cylDefCode()}module makeCylinders() {'{'}\n''')
 
-    for nCyl in range(clo, chi):
-        cyl = ref.LO.cyls[nCyl]     # Draw this cylinder
-        post1, post2, lev1, lev2, colo, thix, gap, data, num = cyl.get9()
-        gap = ref.SF*gap            # gap needs scaling
-        p1, p2 = min(post1,nPosts-1), min(post2,nPosts-1)
-        try:
-            pp, qq = posts[p1], posts[p2]
-        except:
-            print (f'Fatal Error with p1= {p1},   p2= {p2},  nPosts {nPosts}')
-            exit(0)
-        p = ref.levelAt(lev1, pp)
-        q = ref.levelAt(lev2, qq)
-        qmp = q.diff(p)
-        L = round(max(0.1, qmp.mag()), 2) # Round L to 2 places
-        cName = ref.colorSet[colo]
-        alpha = gap/L
-        cc = p + alpha * qmp    # Add scaled qmp to p
-        cylNum= 1000*p1 + p2
-        if isTrue(listIt):
-            print (f'Make {cyl}  L {L:2.2f}  {cName}')
-        # Use min/max to avoid exception from dz/L numerical error
-        ##yAngle = round(degrees(pi/2 - asin(min(1, max(-1, dz/L)))), 2)
-        ##zAngle = round(degrees(atan2(dy, dx)), 2)
-        yAngle = round(degrees(pi/2 - asin(min(1, max(-1, qmp.z/L)))), 2)
-        zAngle = round(degrees(atan2(qmp.y, qmp.x)), 2)
-        fout.write(f'''  oneCyl ({cyl.diam:0.3f}, {L-2*gap:0.3f}, [0, {yAngle:0.3f}, {zAngle:0.3f}], [{cc.x:0.3f}, {cc.y:0.3f}, {cc.z:0.3f}], {cName});\n''')
+    # Keep listings in order by not listing from worker processes
+    workers = 0 if isTrue(listIt) else ref.workers
+    for text in mapRanges(cylindersText, clo, chi, workers, ref.chunkSize, listIt):
+        fout.write(text)
 
     if startFin & 2:
         fout.write('}\n')           # close the module
 #-------------------------------------------------------------
+def writeIfChanged(fn, text):
+    '''Write text to file fn, unless fn already holds that text, so
+    that unchanged files keep their timestamps.  Returns True if the
+    file got written.'''
+    try:
+        with open(fn) as fin:
+            if fin.read() == text:
+                return False
+    except OSError:
+        pass
+    with open(fn, 'w') as fout:
+        fout.write(text)
+    return True
+
+def writeTiles(fout):
+    '''Write posts, labels, and cylinders into tile files, each with its
+    own module definitions and a module tile_<name>() that draws its
+    items, and write `use` lines for the tiles into fout.  With
+    tileMode=space, items go into tileDiv x tileDiv tiles by x,y
+    location (a cylinder by the location of its middle); with
+    tileMode=color, cylinders go into a tile per color and posts and
+    labels into tile `posts`.  Each tile can be rendered on its own.
+    Tile files are only rewritten when their contents change.    '''
+    ref = FunctionList
+    posts, cyls = ref.LO.posts, ref.LO.cyls
+    ref.preparePosts()
+    nPosts = len(posts)
+    if ref.tileMode == 'color':
+        ptile = ['posts']*nPosts
+        def cylTile(c):  return f'c{c.colo}'
+    else:
+        div = max(1, ref.tileDiv)
+        xs, ys = [p.foot.x for p in posts] or [0], [p.foot.y for p in posts] or [0]
+        x0, y0 = min(xs), min(ys)
+        wx, wy = (max(xs)-x0)/div or 1, (max(ys)-y0)/div or 1
+        def tileAt(x, y):
+            return f'x{min(div-1, int((x-x0)/wx))}y{min(div-1, int((y-y0)/wy))}'
+        ptile = [tileAt(p.foot.x, p.foot.y) for p in posts]
+        def cylTile(c):
+            f, g = posts[min(c.post1, nPosts-1)].foot, posts[min(c.post2, nPosts-1)].foot
+            return tileAt((f.x+g.x)/2, (f.y+g.y)/2)
+    bodies = {}                 # tile name -> list of lines of code
+    def addLines(func, nums, tiles, workers, *args):
+        lines = []              # nums = numbers of items func formats
+        for part in mapRanges(func, 0, len(nums), workers, ref.chunkSize, *args):
+            lines += part
+        for k, line in zip(nums, lines):
+            bodies.setdefault(tiles[k], []).append(line)
+    pstep = max(1, ref.lodPosts)  if ref.lodActive else 1
+    lstep = max(1, ref.lodLabels) if ref.lodActive else 1
+    addLines(postsLines, range(0, nPosts, pstep), ptile, ref.workers, pstep)
+    if isTrue(ref.postLabel):
+        ref.labelNums = ref.labelSelection(lstep)
+        addLines(labelsLines, ref.labelNums, ptile, ref.workers)
+    # Tile cylinders as hookCylRecords returns them, since it may filter
+    # or restyle them
+    workers = 0 if isTrue(ref.cylList) else ref.workers # Keep listing in order
+    for part in mapRanges(cylindersLines, 0, len(cyls), workers, ref.chunkSize,
+                          ref.cylList, False, True):
+        for c, line in part:
+            bodies.setdefault(cylTile(c), []).append(line)
+
+    # Tile files leave out the date so that unchanged tiles stay so
+    base = ref.scadFile[:-5] if ref.scadFile.endswith('.scad') else ref.scadFile
+    defs = postDefCode() + (labelDefCode() if isTrue(ref.postLabel) else '') + cylDefCode()
+    front = ref.frontCode.split('\n', 2)[2]
+    names, nChanged = sorted(bodies), 0
+    for name in names:
+        fn = f'{base}-tile-{name}.scad'
+        text = f'''// Tile {name} of {ref.scadFile}, by pypevu.py from script "{ref.f}"
+{front}{defs}module tile_{name}() {'{'}
+{''.join(bodies[name])}{'}'}
+tile_{name}();
+'''
+        nChanged += writeIfChanged(fn, text)
+        fout.write(f'use <{os.path.basename(fn)}>\n')
+    print (f'=  Wrote {len(names)} tiles of {ref.scadFile}; {nChanged} of them changed')
+    # Main file keeps empty post and label modules, and a cylinder
+    # module that autoAdder can add to
+    fout.write('module makePosts() {}\nmodule makeLabels() {}\n')
+    ref.writeCylinders(fout, 0, 0, ref.cylList, 1 if ref.autoMax>0 else 3)
+    calls = ''.join(f'  tile_{name}();\n' for name in names)
+    ref.backCode = ref.backCode.replace('union() {\n', 'union() {\n' + calls, 1)
+#-------------------------------------------------------------
+def writeSplit(fout):
+    '''Write modules makePosts, makeLabels, and makeCylinders into
+    files of their own, and write `use` lines for those files into
+    fout.  Module files leave out the date, so their contents only
+    change when their modules do, and they only get rewritten when
+    their contents change.  makeCylinders stays in fout if autoMax >
+    0, so that autoAdder can add to it.    '''
+    ref = FunctionList
+    base = ref.scadFile[:-5] if ref.scadFile.endswith('.scad') else ref.scadFile
+    front = ref.frontCode.split('\n', 2)[2]
+    parts = [('posts', ref.writePosts), ('labels', ref.writeLabels)]
+    if ref.autoMax > 0:
+        ref.writeCylinders(fout, 0, len(ref.LO.cyls), ref.cylList, 1)
+    else:
+        parts.append(('cylinders', lambda f: ref.writeCylinders(f, 0, len(ref.LO.cyls), ref.cylList, 3)))
+    nChanged = 0
+    for name, writer in parts:
+        buf = io.StringIO()
+        writer(buf)
+        fn = f'{base}-{name}.scad'
+        nChanged += writeIfChanged(fn, f'''// Module file {name} of {ref.scadFile}, by pypevu.py from script "{ref.f}"
+{front}{buf.getvalue()}''')
+        fout.write(f'use <{os.path.basename(fn)}>\n')
+    print (f'=  Wrote {len(parts)} module files of {ref.scadFile}; {nChanged} of them changed')
+#-------------------------------------------------------------
 def autoAdder(fout):
     '''Stub for auto-adding cylinders, which happens via a plug-in'''
     pass
@@ -510,6 +1095,9 @@ union() {
   makeCylinders();
 }
 '''
+    if c.LO.instances:          # Make the layout once; place copies
+        c.backCode = f'''
+module makeInstance() {c.backCode}{instanceCode(c.LO.instances, c.SF)}'''
 #-------------------------------------------------------------
 # Hook functions -- To let user modify data or
 # output before each step of the output process
@@ -520,12 +1108,18 @@ def hookCylinders(fout): pass
 def hookAdder (fout): pass
 def hookBack  (fout): pass
 def hookFinal (fout): pass
+# Record hook -- Given a list of cylinders on their way to output (a
+# chunk of at most chunkSize of them), return an iterable of the
+# cylinders to draw, eg to filter or restyle them.  It sees each
+# chunk once, and may be called in worker processes.
+def hookCylRecords(cyls): return cyls
 #-------------------------------------------------------------
 
 def tell():
-    return (addEdge, addEdges, arithmetic, autoAdder, generatePosts,
-            installParams, levelAt, postTop, runScript, scriptCyl,
-            scriptPost, setClipAndRota, setCodeFrontAndBack, thickLet,
-            writeCylinders, writeLabels, writePosts,
+    return (addCylinders, addEdge, addEdges, addPosts, arithmetic, autoAdder, generatePosts,
+            installParams, labelSelection, layoutExtent, levelAt, lodSegments, mergePosts,
+            postTop, preparePosts, runScript, scriptCyl, scriptPost,
+            setClipAndRota, setCodeFrontAndBack, thickLet,
+            writeCylinders, writeLabels, writePosts, writeSplit, writeTiles,
             hookFront, hookPosts, hookLabels, hookCylinders,
-            hookAdder, hookBack,  hookFinal)
+            hookAdder, hookBack,  hookFinal, hookCylRecords)
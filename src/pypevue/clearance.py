@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+'''Clearance checking for pypevue layouts: find struts (cylinders)
+and posts that pass through or too near each other, as can happen
+with large autoMax values in autoAdder plugins, with overlapping G
+domes, or in woven domes that use several levels.
+
+Each strut or post is treated as a segment with a radius: a strut
+runs between its level points, and a post runs from foot to top.
+End gaps are not trimmed off struts, since a built strut or its hub
+connector fills that space; so overlaps near hubs get reported too.  The clearance between two of them is the distance
+between their segments less both radii.  clearancePairs() builds a
+bounding-volume hierarchy (BVH) over the segments' boxes, splitting
+each node at the middle of its longest axis, and then looks for
+neighbours of each segment by walking the tree.  For n segments with
+k close pairs, that takes about O(n log n + k) time, instead of the
+O(n^2) of testing all pairs.
+
+Pairs of struts that meet at the same point (same post and level),
+and posts paired with struts that end on them, are not tested, since
+they are supposed to touch.  Parameter clearCheck selects what
+checkClearance() does with pairs closer than parameter clearance (in
+the same units as post coordinates): 'list' just reports them,
+'color' also gives offending struts color clearColor, and 'drop'
+removes one strut of each offending pair.'''
+
+from math import sqrt
+from pypevue import FunctionList, isTrue
+from pypevue.spool import CylSpool
+#---------------------------------------------------------
+def segSegDist2(p0, p1, q0, q1):
+    '''Return squared distance between segments p0-p1 and q0-q1, which
+    are given as (x,y,z) tuples.  Uses the closest-points method in
+    Ericson's Real-Time Collision Detection, sec. 5.1.9.'''
+    d1 = (p1[0]-p0[0], p1[1]-p0[1], p1[2]-p0[2])
+    d2 = (q1[0]-q0[0], q1[1]-q0[1], q1[2]-q0[2])
+    r  = (p0[0]-q0[0], p0[1]-q0[1], p0[2]-q0[2])
+    a = d1[0]*d1[0] + d1[1]*d1[1] + d1[2]*d1[2]
+    e = d2[0]*d2[0] + d2[1]*d2[1] + d2[2]*d2[2]
+    f = d2[0]*r[0] + d2[1]*r[1] + d2[2]*r[2]
+    eps = 1e-12
+    if a <= eps and e <= eps:   # Both segments are points
+        s = t = 0.0
+    elif a <= eps:              # First segment is a point
+        s, t = 0.0, min(1.0, max(0.0, f/e))
+    else:
+        c = d1[0]*r[0] + d1[1]*r[1] + d1[2]*r[2]
+        if e <= eps:            # Second segment is a point
+            s, t = min(1.0, max(0.0, -c/a)), 0.0
+        else:
+            b = d1[0]*d2[0] + d1[1]*d2[1] + d1[2]*d2[2]
+            denom = a*e - b*b   # >= 0; 0 when segments are parallel
+            s = min(1.0, max(0.0, (b*f - c*e)/denom)) if denom > eps else 0.0
+            t = (b*s + f)/e
+            if t < 0:
+                s, t = min(1.0, max(0.0, -c/a)), 0.0
+            elif t > 1:
+                s, t = min(1.0, max(0.0, (b-c)/a)), 1.0
+    dx = r[0] + d1[0]*s - d2[0]*t
+    dy = r[1] + d1[1]*s - d2[1]*t
+    dz = r[2] + d1[2]*s - d2[2]*t
+    return dx*dx + dy*dy + dz*dz
+#---------------------------------------------------------
+def buildBVH(boxes, leafSize=4):
+    '''Build a BVH over boxes, a list of (x0,y0,z0,x1,y1,z1) tuples.
+    Returns (nodes, order): nodes[k] is (box, left, right) for an inner
+    node, or (box, -1-lo, hi) for a leaf holding order[lo:hi].  Node 0
+    is the root.  Nodes are split at the middle of the longest axis of
+    their box centers; if that puts all boxes on one side, at the
+    middle of the list instead.'''
+    order = list(range(len(boxes)))
+    cen = [((b[0]+b[3])/2, (b[1]+b[4])/2, (b[2]+b[5])/2) for b in boxes]
+    nodes = []
+    if not boxes: return nodes, order
+    todo = [(0, len(order), -1, 0)]   # lo, hi, parent node, side
+    while todo:
+        lo, hi, parent, side = todo.pop()
+        items = order[lo:hi]
+        bb = [boxes[i] for i in items]
+        box = (min(b[0] for b in bb), min(b[1] for b in bb), min(b[2] for b in bb),
+               max(b[3] for b in bb), max(b[4] for b in bb), max(b[5] for b in bb))
+        k = len(nodes)
+        if parent >= 0:         # Link node k into its parent
+            pbox, l, r = nodes[parent]
+            nodes[parent] = (pbox, k, r) if side==0 else (pbox, l, k)
+        if hi-lo <= leafSize:
+            nodes.append((box, -1-lo, hi))
+            continue
+        cc = [cen[i] for i in items]
+        ext = [max(c[ax] for c in cc) - min(c[ax] for c in cc) for ax in range(3)]
+        ax = ext.index(max(ext))
+        mid = min(c[ax] for c in cc) + ext[ax]/2
+        left  = [i for i in items if cen[i][ax] <  mid]
+        right = [i for i in items if cen[i][ax] >= mid]
+        if not left or not right:   # Degenerate split; halve the list
+            left, right = items[:len(items)//2], items[len(items)//2:]
+        order[lo:hi] = left + right
+        m = lo + len(left)
+        nodes.append((box, -1, -1))
+        todo.append((m, hi, k, 1))
+        todo.append((lo, m, k, 0))
+    return nodes, order
+
+def clearancePairs(segs, radii, clearance=0.0, skip=None):
+    '''Find pairs of segments closer than clearance.  segs is a list of
+    (p, q) pairs of (x,y,z) tuples, and radii[k] is the radius of
+    segment k.  skip(j, k), if given, returns true for pairs not to
+    test.  Returns a list of (j, k, gap) with j < k, in order, where
+    gap = distance between segments less both radii.'''
+    half = clearance/2
+    boxes = []
+    for (p, q), r in zip(segs, radii):
+        w = r + half
+        boxes.append((min(p[0],q[0])-w, min(p[1],q[1])-w, min(p[2],q[2])-w,
+                      max(p[0],q[0])+w, max(p[1],q[1])+w, max(p[2],q[2])+w))
+    nodes, order = buildBVH(boxes)
+    out = []
+    for j, b in enumerate(boxes):
+        stack = [0] if nodes else []
+        while stack:
+            nb, l, r = nodes[stack.pop()]
+            if (nb[0] > b[3] or nb[3] < b[0] or nb[1] > b[4] or
+                nb[4] < b[1] or nb[2] > b[5] or nb[5] < b[2]):
+                continue
+            if l >= 0:
+                stack.append(l);  stack.append(r)
+                continue
+            for k in order[-1-l:r]:
+                if k <= j: continue
+                c = boxes[k]
+                if (c[0] > b[3] or c[3] < b[0] or c[1] > b[4] or
+                    c[4] < b[1] or c[2] > b[5] or c[5] < b[2]):
+                    continue
+                if skip and skip(j, k): continue
+                (p0, p1), (q0, q1) = segs[j], segs[k]
+                gap = sqrt(segSegDist2(p0, p1, q0, q1)) - radii[j] - radii[k]
+                if gap < clearance:
+                    out.append((j, k, gap))
+    out.sort()
+    return out
+#---------------------------------------------------------
+def layoutSegments(layout):
+    '''Return (segs, radii, ends) for the struts and then the posts of
+    layout, in unscaled post coordinates.  ends[k] is, for a strut, a
+    pair of (post, level) ends, and for a post, the post number.  Post
+    tops are computed as in postTop, but without scaling by SF.'''
+    ref = FunctionList
+    levs, SF = ref.levels, ref.SF
+    OP, u, spread = layout.OP, ref.postHi, isTrue(ref.zSpread)
+    feet, tops = [], []
+    for p in layout.posts:
+        x, y, z = p.foot.x, p.foot.y, p.foot.z
+        if spread:
+            zrat = 2/(1+z/ref.zSize)
+            x, y = x*zrat, y*zrat
+        ox, oy, oz = (x, y, z-99) if ref.postAxial else (OP.x, OP.y, OP.z)
+        v = sqrt((x-ox)**2 + (y-oy)**2 + (z-oz)**2)
+        if v > 0.01/SF:
+            a, b = (u+v)/v, -u/v
+            tops.append((a*x+b*ox, a*y+b*oy, a*z+b*oz))
+        else:
+            tops.append((x, y, z+u))
+        feet.append((x, y, z))
+    def at(lev, k):             # Like levelAt, for post k
+        a = (ord(lev)-ord(levs[0]))/(len(levs)-1);  b = 1-a
+        f, t = feet[k], tops[k]
+        return (b*f[0]+a*t[0], b*f[1]+a*t[1], b*f[2]+a*t[2])
+    segs, radii, ends = [], [], []
+    nPosts = len(feet)
+    for c in layout.cyls:
+        p1, p2 = min(c.post1, nPosts-1), min(c.post2, nPosts-1)
+        segs.append((at(c.lev1, p1), at(c.lev2, p2)))
+        radii.append(c.diam/(2*SF))     # Diameters are scaled by SF
+        ends.append(((p1, c.lev1), (p2, c.lev2)))
+    for k in range(nPosts):
+        segs.append((feet[k], tops[k]))
+        radii.append(ref.postDiam/2)
+        ends.append(k)
+    return segs, radii, ends
+
+def layoutClearances(layout, clearance=0.0):
+    '''Return list of (j, k, gap) for pairs of layout's struts and posts
+    closer than clearance, numbered as in layoutSegments: struts from
+    0, then posts'''
+    segs, radii, ends = layoutSegments(layout)
+    def skip(j, k):
+        ej, ek = ends[j], ends[k]   # Struts come before posts
+        if type(ek)==int:           # Skip post and a strut ending there
+            return type(ej)!=int and ek in (ej[0][0], ej[1][0])
+        return ej[0] in ek or ej[1] in ek
+    return clearancePairs(segs, radii, clearance, skip)
+#---------------------------------------------------------
+def checkClearance(layout):
+    '''Report, color, or drop struts of layout that are too near other
+    struts or posts, per parameters clearCheck, clearance, and
+    clearColor'''
+    ref = FunctionList
+    mode = ref.clearCheck
+    if mode not in ('list', 'color', 'drop'):
+        print (f'=  Error: clearCheck={mode} is not list, color, or drop')
+        return
+    cyls, nCyls = layout.cyls, len(layout.cyls)
+    pairs = layoutClearances(layout, ref.clearance)
+    def name(k):
+        if k >= nCyls: return f'post {k-nCyls}'
+        c = cyls[k]
+        return f'cyl {k} ({c.post1}{c.lev1},{c.post2}{c.lev2})'
+    for j, k, gap in pairs:
+        print (f'=  Clearance {gap:8.4f}  {name(j)}  {name(k)}')
+    print (f'=  Clearance check: {len(pairs)} pairs closer than {ref.clearance}')
+    if mode=='list' or not pairs: return
+    bad = set()
+    for j, k, gap in pairs:
+        if mode=='color':
+            bad.update(x for x in (j, k) if x < nCyls)
+        elif j not in bad and k not in bad:   # Drop the later strut
+            struts = [x for x in (k, j) if x < nCyls]
+            if struts:  bad.add(struts[0])
+    out = CylSpool() if isinstance(cyls, CylSpool) else []
+    for k, c in enumerate(cyls):
+        if k in bad:
+            if mode=='drop': continue
+            c.colo = ref.clearColor
+        out.append(c)
+    if mode=='drop':            # Remove edges that no strut joins now
+        joined = {(c.post1, c.post2) for c in out} | {(c.post2, c.post1) for c in out}
+        el = layout.edgeList
+        for k in bad:
+            a, b = cyls[k].post1, cyls[k].post2
+            if (a, b) not in joined:
+                if b in el.get(a, []):  el[a].remove(b)
+                if a in el.get(b, []):  el[b].remove(a)
+        print (f'=  Clearance check dropped {len(bad)} cylinders')
+    if isinstance(cyls, CylSpool):  cyls.close()
+    layout.cyls = out
@@ -18,20 +18,52 @@
 # `autoList` - Whether to list generated edges.  autoList=t says to
 # list auto-edges; autoList=f says no.
 from math import sqrt
+from array import array
 from pypevue import Point, Cylinder, FunctionList as ref
-from nearby.delaunay import Vert, Triangulate, CircumCircle2, CircumCircle3
-from nearby.kNN import PNN, doAMethod
+from pypevue import stageCache
+try:                    # nearby is needed only when edges aren't cached
+    from nearby.delaunay import Vert, Triangulate, CircumCircle2, CircumCircle3
+    from nearby.kNN import PNN, doAMethod
+except ImportError:
+    Vert = None
+
+autoVersion = 1   # Change when autoEdges results change
 #==============================================================
 def autoAdder(fout):
     rlo = ref.LO
     cyls  = rlo.cyls            # List of cylinders
     posts = rlo.posts           # List of posts
     edgeList = rlo.edgeList     # List of edges
-    nPosts = len(posts)
     clo = len(cyls) # Record how many cylinders are already processed
     # in this version punt color, thix, levels ...
     colo, thix, lev1, lev2 = 'B', 'p', 'c','c'
     npoints = len(posts)
+    # Edges depend only on post locations, so reuse cached edges (eg
+    # when only colors changed) if post locations are unchanged
+    feet = array('d', [u for p in posts for u in (p.foot.x, p.foot.y, p.foot.z)])
+    key = stageCache.stageKey('auto3e', autoVersion, feet)
+    got = stageCache.load('auto3e', key)
+    if got:
+        edges = got[1]['edges'].tolist()
+        print (f'Got {len(edges)} edges for {npoints} posts from cache')
+    elif Vert is None:
+        print ('Error: autoAdder needs package nearby to make edges not in cache')
+        return
+    else:
+        edges = autoEdges(posts)
+        stageCache.store('auto3e', key, {}, {'edges': array('q', edges)})
+    # Make cylinders for Delaunay edges (from low post# to high#)
+    for e in edges:
+        pa, pb = e//npoints, e%npoints
+        if pa not in edgeList or pb not in edgeList[pa]:
+            ref.addEdges(pa, pb, rlo)
+            cyls.append(Cylinder(pa,pb, lev1, lev2, colo, thix, ref.endGap, 0,0))
+    ref.writeCylinders(fout, clo, len(cyls), ref.autoList, 2)
+#==============================================================
+def autoEdges(posts):
+    '''Return sorted list of edges, coded as j*npoints+k for j < k, for
+    a Delaunay triangulation of posts adjusted toward 6NN edges'''
+    npoints = len(posts)
     def canon(j,k):             # Canonical reference for edge j-k
         return min(j,k)*npoints + max(j,k)
     def decanon(t):
@@ -99,13 +131,7 @@ def autoAdder(fout):
                 DTedgels[eb].add(ea)
                 adddels += 1
     print (f"From {nNNedges} NN edges and {nDTedges} DT edges, got {len(DTedges)} edges net by using {adddels} NN's vs DT edges")
-    # Make cylinders for Delaunay edges (from low post# to high#)
-    for e in sorted(DTedges.keys()):
-        pa, pb = decanon(e)
-        if pa not in edgeList or pb not in edgeList[pa]:
-            ref.addEdges(pa, pb, rlo)
-            cyls.append(Cylinder(pa,pb, lev1, lev2, colo, thix, ref.endGap, 0,0))
-    ref.writeCylinders(fout, clo, len(cyls), ref.autoList, 2)
+    return sorted(DTedges.keys())
 #==============================================================
 def tell():
     return (autoAdder,)
@@ -2,7 +2,9 @@
 
 # Make Euler-Formula calculation for 3D assembly of posts and
 # cylinders listed in specified file, or in pypevu.scad if no file is
-# specified.
+# specified.  This assumes one closed surface and no duplicate
+# cylinders; pypevu parameter topoCheck=report gives an exact report,
+# per component, from the layout itself.
 
 FI=${1:-pypevu.scad}
 
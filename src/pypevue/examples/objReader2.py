@@ -39,13 +39,25 @@
 # colors.]
 
 # Method objReadFile reads data from a specified .obj file, storing it
-# in an instance of ObjFileData.  Methods objManyPoly, objOnePoly,
+# in an instance of ObjFileData.  It uses pypevue.objMesh, which reads
+# files in bulk and caches parsed data by file content, so later calls
+# for the same file (in this run, or in later runs if parameter
+# cacheDir is set) don't re-parse it.  Methods objManyPoly, objOnePoly,
 # objFatPoly produce OpenSCAD code as follows.
 
 # objManyPoly: makes one flat 'polyhedron' for each face read in.
 # objOnePoly:  makes one polyhedron with all faces read in.
 # objFatPoly:  makes 3D structure, of given thickness, per face. (*)
 
+# With parameter objWeld > 0, objReadFile cleans up the mesh before
+# these use it: vertices within distance objWeld of each other (in
+# file units) are merged, and degenerate and duplicate faces are
+# dropped, as are unused vertices unless objCompact=f.
+
+# Method objPostsCyls instead adds a post at each vertex and a cylinder
+# along each unique face edge to the layout, so that a mesh can be
+# shown as posts and pipes; use it in an =A line before =C lines.
+
 # (*) Let F1 stand for the polygonal shape specified by any given f
 # line from the file.  F1 forms one surface of a polyhedron.  F2, a
 # flat face congruent to F1, is offset from it by a given thickness t.
@@ -54,65 +66,68 @@
 # the edges of the space between F1 and F2.
 
 from math import sqrt, pi, cos, sin, asin, atan2, degrees
-from pypevue import ssq, sssq, rotate2, isTrue, Point
+from pypevue import ssq, sssq, rotate2, isTrue, Point, Post, Cylinder
 from pypevue import FunctionList as ref
+from pypevue.objMesh import readObj, cleanMesh, meshEdges, shared, objOneText, objManyText, objFatText
+from pypevue.workers import mapRanges
 from re import sub
 #---------------------------------------------------------
 class ObjFileData:
-    def __init__(self):
-        self.fileName = None
-        self.verts = []         # v Vertex list
-        self.faces = []         # f Face list
-        self.stuff = []         # u usemtl data, (face#, uname) pairs
-        self.group = []         # g group data,  (face#, gname) pairs
-        self.linesIn  = 0       # count of lines read from file
-        self.nDrops = 0         # count of non-comment dropped lines
-        self.drops = ''         # string of dropped lines
+    '''OBJ-file data.  Attribute mesh is an ObjMesh (see objMesh.py),
+    with vertex coordinates and face corners in flat arrays.  Lists
+    verts (of Points) and faces (of corner-number lists) are made from
+    mesh when first used.'''
+    def __init__(self, mesh=None):
+        self.mesh = mesh
+        self.fileName = mesh.fileName if mesh else None
+        self.stuff = mesh.stuff if mesh else [] # u usemtl data, (face#, uname) pairs
+        self.group = mesh.group if mesh else [] # g group data,  (face#, gname) pairs
+        self.linesIn = mesh.linesIn if mesh else 0 # count of lines read from file
+        self.nDrops = len(mesh.drops) if mesh else 0 # count of non-comment dropped lines
+        self.drops = ' '.join(str(t) for t in mesh.drops) if mesh else '' # string of dropped lines
+        self._verts = self._faces = None
+    @property
+    def verts(self):            # v Vertex list
+        if self._verts is None:
+            c = self.mesh.coords if self.mesh else []
+            self._verts = [Point(c[k], c[k+1], c[k+2]) for k in range(0, len(c), 3)]
+        return self._verts
+    @property
+    def faces(self):            # f Face list
+        if self._faces is None:
+            m = self.mesh
+            self._faces = [m.face(f) for f in range(m.nFaces)] if m else []
+        return self._faces
 #---------------------------------------------------------
 def objReadFile(fn, scalefac, tellCounts=True):
-    '''Read data from file fn, scale it by scale factor, & return an ObjFileData.'''
+    '''Read data from file fn, scale it by scale factor, & return an
+    ObjFileData.  Parsed file data is cached (see objMesh.readObj), so
+    reading the same file again does not re-parse it.  If parameter
+    objWeld > 0, the mesh is cleaned up (see objMesh.cleanMesh) before
+    it is scaled.'''
     #  Strip outer quotes, if any, from the .obj file name
     fn = sub('^"|"$', '', fn)
     #print (f'objReadFile says fn is {fn} and sf is {scalefac}')
-    result = ObjFileData()
-    result.fileName = fn
-    with open(fn) as fin:
-        lin = 0; skipped = []
-        while (token := fin.readline()):
-            lin += 1
-            token = sub('/[/0-9]*', '', token)
-            parts = token.split()
-            if token.startswith('v '):    # vertex command
-                p = Point(*[float(u) for u in parts[1:]])
-                p.scale(scalefac)
-                result.verts.append(p)  
-            elif token.startswith('f '):    # face command
-                f = list(int(u)-1 for u in parts[1:])
-                result.faces.append(f)            
-            elif token.startswith('#') or token=='' or token=='\n':
-                pass # ignore comments and empty lines
-            elif token.startswith('usemtl'):
-                result.stuff.append((len(result.faces), parts[1]))
-            elif token.startswith('g'):
-                result.group.append((len(result.faces), parts[1]))
-            else:
-                skipped.append(lin) # Add lin to list of dropped lines
-    result.linesIn = lin
-    result.nDrops  = len(skipped)
-    result.drops   = ' '.join(str(t) for t in skipped)
+    mesh = readObj(fn)
     if tellCounts:
-        print (f"Obtained {len(result.verts)} vertices and {len(result.faces)} faces from {result.linesIn} lines in file {result.fileName}")
-        print (f"Skipped {result.nDrops} lines (#{result.drops[:40]}...) of the {result.linesIn} lines in file")
+        print (f"Obtained {mesh.nVerts} vertices and {mesh.nFaces} faces from {mesh.linesIn} lines in file {fn}")
+        print (f"Skipped {len(mesh.drops)} lines (#{' '.join(str(t) for t in mesh.drops)[:40]}...) of the {mesh.linesIn} lines in file")
+    if ref.objWeld > 0:         # Clean up mesh if asked to
+        mesh, (nWeld, nDegen, nDup, nUnused) = cleanMesh(mesh, ref.objWeld, isTrue(ref.objCompact))
+        if tellCounts:
+            print (f"Cleanup with tolerance {ref.objWeld} welded {nWeld} vertices, dropped {nDegen} degenerate and {nDup} duplicate faces, and removed {nUnused} unused vertices")
+    result = ObjFileData(mesh.scaled(scalefac))
     return result
 #---------------------------------------------------------
+# The writers below format faces in bulk via objMesh functions.  With
+# parameter workers > 1, objManyPoly and objFatPoly format chunks of
+# chunkSize faces in worker processes; output order is unchanged.
 def objOnePoly(fout, objData=None, thickness=1, scalefactor=1, filename=None):
     '''Write OpenSCAD code for one polyhedron, with thin faces for an OBJ file'''
     if filename:
         objData = objReadFile(filename, scalefactor)
-    pl = ', '.join(f'[{v}]' for v in objData.verts)
-    tl = ', '.join(str(f) for f in objData.faces)
     fout.write(f'// objOnePoly (... {filename} ...) produces:\n')
-    fout.write(f'polyhedron(points=[{pl}],\n   faces=[{tl}]);\n\n')
+    fout.write(objOneText(objData.mesh))
     return objData
 #---------------------------------------------------------
 def objManyPoly(fout, objData=None, thickness=1, scalefactor=1, filename=None):
@@ -120,11 +135,9 @@ def objManyPoly(fout, objData=None, thickness=1, scalefactor=1, filename=None):
     if filename:
         objData = objReadFile(filename, scalefactor)
     fout.write(f'// objManyPoly (... {filename} ...) produces:\n')
-    verts = objData.verts
-    for f in objData.faces:
-        pl = ', '.join(f'[{verts[i]}]' for i in f)
-        tl = ', '.join(str(i) for i in range(len(f)))
-        fout.write(f'polyhedron(points=[\n   {pl}],\n   faces=[[{tl}]]);\n')
+    shared['mesh'] = objData.mesh
+    for text in mapRanges(objManyText, 0, objData.mesh.nFaces, ref.workers, ref.chunkSize):
+        fout.write(text)
     fout.write(f'\n')
     return objData
 #---------------------------------------------------------
@@ -133,29 +146,31 @@ def objFatPoly(fout, objData=None, thickness=1, scalefactor=1, filename=None):
     if filename:
         objData = objReadFile(filename, scalefactor)
     fout.write(f'// objFatPoly (... {filename} ...) produces:\n')
-    verts = objData.verts
-    for f in objData.faces:
-        # Compute normal to face, using its first 3 vertices
-        v0, v1, v2 = verts[f[0]], verts[f[1]], verts[f[2]]
-        vnorm = (v0-v1) & (v2-v1)       # v0-v1 cross v2-v1
-        vmag = vnorm.mag()
-        if vmag < 1e-6:  vmag=1   # Any value>0 works ok in this case
-        vnorm.scale(thickness/vmag)     # scale its thickness
-        fout.write(f'// For face {f},  vnorm = {vnorm}\n')
-        pl = ', '.join(f'[{verts[i]}]' for i in f)
-        tl = ', '.join(f'[{verts[i]+vnorm}]' for i in f)
-        fout.write(f'polyhedron(points=[\n    {pl},\n    {tl}],\n')
-        nv = len(f)
-        pl = ', '.join(str(i) for i in range(nv))
-        tl = ', '.join(str(i) for i in range(nv,2*nv))
-        fout.write(f'faces=[[{pl}], [{tl}]')
-        vp = nv-1          # Set previous vertex for wrap-around
-        for i in range(nv):
-            fout.write(f', [{vp}, {i}, {nv+i}, {nv+vp}]')
-            vp = i
-        fout.write(f']);\n\n')
+    shared['mesh'] = objData.mesh
+    for text in mapRanges(objFatText, 0, objData.mesh.nFaces, ref.workers, ref.chunkSize, thickness):
+        fout.write(text)
     return objData
 #---------------------------------------------------------
+def objPostsCyls(filename, scalefactor=1, colo='G', thix='p', lev='c'):
+    '''Add posts at the vertices of an OBJ file's mesh, and cylinders
+    (of color colo, thickness thix, from level lev to lev) along the
+    unique edges of its faces.  Post locations are relative to the
+    base point, as with layout code C.  Returns number of the first
+    added post.  Example: =A ref.objPostsCyls('box.obj', 2)'''
+    objData = objReadFile(filename, scalefactor)
+    mesh, LO = objData.mesh, ref.LO
+    p0 = ref.addPosts(mesh.coords)
+    ends1, ends2 = meshEdges(mesh)
+    diam, gap, n0 = ref.thickLet(thix), ref.endGap, len(LO.cyls)
+    LO.cyls.extend([Cylinder(p0+a, p0+b, lev, lev, colo, diam, gap, 0, n0+e)
+                    for e, (a, b) in enumerate(zip(ends1, ends2))])
+    adj = [[] for k in range(mesh.nVerts)] # Edges are unique, so
+    for a, b in zip(ends1, ends2):         # just append them
+        adj[a].append(p0+b);  adj[b].append(p0+a)
+    LO.edgeList.update((p0+k, l) for k, l in enumerate(adj) if l)
+    print (f'objPostsCyls added {mesh.nVerts} posts and {len(ends1)} cylinders from {filename}')
+    return p0
+#---------------------------------------------------------
 def hookBack(fout):
     '''If objFileCalls is properly defined, call methods with params.'''
     try:
@@ -169,7 +184,8 @@ def hookBack(fout):
     except:
         print(f'hookBack fails with objFileCalls')
 #---------------------------------------------------------
-def tell(): return (hookBack, objReadFile, objManyPoly, objOnePoly, objFatPoly)
+def tell(): return (hookBack, objReadFile, objManyPoly, objOnePoly, objFatPoly,
+                    objPostsCyls)
 #---------------------------------------------------------
 if __name__ == '__main__':
     objReadFile('box.obj', 1)
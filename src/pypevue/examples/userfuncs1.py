@@ -1,7 +1,7 @@
 # Helper code for use by eg-user-funcs1 example.  The spirally(k, t,
 # xs, ys, zs) function calculates a set of 2*k post locations along t
 # turns of a sort-of-spiral beginning at the current base location,
-# and inserts the posts into a drawing by calls to generatePosts(),
+# and inserts the posts into a drawing by a call to ref.addPosts(),
 # with x-y-z scale factors xs, ys, zs.  jiw 1 Aug 2020
 
 from math import sin, cos, pi
@@ -18,7 +18,7 @@ def spirally(k=8, turns=0.5, xs=.2, ys=.5, zs=.5):
         for v in (bx + xs*i, by + ys*sin(da*i), bz + zs*cos(da*i)):
             rSide.append(v)
             lSide.append(u*v); u=-1
-    ref.generatePosts('C', rSide+lSide, None)
+    ref.addPosts(rSide+lSide)
     return k
 #-------------------------------------------------------------
 def tell():
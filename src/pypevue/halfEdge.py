@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+'''Half-edge meshes for pypevue layouts, and duals of them.
+
+A HalfEdgeMesh holds consistently oriented polygon faces as flat
+arrays indexed by half-edge number h: origin[h] is the vertex h leaves
+from, nxt[h] the next half-edge around h's face, twin[h] the opposite
+half-edge (-1 on a boundary), and face[h] the face of h.  So next,
+twin, face, and destination lookups take O(1) time, and walks around
+a face or a vertex take time proportional to their size.  Building a
+mesh takes O(H) time for H half-edges, via a dict of directed edges.
+
+meshFromEdges() makes a mesh from points and struts, eg a geodesic
+from makeIcosaGeo (layout code G) or a triangulation made by an
+autoAdder plugin: its faces are the triangles (3-cycles) of the strut
+graph, found by intersecting neighbour sets, in O(E*d) time for E
+struts and maximum valence d.  A 3-cycle all of whose struts are on
+more than two 3-cycles, as around a hub of valence 3, is taken as not
+a face.  Faces are oriented alike by a breadth-first walk across
+shared struts, then each connected piece is flipped if need be so
+that its faces face outward from its center.  layoutMesh() also uses
+any faces recorded in layout.faces, and triangles of the other struts.
+
+Layout code V (see generatePosts) uses dualPoints and dualStruts to
+make the dual of a layout, eg a Goldberg polyhedron (hexagons and
+pentagons) from a geodesic: a post at each face's centroid, projected
+onto the sphere through the layout's hubs around OP, and a strut
+across each interior strut of the layout.  The dual's faces (one
+around each inner hub of the layout) get recorded in layout.faces, so
+that topoCheck counts them and a second V gives back the layout.'''
+
+from math import sqrt
+from collections import deque
+from pypevue.topology import recordedFaces
+#---------------------------------------------------------
+class HalfEdgeMesh:
+    def __init__(self, nVerts, faces):
+        '''Make a mesh of nVerts vertices and faces, a list of lists of
+        vertex numbers, each face's vertices in order around it, and
+        all faces oriented alike.  Raises ValueError if a directed
+        edge appears twice (ie faces are non-manifold or unoriented).'''
+        origin, nxt, face, faceEdge = [], [], [], []
+        for f, vs in enumerate(faces):
+            h0, n = len(origin), len(vs)
+            faceEdge.append(h0)
+            origin.extend(vs)
+            nxt.extend(range(h0+1, h0+n));  nxt.append(h0)
+            face.extend([f]*n)
+        dest = [origin[h] for h in nxt]
+        where = {}                  # (origin, dest) -> half-edge
+        for h, uv in enumerate(zip(origin, dest)):
+            if uv in where:
+                raise ValueError(f'edge {uv} is in more than one face the same way')
+            where[uv] = h
+        self.twin = [where.get((v, u), -1) for u, v in zip(origin, dest)]
+        self.origin, self.nxt, self.face, self.faceEdge = origin, nxt, face, faceEdge
+        self.nVerts = nVerts
+        # Give each vertex an outgoing half-edge, a boundary one if any,
+        # so that walks around a boundary vertex start at one end.
+        vertEdge = [-1]*nVerts
+        prev = [0]*len(nxt)
+        for h, g in enumerate(nxt):  prev[g] = h
+        self.prev = prev
+        for h, u in enumerate(origin):
+            if vertEdge[u] < 0 or self.twin[h] < 0:
+                vertEdge[u] = h
+        self.vertEdge = vertEdge
+
+    def dest(self, h):   return self.origin[self.nxt[h]]
+    def nFaces(self):    return len(self.faceEdge)
+
+    def faceVerts(self, f):
+        '''Return list of vertices around face f, in order'''
+        h0 = h = self.faceEdge[f];  out = []
+        while True:
+            out.append(self.origin[h])
+            h = self.nxt[h]
+            if h == h0: return out
+
+    def vertexEdges(self, v):
+        '''Return list of half-edges leaving vertex v, in order around v
+        (starting at a boundary, if v is on one)'''
+        h0 = self.vertEdge[v]
+        if h0 < 0: return []
+        out, h = [h0], self.twin[self.prev[h0]]
+        while h >= 0 and h != h0:
+            out.append(h)
+            h = self.twin[self.prev[h]]
+        return out
+
+    def valence(self, v):
+        '''Return number of struts at vertex v'''
+        hs = self.vertexEdges(v)
+        return len(hs) + (1 if hs and self.twin[self.prev[hs[-1]]] < 0 else 0)
+#---------------------------------------------------------
+def graphTriangles(nVerts, ends1, ends2):
+    '''Return list of (a,b,c) triangles of the graph with edges from
+    ends1[e] to ends2[e], leaving out 3-cycles whose edges are all on
+    more than two 3-cycles'''
+    nbrs = [set() for k in range(nVerts)]
+    for a, b in zip(ends1, ends2):
+        if a != b:
+            nbrs[a].add(b);  nbrs[b].add(a)
+    tris = []
+    for a in range(nVerts):
+        na = nbrs[a]
+        for b in na:
+            if b > a:
+                tris.extend((a, b, c) for c in na & nbrs[b] if c > b)
+    count = {}                  # edge (lo, hi) -> number of 3-cycles
+    for a, b, c in tris:
+        for e in ((a, b), (b, c), (a, c)):
+            count[e] = count.get(e, 0) + 1
+    return [(a, b, c) for a, b, c in tris
+            if min(count[a, b], count[b, c], count[a, c]) <= 2]
+
+def orientFaces(faces, points):
+    '''Orient faces (lists of vertex numbers) alike, in place, by walks
+    across shared edges; then reverse each connected piece whose faces
+    mostly face toward its center.  points[v] is (x,y,z) of vertex v.'''
+    edgeFaces = {}
+    for f, vs in enumerate(faces):
+        for u, v in zip(vs, vs[1:] + vs[:1]):
+            edgeFaces.setdefault((min(u, v), max(u, v)), []).append(f)
+    seen = [False]*len(faces)
+    for f0 in range(len(faces)):
+        if seen[f0]: continue
+        piece, todo = [f0], deque([f0])
+        seen[f0] = True
+        while todo:
+            f = todo.popleft();  vs = faces[f]
+            for u, v in zip(vs, vs[1:] + vs[:1]):
+                for g in edgeFaces[min(u, v), max(u, v)]:
+                    if seen[g]: continue
+                    ws = faces[g]     # g must run v to u
+                    if any(a == u and b == v for a, b in zip(ws, ws[1:] + ws[:1])):
+                        ws.reverse()
+                    seen[g] = True
+                    piece.append(g);  todo.append(g)
+        # Outward test: sum over faces of normal . (face center - center)
+        vs = {v for f in piece for v in faces[f]}
+        cx, cy, cz = (sum(points[v][i] for v in vs)/len(vs) for i in range(3))
+        tot = 0
+        for f in piece:
+            (ax, ay, az), (bx, by, bz), (qx, qy, qz) = (points[v] for v in faces[f][:3])
+            nx = (by-ay)*(qz-az) - (bz-az)*(qy-ay)
+            ny = (bz-az)*(qx-ax) - (bx-ax)*(qz-az)
+            nz = (bx-ax)*(qy-ay) - (by-ay)*(qx-ax)
+            tot += nx*(ax+bx+qx-3*cx) + ny*(ay+by+qy-3*cy) + nz*(az+bz+qz-3*cz)
+        if tot < 0:
+            for f in piece:  faces[f].reverse()
+    return faces
+
+def meshFromEdges(points, ends1, ends2):
+    '''Return a HalfEdgeMesh of the triangles of the graph with vertices
+    at points ((x,y,z) tuples) and edges from ends1[e] to ends2[e]'''
+    faces = [list(t) for t in graphTriangles(len(points), ends1, ends2)]
+    return HalfEdgeMesh(len(points), orientFaces(faces, points))
+
+def layoutMesh(layout):
+    '''Return (mesh, points) for layout: points are post feet as (x,y,z)
+    tuples, and mesh faces are layout's recorded faces, if any (see
+    topology.recordedFaces), and the triangles of its other cylinders'''
+    points = [(p.foot.x, p.foot.y, p.foot.z) for p in layout.posts]
+    n = len(points)
+    ends = [(c.post1, c.post2) for c in layout.cyls if max(c.post1, c.post2) < n]
+    ends1, ends2 = [a for a, b in ends], [b for a, b in ends]
+    faces = [list(vs) for vs in recordedFaces(layout, ends1, ends2) or []]
+    onFace = {(min(u, v), max(u, v)) for vs in faces for u, v in zip(vs, vs[1:] + vs[:1])}
+    rest = [(a, b) for a, b in ends if (min(a, b), max(a, b)) not in onFace]
+    faces += [list(t) for t in graphTriangles(n, [a for a, b in rest], [b for a, b in rest])]
+    return HalfEdgeMesh(n, orientFaces(faces, points)), points
+#---------------------------------------------------------
+def dualPoints(mesh, points, center):
+    '''Return flat x,y,z list of face centroids of mesh, projected onto
+    the sphere about center whose radius is the mean distance of the
+    mesh's vertices from center'''
+    ox, oy, oz = center
+    used = [v for v in range(mesh.nVerts) if mesh.vertEdge[v] >= 0]
+    R = sum(sqrt((points[v][0]-ox)**2 + (points[v][1]-oy)**2 + (points[v][2]-oz)**2)
+            for v in used)/max(1, len(used))
+    out = []
+    for f in range(mesh.nFaces()):
+        vs = mesh.faceVerts(f)
+        x, y, z = (sum(points[v][i] for v in vs)/len(vs) for i in range(3))
+        dx, dy, dz = x-ox, y-oy, z-oz
+        d = sqrt(dx*dx + dy*dy + dz*dz)
+        s = R/d if d > 0 else 1
+        out.extend((ox + s*dx, oy + s*dy, oz + s*dz))
+    return out
+
+def dualFaces(mesh):
+    '''Return list of faces of the dual of mesh: for each vertex with
+    faces all around it, the list of those faces, in order'''
+    out = []
+    for v in range(mesh.nVerts):
+        hs = mesh.vertexEdges(v)
+        if hs and mesh.twin[mesh.prev[hs[-1]]] >= 0:
+            out.append([mesh.face[h] for h in hs])
+    return out
+
+def dualStruts(mesh):
+    '''Return list of (f, g, u, v) for each interior edge u-v of mesh,
+    once, where f and g are the faces on either side of it'''
+    twin, face, origin = mesh.twin, mesh.face, mesh.origin
+    return [(face[h], face[t], origin[h], mesh.dest(h))
+            for h, t in enumerate(twin) if t > h]
@@ -14,7 +14,11 @@
 
 from pypevue import  ssq, sssq, Point, IcosaGeoPoint, Layout, FunctionList
 from pypevue.baseFuncs import addEdges
+from pypevue import stageCache
 from math import sqrt, pi, sin, cos, atan2, radians, degrees
+from array import array
+
+icosaVersion = 1   # Change when genIcosahedron results change
 
 def genTriangleK (layout, K, v0, v1, v2, pn):
     def genPoint(p, q, r):
@@ -219,5 +223,41 @@ def genIcosahedron(layin, Vfreq, clip1, clip2, rotay, rotaz):
             if step == stepsPerFace[idx]:
                 faceIdx += 1; step = 0
 
+# Integer attributes of points made by genIcosahedron, as cached
+icosaInts = ('num', 'rank', 'face', 'step', 'stepInRank', 'nnbrs', 'dupl', 'pa', 'pb')
+
+def cachedIcosahedron(layin, Vfreq, clip1, clip2, rotay, rotaz):
+    '''Like genIcosahedron, but reuse points and edges from the stage
+    cache when the same frequency, clip box, and rotation were used
+    before.  Points are cached as flat arrays of coordinates and of
+    icosaInts values (-1 for None), and edgeList as offsets and
+    neighbour numbers, so a cache hit just rebuilds the points.'''
+    key = stageCache.stageKey('icosa', icosaVersion, Vfreq, clip1.x, clip1.y,
+                              clip1.z, clip2.x, clip2.y, clip2.z, rotay, rotaz)
+    got = stageCache.load('icosa', key)
+    if got:
+        meta, arr = got
+        xyz, ints = arr['xyz'].tolist(), arr['ints'].tolist()
+        ni = len(icosaInts)
+        for k in range(len(xyz)//3):
+            p = IcosaGeoPoint(xyz[3*k], xyz[3*k+1], xyz[3*k+2], Vfreq)
+            for name, v in zip(icosaInts, ints[ni*k:ni*k+ni]):
+                setattr(p, name, None if v < 0 else v)
+            layin.posts.append(p)
+        off, nbrs = arr['off'].tolist(), arr['nbrs'].tolist()
+        for j, a, b in zip(arr['keys'], off, off[1:]):
+            layin.edgeList[j] = nbrs[a:b]
+        return
+    genIcosahedron(layin, Vfreq, clip1, clip2, rotay, rotaz)
+    po, el = layin.posts, layin.edgeList
+    xyz = array('d', [u for p in po for u in (p.x, p.y, p.z)])
+    ints = array('q', [-1 if v is None else v for p in po
+                       for v in (getattr(p, name, None) for name in icosaInts)])
+    off = array('q', [0])
+    for j in el:  off.append(off[-1] + len(el[j]))
+    nbrs = array('q', [k for j in el for k in el[j]])
+    stageCache.store('icosa', key, {}, {'xyz': xyz, 'ints': ints, 'keys':
+                     array('q', el.keys()), 'off': off, 'nbrs': nbrs})
+
 # 3 Aug 2020: jiw removed code from "if __name__ == '__main__'" to end
 # of file as no longer relevant
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+'''Bulk reader for Wavefront OBJ files (a 3D-structures file format),
+with a parse cache.  Ref:
+<https://www.fileformat.info/format/wavefrontobj/egff.htm> -- jiw
+
+readObj(fn) returns an ObjMesh, which holds OBJ vertex and face data
+in flat arrays rather than in per-vertex Point objects: coords has
+x,y,z for vertex k at coords[3k:3k+3], and face f has 0-based corner
+numbers faceIdx[faceOff[f]:faceOff[f+1]].  The reader handles v, f,
+g, and usemtl lines, and ignores comments and blank lines; it counts
+other lines as dropped.
+
+Files are read in large chunks, and parsed meshes are cached by a
+hash of file contents: in memory, for repeated reads of a file during
+one run, and on disk via stageCache (in directory FunctionList.cacheDir,
+if that is set) for later runs.  Meshes obtained from readObj are shared by
+callers, so treat them as read-only; use mesh.scaled(s) to get a
+scaled copy.
+
+Functions objOneText, objManyText, and objFatText format mesh faces
+as OpenSCAD polyhedron code, in bulk, for the examples/objReader2
+plugin.  cleanMesh(mesh, tol) welds near-coincident vertices and
+drops degenerate and duplicate faces before such output.'''
+
+import os, sys, hashlib
+from math import sqrt
+from re import sub
+from itertools import accumulate, repeat
+from bisect import bisect, bisect_left
+from operator import add, sub as sub1
+from array import array
+from pypevue.spatial import weldPoints
+from pypevue import stageCache
+
+objVersion = 1                  # Change when parse results change
+chunkBytes = 1 << 24            # Read files in 16MB chunks
+stats = {'parses': 0, 'memHits': 0, 'diskHits': 0}
+memCache  = {}                  # content hash -> ObjMesh
+statCache = {}                  # (path, mtime, size) -> content hash
+#---------------------------------------------------------
+class ObjMesh:
+    def __init__(self):
+        self.fileName = None
+        self.coords  = array('d')      # x,y,z of vertices
+        self.faceOff = array('q', [0]) # Start of each face in faceIdx
+        self.faceIdx = array('q')      # Corner numbers of faces
+        self.stuff = []         # u usemtl data, (face#, uname) pairs
+        self.group = []         # g group data,  (face#, gname) pairs
+        self.linesIn = 0        # count of lines read from file
+        self.drops = []         # line numbers of non-comment dropped lines
+    @property
+    def nVerts(self):  return len(self.coords)//3
+    @property
+    def nFaces(self):  return len(self.faceOff)-1
+    def face(self, f):
+        '''Return list of corner numbers of face f'''
+        return self.faceIdx[self.faceOff[f]:self.faceOff[f+1]].tolist()
+    def scaled(self, s):
+        '''Return a copy of self with coordinates scaled by s; face
+        arrays are shared with self.'''
+        m = ObjMesh()
+        m.__dict__.update(self.__dict__)
+        m.coords = array('d', [s*u for u in self.coords]) if s != 1 else array('d', self.coords)
+        return m
+    def __str__(self):
+        return f'ObjMesh {self.fileName}: {self.nVerts} vertices, {self.nFaces} faces'
+#---------------------------------------------------------
+def parseLines(mesh, lines, lin):
+    '''Add data from OBJ-file lines to mesh.  lin is the number of lines
+    before these ones; return the number after them.'''
+    coords, faceOff, faceIdx = mesh.coords, mesh.faceOff, mesh.faceIdx
+    cext, fext, fapp = coords.extend, faceIdx.extend, faceOff.append
+    for ln in lines:
+        lin += 1
+        c = ln[:2]
+        if c == 'v ':                     # vertex command
+            cext(map(float, ln.split()[1:4]))
+        elif c == 'f ':                   # face command
+            nv = len(coords)//3           # Negative indices are relative
+            idx = [int(t.split('/', 1)[0]) for t in ln.split()[1:]]
+            fext([i-1 if i > 0 else nv+i for i in idx])
+            fapp(len(faceIdx))
+        elif c[:1] == '#' or ln == '' or ln == '\r':
+            pass                # ignore comments and empty lines
+        elif ln.startswith('usemtl') or ln.startswith('g'):
+            parts = ln.split()
+            name = parts[1] if len(parts) > 1 else ''
+            tags = mesh.stuff if c == 'us' else mesh.group
+            tags.append((len(faceOff)-1, name))
+        else:
+            mesh.drops.append(lin) # Add lin to list of dropped lines
+    return lin
+
+def parseBulk(mesh, lines, lin):
+    '''Like parseLines, but handle v and f lines in bulk, converting all
+    their numbers via a few calls on joined text.  If any face has a
+    relative (negative) vertex number, parseLines is used instead.'''
+    fl = [ln for ln in lines if ln[:2] == 'f ']
+    text = ' '.join(fl)
+    if '-' in text:
+        return parseLines(mesh, lines, lin)
+    if '/' in text:             # Drop texture and normal numbers
+        text = sub('/[^ \t\r]*', '', text)
+    vl = [ln for ln in lines if ln[:2] == 'v ']
+    toks = ' '.join(vl).split()
+    if len(toks) == 4*len(vl):  # Just x, y, z on each v line?
+        del toks[::4]           # Yes; drop the v's
+        mesh.coords.fromlist(list(map(float, toks)))
+    else:
+        for ln in vl:  mesh.coords.extend(map(float, ln.split()[1:4]))
+    counts = map(len, map(str.split, text.split('f ')[1:]))
+    base = mesh.faceOff[-1]
+    mesh.faceOff.fromlist(list(map(add, accumulate(counts), repeat(base))))
+    mesh.faceIdx.fromlist(list(map(sub1, map(int, text.replace('f ', ' ').split()), repeat(1))))
+    # Handle other lines one at a time, noting face counts before them
+    nf = len(mesh.faceOff)-1-len(fl)
+    others = [i for i, ln in enumerate(lines) if ln[:2] != 'v ' and ln[:2] != 'f ']
+    if others:
+        fpos = [i for i, ln in enumerate(lines) if ln[:2] == 'f ']
+    for i in others:
+        ln = lines[i]
+        if ln[:1] == '#' or ln == '' or ln == '\r':
+            pass                # ignore comments and empty lines
+        elif ln.startswith('usemtl') or ln.startswith('g'):
+            parts = ln.split()
+            name = parts[1] if len(parts) > 1 else ''
+            tags = mesh.stuff if ln[:2] == 'us' else mesh.group
+            tags.append((nf+bisect(fpos, i), name))
+        else:
+            mesh.drops.append(lin+i+1) # Add line number to dropped lines
+    return lin + len(lines)
+
+def parseObj(fin):
+    '''Parse OBJ text from open file fin, in chunks; return an ObjMesh'''
+    mesh, lin, tail = ObjMesh(), 0, ''
+    while (chunk := fin.read(chunkBytes)):
+        lines = (tail + chunk).split('\n')
+        tail = lines.pop()      # Keep partial line for next chunk
+        lin = parseBulk(mesh, lines, lin)
+    mesh.linesIn = parseLines(mesh, [tail], lin) if tail else lin
+    stats['parses'] += 1
+    return mesh
+#---------------------------------------------------------
+def fileHash(fn):
+    '''Return hash of contents of file fn, reusing a previous result
+    if the file's modification time and size have not changed.'''
+    st = os.stat(fn)
+    skey = (os.path.realpath(fn), st.st_mtime_ns, st.st_size)
+    if skey not in statCache:
+        h = hashlib.sha1(f'objMesh {objVersion} {sys.byteorder}'.encode())
+        with open(fn, 'rb') as fin:
+            while (chunk := fin.read(chunkBytes)):
+                h.update(chunk)
+        statCache[skey] = h.hexdigest()
+    return statCache[skey]
+
+def meshArrays(mesh):
+    '''Return (meta, arrays) for saving mesh in the stage cache'''
+    meta = {'stuff': mesh.stuff, 'group': mesh.group,
+            'linesIn': mesh.linesIn, 'drops': mesh.drops}
+    return meta, {'coords': mesh.coords, 'faceOff': mesh.faceOff,
+                  'faceIdx': mesh.faceIdx}
+
+def arraysMesh(meta, arrays):
+    '''Return an ObjMesh made from data saved via meshArrays'''
+    mesh = ObjMesh()
+    mesh.coords, mesh.faceOff, mesh.faceIdx = arrays['coords'], arrays['faceOff'], arrays['faceIdx']
+    mesh.stuff = [tuple(t) for t in meta['stuff']]
+    mesh.group = [tuple(t) for t in meta['group']]
+    mesh.linesIn, mesh.drops = meta['linesIn'], meta['drops']
+    return mesh
+#---------------------------------------------------------
+def readObj(fn):
+    '''Return an ObjMesh with data from OBJ file fn, from cache if the
+    file's contents were parsed before.'''
+    key = fileHash(fn)
+    if key in memCache:
+        stats['memHits'] += 1
+        return memCache[key]
+    got = stageCache.load('obj', key)
+    if got:
+        mesh = arraysMesh(*got)
+        stats['diskHits'] += 1
+    else:
+        with open(fn) as fin:
+            mesh = parseObj(fin)
+        stageCache.store('obj', key, *meshArrays(mesh))
+    mesh.fileName = fn
+    memCache[key] = mesh
+    return mesh
+#---------------------------------------------------------
+def meshEdges(mesh):
+    '''Return (ends1, ends2), lists of the end vertices of the unique
+    edges of mesh's faces, in order of first appearance, with
+    ends1[e] < ends2[e].  An edge shared by several faces appears once:
+    each edge is keyed by its canonical (low, high) vertex pair, coded
+    as one int, so dedup is one pass through a dict rather than a
+    search per edge.  Zero-length edges (from repeated corners) are
+    left out.'''
+    n, offs = mesh.nVerts, mesh.faceOff.tolist()
+    a = mesh.faceIdx.tolist()   # a[j] is a corner and b[j] the next
+    b = a[1:] + a[:1]           # corner, wrapping around at face ends
+    for s, e in zip(offs, offs[1:]):
+        if e > s:  b[e-1] = a[s]
+    keys = dict.fromkeys([u*n+v if u < v else v*n+u for u, v in zip(a, b) if u != v])
+    return [k//n for k in keys], [k%n for k in keys]
+#---------------------------------------------------------
+def cleanMesh(mesh, tol, compact=True):
+    '''Return (cleaned copy of mesh, counts), where counts is a tuple
+    (welded vertices, degenerate faces, duplicate faces, unused
+    vertices removed).  Vertices within distance tol of each other
+    are welded (via spatial.weldPoints) and faces renumbered to match.
+    Repeated adjacent corners are then dropped from each face; faces
+    left with fewer than 3 corners, or with area at most tol*tol, are
+    degenerate, and faces with the same corner set as an earlier face
+    are duplicates; both kinds get dropped.  If compact is true,
+    vertices no face uses get removed.  Takes time linear in mesh size.'''
+    c = mesh.coords
+    if tol > 0:
+        remap, reps = weldPoints(c, tol)
+        c = array('d', [u for r in reps for u in c[3*r:3*r+3]])
+    else:
+        remap = range(mesh.nVerts)
+    offs, idx = mesh.faceOff.tolist(), [remap[i] for i in mesh.faceIdx]
+    out, seen, kept = ObjMesh(), set(), [] # kept = old numbers of kept faces
+    newIdx, newOff = [], [0]
+    nDegen = nDup = 0
+    amin2, cl = 4*tol**4, c.tolist()
+    for f, (s, e) in enumerate(zip(offs, offs[1:])):
+        cs = idx[s:e]
+        if e-s != 3 or cs[0] == cs[1] or cs[1] == cs[2] or cs[2] == cs[0]:
+            # Drop corners equal to previous corner
+            cs = [v for v, p in zip(cs, cs[-1:] + cs[:-1]) if v != p]
+        if len(cs) < 3:
+            nDegen += 1;  continue
+        nx = ny = nz = 0        # Get twice the area, via Newell's method
+        p = 3*cs[-1];  px, py, pz = cl[p], cl[p+1], cl[p+2]
+        for v in cs:
+            q = 3*v;  qx, qy, qz = cl[q], cl[q+1], cl[q+2]
+            nx += (py-qy)*(pz+qz);  ny += (pz-qz)*(px+qx);  nz += (px-qx)*(py+qy)
+            px, py, pz = qx, qy, qz
+        if nx*nx + ny*ny + nz*nz <= amin2:
+            nDegen += 1;  continue
+        key = tuple(sorted(cs))
+        if key in seen:
+            nDup += 1;  continue
+        seen.add(key);  kept.append(f)
+        newIdx += cs;  newOff.append(len(newIdx))
+    nv, nUnused = len(c)//3, 0
+    if compact:                 # Renumber used vertices, in old order
+        used = [False]*nv
+        for v in newIdx: used[v] = True
+        renum, cc = [0]*nv, array('d')
+        for v in range(nv):
+            if used[v]:
+                renum[v] = len(cc)//3
+                cc.extend(c[3*v:3*v+3])
+        nUnused, c = nv - len(cc)//3, cc
+        newIdx = [renum[v] for v in newIdx]
+    out.coords, out.faceIdx, out.faceOff = c, array('q', newIdx), array('q', newOff)
+    # Tags apply from the first kept face at or after their face number
+    out.stuff = [(bisect_left(kept, f), u) for f, u in mesh.stuff]
+    out.group = [(bisect_left(kept, f), g) for f, g in mesh.group]
+    out.fileName, out.linesIn, out.drops = mesh.fileName, mesh.linesIn, mesh.drops
+    return out, (mesh.nVerts - nv, nDegen, nDup, nUnused)
+#---------------------------------------------------------
+# OpenSCAD-code formatting for meshes.  Functions objFatText,
+# objManyText work on a range of faces of mesh shared['mesh'] so that
+# workers.mapRanges can run them in forked worker processes without
+# pickling the mesh for each chunk.
+shared = {}
+
+def vertexTexts(mesh):
+    '''Return list of '[x, y, z]' strings, one per vertex of mesh, with
+    coordinates rounded as in Point.__str__.  The list is kept in
+    mesh.vtext for reuse.'''
+    if getattr(mesh, 'vtext', None) is None:
+        c = mesh.coords
+        mesh.vtext = [f'[{round(c[k],3)}, {round(c[k+1],3)}, {round(c[k+2],3)}]'
+                      for k in range(0, len(c), 3)]
+    return mesh.vtext
+
+def faceNormals(mesh, lo, hi, thickness):
+    '''Return flat list of x,y,z of normals of faces lo to hi-1, scaled
+    to length thickness.  The normal of a face is (v0-v1) x (v2-v1)
+    where v0, v1, v2 are its first three corners.'''
+    c, off, idx = mesh.coords, mesh.faceOff, mesh.faceIdx
+    out = []
+    for f in range(lo, hi):
+        j = off[f];  a, b, d = 3*idx[j], 3*idx[j+1], 3*idx[j+2]
+        ux, uy, uz = c[a]-c[b], c[a+1]-c[b+1], c[a+2]-c[b+2]
+        vx, vy, vz = c[d]-c[b], c[d+1]-c[b+1], c[d+2]-c[b+2]
+        nx, ny, nz = uy*vz - uz*vy, uz*vx - ux*vz, ux*vy - uy*vx
+        vmag = sqrt(nx*nx + ny*ny + nz*nz)
+        if vmag < 1e-6:  vmag=1   # Any value>0 works ok in this case
+        s = thickness/vmag
+        out += (s*nx, s*ny, s*nz)
+    return out
+
+def objFatText(lo, hi, thickness):
+    '''Return OpenSCAD code for thick faces lo to hi-1 of shared mesh'''
+    mesh = shared['mesh'];  vtext = vertexTexts(mesh)
+    c, off, idx = mesh.coords, mesh.faceOff, mesh.faceIdx
+    normals = faceNormals(mesh, lo, hi, thickness)
+    tails, out = {}, []      # tails[nv] = faces list for nv-cornered face
+    for f in range(lo, hi):
+        corners = idx[off[f]:off[f+1]].tolist();  nv = len(corners)
+        k = 3*(f-lo);  nx, ny, nz = normals[k], normals[k+1], normals[k+2]
+        if nv not in tails:
+            vp, sides = nv-1, []  # Set previous vertex for wrap-around
+            for i in range(nv):
+                sides.append(f', [{vp}, {i}, {nv+i}, {nv+vp}]');  vp = i
+            pl = ', '.join(str(i) for i in range(nv))
+            tl = ', '.join(str(i) for i in range(nv,2*nv))
+            tails[nv] = f'faces=[[{pl}], [{tl}]{"".join(sides)}]);\n\n'
+        pl = ', '.join([vtext[i] for i in corners])
+        tl = ', '.join([f'[{round(c[3*i]+nx,3)}, {round(c[3*i+1]+ny,3)}, {round(c[3*i+2]+nz,3)}]' for i in corners])
+        out.append(f'// For face {corners},  vnorm = {round(nx,3)}, {round(ny,3)}, {round(nz,3)}\npolyhedron(points=[\n    {pl},\n    {tl}],\n{tails[nv]}')
+    return ''.join(out)
+
+def objManyText(lo, hi):
+    '''Return OpenSCAD code for thin faces lo to hi-1 of shared mesh'''
+    mesh = shared['mesh'];  vtext = vertexTexts(mesh)
+    off, idx = mesh.faceOff, mesh.faceIdx
+    tails, out = {}, []      # tails[nv] = faces list for nv-cornered face
+    for f in range(lo, hi):
+        corners = idx[off[f]:off[f+1]].tolist();  nv = len(corners)
+        if nv not in tails:
+            tails[nv] = ', '.join(str(i) for i in range(nv))
+        pl = ', '.join([vtext[i] for i in corners])
+        out.append(f'polyhedron(points=[\n   {pl}],\n   faces=[[{tails[nv]}]]);\n')
+    return ''.join(out)
+
+def objOneText(mesh):
+    '''Return OpenSCAD code for one polyhedron with all faces of mesh'''
+    off, idx = mesh.faceOff, mesh.faceIdx
+    pl = ', '.join(vertexTexts(mesh))
+    tl = ', '.join(str(idx[off[f]:off[f+1]].tolist()) for f in range(mesh.nFaces))
+    return f'polyhedron(points=[{pl}],\n   faces=[{tl}]);\n\n'
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+'''Readers for files of x,y,z points, for layout code F (eg
+`=L F cloud.f64;`), which adds a post at each point, relative to the
+base point, as with layout code C.
+
+readPoints(fn) returns the coordinates in fn as a flat sequence of
+floats, x,y,z for each point.  The file's format is chosen by its
+extension:
+   .npy     NumPy array of float32 or float64, of shape (n,3) or (3n,)
+   .f32     raw float32 values, in native byte order
+   .f64     raw float64 values, in native byte order
+   others   text: numbers separated by white space or commas, with
+            comments from # to end of line
+Binary files are memory-mapped, and their values are used where they
+lie (via memoryview.cast) rather than parsed, so that large point
+clouds load about as fast as the disk delivers them.'''
+
+import sys, ast, mmap
+from array import array
+
+npyMagic = b'\x93NUMPY'
+#---------------------------------------------------------
+def mapFile(fn):
+    '''Return a memoryview of file fn, memory-mapped read-only'''
+    with open(fn, 'rb') as fin:
+        try:
+            return memoryview(mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ))
+        except ValueError:      # An empty file can't be mapped
+            return memoryview(b'')
+
+def rawPoints(view, typecode):
+    '''Return view cast to floats of typecode 'f' or 'd'; drops any
+    partial value at the end'''
+    size = array(typecode).itemsize
+    return view[:len(view) - len(view)%size].cast(typecode)
+
+def npyPoints(fn):
+    '''Return flat coordinates from .npy file fn'''
+    view = mapFile(fn)
+    if bytes(view[:6]) != npyMagic:
+        raise ValueError(f'{fn} is not a .npy file')
+    major = view[6]
+    hlen, start = (int.from_bytes(view[8:10], 'little'), 10) if major == 1 else \
+                  (int.from_bytes(view[8:12], 'little'), 12)
+    head = ast.literal_eval(bytes(view[start:start+hlen]).decode('latin1'))
+    descr, shape = head['descr'], head['shape']
+    if descr[1:] not in ('f4', 'f8') or len(shape) not in (1, 2) or \
+       (len(shape) == 2 and shape[1] != 3):
+        raise ValueError(f'{fn} holds {descr} values of shape {shape}, not x,y,z floats')
+    n = 1
+    for d in shape:  n *= d
+    pts = rawPoints(view[start+hlen:], 'f' if descr[1:] == 'f4' else 'd')[:n]
+    swap = descr[0] in '<>' and descr[0] != ('<' if sys.byteorder == 'little' else '>')
+    if swap or head['fortran_order']:
+        pts = array(pts.format, pts)
+        if swap:  pts.byteswap()
+        if head['fortran_order'] and len(shape) == 2:   # Columns x, y, z
+            m = shape[0]
+            out = array(pts.typecode, bytes(len(pts)*pts.itemsize))
+            for k in range(3):
+                out[k::3] = pts[k*m:(k+1)*m]
+            pts = out
+    return pts
+
+def textPoints(fn):
+    '''Return flat coordinates from text file fn'''
+    with open(fn) as fin:
+        text = ' '.join(line.partition('#')[0] for line in fin)
+    return array('d', map(float, text.replace(',', ' ').split()))
+
+def readPoints(fn):
+    '''Return flat sequence of x,y,z coordinates from file fn'''
+    if fn.endswith('.npy'):  return npyPoints(fn)
+    if fn.endswith('.f32'):  return rawPoints(mapFile(fn), 'f')
+    if fn.endswith('.f64'):  return rawPoints(mapFile(fn), 'd')
+    return textPoints(fn)
@@ -61,9 +61,14 @@ Toys® models.'''
 from sys import argv, exit, exc_info, stderr
 import time, datetime
 from math import sqrt, pi, cos, sin, asin, atan2
-from pypevue import FunctionList, sssq
+from pypevue import FunctionList, sssq, isTrue
+from pypevue.struts import hubAnglesCSV, layoutHubAngles
+from pypevue.clearance import checkClearance
+from pypevue.topology import checkTopology
+from pypevue.snapshot import readSnapshot, writeSnapshot
+from pypevue import stageCache
 #---------------------------------------------------------
-def setupData(c, readArgv = True):
+def setupData(c, readArgv = True, args = None):
     ref = FunctionList
     c.levels, c.thixx,  c.digits = 'abcde', 'pqrstuvwxyz', '01234356789+-.'
     c.colorSet = {'G':'"Green"', 'Y':'"Yellow"', 'R':'"Red"', 'B':'"Blue"', 'C':'"Cyan"', 'M':'"Magenta"', 'W':'"White"', 'P':'[.5,0,.5]', 'A':'"Coral"'}
@@ -83,13 +88,41 @@ def setupData(c, readArgv = True):
     c.userPar0 = c.userPar1 = c.userPar2 = '""'
     c.traceExec=False
     c.geoColors = 'YBRC'          # Colors for pentagons, rings, rays, seams
+    # Preview (level-of-detail) output: preview=t makes scadFile a
+    # draft; draftFile names an extra draft file written in same run
+    c.preview,   c.draftFile = False, ''
+    c.lodFacets, c.lodRes    = 5, 0.004 # Min facets; facet size/extent
+    c.lodPosts,  c.lodLabels = 1, 1     # Draft has every n'th post, label
+    c.lodThin,   c.lodPrism  = 0.0, 4   # Struts thinner than lodThin get
+    c.lodActive, c.lodExtent = False, 0 #   lodPrism sides in drafts
+    c.mergeTol = 0.0   # If > 0, weld posts closer than this; drop dup cyls
+    c.workers, c.chunkSize = 0, 50000 # Processes & items per output chunk
+    c.cacheDir = ''     # Where to cache stage data; '' means no disk cache
+    c.cacheMax, c.cacheStats = 256, False # Cache size cap in MB; report?
+    c.objWeld, c.objCompact = 0.0, True # OBJ mesh cleanup, if objWeld > 0
+    c.tileMode, c.tileDiv = '', 2 # Tiled output: '', 'space', or 'color'
+    c.strutTol, c.cutList = 1e-4, False # G-code strut classes & cut list
+    c.strutColors = ''  # If set, G colors struts by class, cycling these
+    c.hubFile = ''      # If set, name of CSV file for hub angles
+    c.stream = False    # If true, spool cylinders to a file, not memory
+    c.splitOutput = False # If true, write each module to its own file
+    c.clearCheck = ''   # If set, list, color, or drop too-close struts
+    c.clearance, c.clearColor = 0.0, 'R' # Min clearance; color for 'color'
+    c.labelPosts, c.labelEvery = '', 1 # Label posts in ranges, every n'th
+    c.labelRanks = ''   # If set, label only geodesic posts of these ranks
+    c.labelSpacing = 0.0 # If > 0, at most one label per cube of this side
+    c.labelFile = False  # If true, put labels in a file of their own
+    c.saveLayout = c.loadLayout = '' # Layout snapshot files to write, read
+    c.cylGroups = False # If true, group cylinders by color and diameter
+    c.topoCheck = ''    # If set, report topology; if 'strict', check it
     c.script1 = '=P postDiam=.1 endGap=.05','=C Gpae 1,2;;;;1;Rea 1,2;;;;1;','=L C 0,0,0; P5,1,0;'
-    if readArgv:
-        for k in range(1,len(argv)):
-            c.paramTxt = c.paramTxt + ' ' + argv[k]
+    if readArgv:                # Use args, or command-line params
+        args = argv[1:] if args is None else args
+        for a in args:
+            c.paramTxt = c.paramTxt + ' ' + a
         # Did we have exactly one parameter on the command line?
-        if len(argv)==2 and not ('=' in c.paramTxt): # Is an '=' in it?
-            c.paramTxt = ' f='+argv[1] # No. So prepend 'f='.
+        if len(args)==1 and not ('=' in c.paramTxt): # Is an '=' in it?
+            c.paramTxt = ' f='+args[0] # No. So prepend 'f='.
 
     c.userLocals = {}               # Initialize empty user-space dict
     exec(f'from pypevue import Point,Post,Layout,FunctionList\nref=FunctionList', c.userLocals)
@@ -104,13 +137,50 @@ def makePluginsList(ref):
     return pll
 #---------------------------------------------------------
 def run():
-    main(argv[1:])
+    if argv[1:2] == ['serve']:  # Run as a render server
+        from pypevue.server import serve
+        serve(argv[2:])
+    else:
+        main(argv[1:])
+
+def writeOutput(ref, lod):
+    '''Write SCAD code for layout ref.LO to file ref.scadFile; with
+    level-of-detail (draft) settings in effect if lod is true.'''
+    ref.lodActive = lod
+    if lod:        # Get extent of layout for sizing cylinder facets
+        ref.lodExtent = ref.SF*ref.layoutExtent(ref.LO)
+    with open(ref.scadFile, 'w') as fout:
+        ref.hookFront     (fout)
+        fout.write(ref.frontCode)
+        if ref.tileMode:        # Posts etc. go into tile files
+            ref.hookPosts     (fout)
+            ref.hookLabels    (fout)
+            ref.hookCylinders (fout)
+            ref.writeTiles    (fout)
+        elif isTrue(ref.splitOutput): # Modules go into files of their own
+            ref.hookPosts     (fout)
+            ref.hookLabels    (fout)
+            ref.hookCylinders (fout)
+            ref.writeSplit    (fout)
+        else:
+            ref.hookPosts     (fout)
+            ref.writePosts    (fout)
+            ref.hookLabels    (fout)
+            ref.writeLabels   (fout)
+            ref.hookCylinders (fout)
+            ref.writeCylinders(fout, 0, len(ref.LO.cyls), ref.cylList,
+                               1 if ref.autoMax>0 else 3)
+        ref.hookAdder     (fout)
+        ref.autoAdder     (fout)
+        ref.hookBack      (fout)
+        fout.write(ref.backCode)
+        ref.hookFinal    (fout)
 
 def main(args):
     t0 = time.time()
     FunctionList.registrar('')
     ref = FunctionList
-    setupData(ref) 
+    setupData(ref, args=args)
     ref.installParams([ref.paramTxt]) # Should set f, script-name parameter
     if ref.f == '':
         ref.scripts = ref.script1
@@ -121,25 +191,43 @@ def main(args):
     FunctionList.registrar(makePluginsList(ref))
     
     ref.setClipAndRota(ref)   # Create LO and its clip1, clip2, rotavec vals
-    ref.runScript(ref.scripts)    # Run selected script
+    if ref.loadLayout:            # Use a saved layout instead of script
+        ref.LO, params = readSnapshot(ref.loadLayout)
+        for name, value in params.items():
+            setattr(ref, name, value)
+        ref.installParams([ref.paramTxt]) # Command line overrides those
+    else:
+        ref.runScript(ref.scripts)    # Run selected script
+    if ref.mergeTol > 0:          # Weld coincident posts if asked to
+        ref.mergePosts(ref.LO, ref.mergeTol)
+    if ref.clearCheck:            # Find struts too near others, if asked
+        checkClearance(ref.LO)
+    if ref.topoCheck:             # Report components, loops, Euler chi
+        if checkTopology(ref.LO):
+            exit(f'pypevu: topology check failed for script "{ref.f}"')
+    if ref.saveLayout:            # Save layout and params for later runs
+        writeSnapshot(ref.saveLayout, ref.LO)
+    if ref.hubFile:               # Write table of hub angles
+        with open(ref.hubFile, 'w') as fout:
+            fout.write(hubAnglesCSV(layoutHubAngles(ref.LO)))
     ref.setCodeFrontAndBack(ref)  # Set up beginning and ending SCAD code
-    with open(ref.scadFile, 'w') as fout:
-        ref.hookFront     (fout)
-        fout.write(ref.frontCode)
-        ref.hookPosts     (fout)
-        ref.writePosts    (fout)
-        ref.hookLabels    (fout)
-        ref.writeLabels   (fout)
-        ref.hookCylinders (fout)
-        ref.writeCylinders(fout, 0, len(ref.LO.cyls), ref.cylList,
-                           1 if ref.autoMax>0 else 3)
-        ref.hookAdder     (fout)
-        ref.autoAdder     (fout)
-        ref.hookBack      (fout)
-        fout.write(ref.backCode)
-        ref.hookFinal    (fout)
+    if ref.draftFile:             # Save post locations for second pass
+        feet = [(p.foot.x, p.foot.y, p.foot.z) for p in ref.LO.posts]
+        OP = ref.LO.OP;  ops = (OP.x, OP.y, OP.z)
+    writeOutput(ref, isTrue(ref.preview))
+    if ref.draftFile:             # Write a preview version too
+        for p, (x,y,z) in zip(ref.LO.posts, feet):
+            p.foot.x, p.foot.y, p.foot.z = x, y, z
+        OP.x, OP.y, OP.z = ops
+        scadFile, ref.scadFile = ref.scadFile, ref.draftFile
+        ref.setCodeFrontAndBack(ref)
+        writeOutput(ref, True)
+        ref.scadFile = scadFile
+    if isTrue(ref.cacheStats):
+        print (f'=  Stage cache: {stageCache.statsText()}')
     t1 = time.time()-t0
-    print (f'For script "{ref.f}", pypevu wrote code to {ref.scadFile} at {ref.date} in {t1:0.3f} seconds')
+    drafted = f' and {ref.draftFile}' if ref.draftFile else ''
+    print (f'For script "{ref.f}", pypevu wrote code to {ref.scadFile}{drafted} at {ref.date} in {t1:0.3f} seconds')
 
 if __name__ == '__main__':
     run()
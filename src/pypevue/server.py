@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+'''Render server for pypevu.  `pypevu serve` runs an asyncio server on
+a local TCP port or Unix socket; it takes scripts and parameters from
+clients, runs them in a pool of warm worker processes, and sends the
+SCAD output back.  Workers import pypevu, baseFuncs, and any plugins
+named by plugins= when they start, so requests don't pay for
+interpreter startup or plugin imports.
+
+Server options (name=value, like pypevu parameters):
+   port=N        TCP port on 127.0.0.1 (default 8091), unless socket set
+   socket=path   Unix socket to listen on instead of a TCP port
+   workers=N     Number of worker processes (default 2)
+   queue=N       Max number of requests waiting for a worker (default 8)
+   plugins=a,b   Plugin modules to import in each worker at startup
+
+Protocol: a client sends a request as one line of json, eg
+{"script": "=L C 0,0,0; P5,1,0;\\n=C Gpae 1,2;;;;1;\\n", "params":
+"SF=50 postLabel=f"}, and gets back one line of json -- with ok,
+error (if not ok), bytes, queued, run, and total (times in seconds),
+and log (what pypevu printed) -- followed by `bytes` bytes of SCAD
+code.  A connection may carry several requests, one at a time.
+
+Backpressure: requests wait in a queue of at most queue= entries;
+when it is full, the server stops reading from clients whose requests
+don't fit, until a worker frees up.  Cancellation: if a client closes
+its connection, its request is dropped from the queue if it hasn't
+started, or its result is discarded if it is running.  (A running
+request isn't interrupted, since its worker process is shared.)
+Parameter scadFile is set by the server.  Only the SCAD file gets sent
+back, so requests with parameters that make pypevu write other files
+(tileMode, splitOutput, labelFile, draftFile, hubFile, saveLayout,
+loadLayout) get an error reply, as do scripts that write other files
+via =P lines.  request() is a client function for Python callers.'''
+
+import os, sys, io, json, time, asyncio, tempfile, importlib
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+# Parameters that make pypevu read or write files besides scadFile:
+# flags, and names that do so when not empty
+sideFileFlags = ('splitOutput', 'labelFile')
+sideFileNames = ('tileMode', 'draftFile', 'hubFile', 'saveLayout', 'loadLayout')
+defaults = {'port': '8091', 'socket': '', 'workers': '2', 'queue': '8', 'plugins': ''}
+chunkBytes = 1 << 16
+#---------------------------------------------------------
+def warmUp(plugins):
+    '''Worker initializer: import pypevu and plugins, and register base
+    functions, so that jobs start warm'''
+    import pypevue.pypevu, pypevue.baseFuncs
+    from pypevue import FunctionList
+    FunctionList.registrar('')
+    for p in plugins.split(','):
+        if p:  importlib.import_module(p)
+
+def sideFiles(params):
+    '''Return list of names in params (name=value strings) that would
+    make pypevu read or write files besides scadFile'''
+    from pypevue import isTrue
+    out = []
+    for a in params:
+        name, eq, value = a.partition('=')
+        if (name in sideFileFlags and isTrue(value)) or (name in sideFileNames and value):
+            out.append(name)
+    return out
+
+def runJob(script, params):
+    '''Run pypevu on script text with params (a list of name=value
+    strings); return (ok, SCAD text or error message, log, seconds)'''
+    from pypevue import pypevu
+    t0 = time.time()
+    log = io.StringIO()
+    with tempfile.TemporaryDirectory() as tmp:
+        sfn, ofn = os.path.join(tmp, 'script'), os.path.join(tmp, 'out.scad')
+        with open(sfn, 'w') as fout:
+            fout.write(script)
+        try:
+            with redirect_stdout(log):
+                pypevu.main([f'f={sfn}'] + list(params) + [f'scadFile={ofn}'])
+            extra = sorted(set(os.listdir(tmp)) - {'script', 'out.scad'})
+            if extra:               # Eg from =P splitOutput=t in script
+                return False, f'Script writes files besides the SCAD file: {", ".join(extra)}', \
+                    log.getvalue(), time.time()-t0
+            with open(ofn) as fin:
+                return True, fin.read(), log.getvalue(), time.time()-t0
+        except BaseException as e:  # Includes exit() calls in pypevu
+            return False, f'{type(e).__name__}: {e}', log.getvalue(), time.time()-t0
+#---------------------------------------------------------
+class Job:
+    def __init__(self, script, params):
+        self.script, self.params = script, params
+        self.done = asyncio.get_running_loop().create_future()
+        self.tIn = time.time()
+        self.tStart = None
+
+class Server:
+    def __init__(self, opts):
+        self.opts = opts
+        self.nWorkers = max(1, int(opts['workers']))
+        self.queue = asyncio.Queue(max(1, int(opts['queue'])))
+        ctx = multiprocessing.get_context('fork' if 'fork' in
+                    multiprocessing.get_all_start_methods() else None)
+        self.pool = ProcessPoolExecutor(self.nWorkers, mp_context=ctx,
+                        initializer=warmUp, initargs=(opts['plugins'],))
+        self.stats = {'done': 0, 'failed': 0, 'cancelled': 0}
+
+    async def dispatch(self):
+        '''Take jobs from the queue and run them, one at a time; one of
+        these runs per worker process, so the pool never backs up'''
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            if job.done.done():     # Cancelled while queued
+                continue
+            job.tStart = time.time()
+            try:
+                result = await loop.run_in_executor(self.pool, runJob, job.script, job.params)
+            except Exception as e:  # Eg, a worker died
+                result = (False, f'{type(e).__name__}: {e}', '', 0)
+            if not job.done.done():
+                job.done.set_result(result)
+
+    async def handle(self, reader, writer):
+        '''Serve requests from one client connection'''
+        extra = b''             # Start of a next request, if any
+        try:
+            while True:
+                line = extra if extra.endswith(b'\n') else extra + await reader.readline()
+                if not line: break
+                extra = await self.serveOne(line, reader, writer) if line.strip() else b''
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serveOne(self, line, reader, writer):
+        '''Serve one request; return any bytes of a following request
+        that got read while waiting for this one to finish'''
+        try:
+            req = json.loads(line)
+            params = req.get('params', [])
+            params = params.split() if isinstance(params, str) else list(params)
+            job = Job(str(req['script']), params)
+            side = sideFiles(params)
+            if side:
+                raise ValueError(f'{", ".join(side)} would write files the server cannot return')
+        except (ValueError, KeyError, TypeError) as e:
+            await self.reply(writer, {'ok': False, 'error': f'Bad request: {e}'}, b'')
+            return b''
+        # Watch for the client hanging up (EOF) while waiting for a
+        # place in the queue, and then for the result
+        hangup = asyncio.ensure_future(reader.read(1))
+        put = asyncio.ensure_future(self.queue.put(job))  # Waits while queue is full
+        await asyncio.wait([put, hangup], return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            if not hangup.result():     # Hung up before the job got queued
+                put.cancel()
+                self.stats['cancelled'] += 1
+                raise ConnectionError('client closed connection')
+            await put                   # Client sent more; keep waiting
+        await asyncio.wait([job.done, hangup], return_when=asyncio.FIRST_COMPLETED)
+        if hangup.done() and not hangup.result() and not job.done.done():
+            job.done.cancel()
+            self.stats['cancelled'] += 1
+            raise ConnectionError('client closed connection')
+        if not job.done.done():     # Client sent more; wait for result
+            await job.done
+        if not hangup.done():       # Stop waiting for more input
+            hangup.cancel()
+            try:  await hangup
+            except asyncio.CancelledError:  pass
+        extra = b'' if hangup.cancelled() else hangup.result()
+        ok, text, log, tRun = job.done.result()
+        self.stats['done' if ok else 'failed'] += 1
+        now = time.time()
+        head = {'ok': ok, 'queued': round(job.tStart-job.tIn, 4),
+                'run': round(tRun, 4), 'total': round(now-job.tIn, 4), 'log': log}
+        if not ok:  head['error'] = text
+        await self.reply(writer, head, text.encode() if ok else b'')
+        return extra
+
+    async def reply(self, writer, head, body):
+        head['bytes'] = len(body)
+        writer.write(json.dumps(head).encode() + b'\n')
+        for k in range(0, len(body), chunkBytes):
+            writer.write(body[k:k+chunkBytes])
+            await writer.drain()    # Don't outrun the client
+        await writer.drain()
+
+    async def run(self):
+        dispatchers = [asyncio.create_task(self.dispatch()) for k in range(self.nWorkers)]
+        if self.opts['socket']:
+            srv = await asyncio.start_unix_server(self.handle, path=self.opts['socket'])
+            where = self.opts['socket']
+        else:
+            srv = await asyncio.start_server(self.handle, '127.0.0.1', int(self.opts['port']))
+            where = f"127.0.0.1:{self.opts['port']}"
+        print (f'=  pypevu serve: listening on {where} with {self.nWorkers} workers', flush=True)
+        try:
+            async with srv:
+                await srv.serve_forever()
+        finally:
+            for d in dispatchers:  d.cancel()
+            print (f'=  pypevu serve: ' + ',  '.join(f'{n} {k}' for k, n in self.stats.items()))
+            self.pool.shutdown(cancel_futures=True)
+#---------------------------------------------------------
+def serverOptions(args):
+    '''Return dict of server options from name=value strings in args'''
+    opts = dict(defaults)
+    for a in args:
+        name, eq, value = a.partition('=')
+        if name not in opts or not eq:
+            raise ValueError(f'Unknown server option {a!r}; options are {", ".join(defaults)}')
+        opts[name] = value
+    return opts
+
+def serve(args):
+    '''Run a render server with options from args until interrupted'''
+    try:
+        opts = serverOptions(args)
+    except ValueError as e:
+        print (e, file=sys.stderr);  sys.exit(1)
+    try:
+        asyncio.run(Server(opts).run())
+    except KeyboardInterrupt:
+        pass
+#---------------------------------------------------------
+def request(script, params='', port=8091, socket=''):
+    '''Send a request to a render server; return (head, SCAD text),
+    where head is the reply's json header as a dict'''
+    import socket as so
+    s = so.socket(so.AF_UNIX) if socket else so.socket(so.AF_INET)
+    with s:
+        s.connect(socket if socket else ('127.0.0.1', port))
+        s.sendall(json.dumps({'script': script, 'params': params}).encode() + b'\n')
+        f = s.makefile('rb')
+        head = json.loads(f.readline())
+        return head, f.read(head['bytes']).decode()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+'''Layout snapshots: save a Layout, with parameter values, to a compact
+binary file, and load it back, so that later steps (eg other colors,
+another output mode, autoAdder experiments) needn't re-run a script.
+Parameter saveLayout=<file> makes pypevu save its layout after running
+the script; loadLayout=<file> makes it load a layout instead of
+running a script.  Parameters given on the command line override
+those saved in the snapshot.
+
+A snapshot file holds a tag line, a json line (counts, parameters,
+BP, OP, clip box and rotation, instances, and a table of arrays), and
+then flat arrays from the array module, each starting at a multiple
+of 8 bytes: post feet, tops, angles, sizes, numbers, and data; if
+posts are geodesic points, their freq, rank, face, step, stepInRank,
+num, nnbrs, and dupl values (-1 for None); cylinder ends, level and color
+letters, diameters, gaps, data, and numbers; the edge list in
+compressed form (keys, starts, and neighbours); and recorded faces,
+if any, as post numbers and starts.  Post and cylinder data are kept
+as ints.
+
+readSnapshot() can memory-map the file, and then the posts and
+cylinders of the layout it returns are LazyLists, which make Post and
+Cylinder objects from the mapped arrays as they get used, and its
+edge list is a LazyEdges, which makes neighbour lists as they get
+used.  So a multi-gigabyte snapshot opens at once, and only the pages
+of items actually used get read from disk.  Items made once are kept,
+so that changes to them (eg by preparePosts) persist.'''
+
+import os, sys, json, mmap
+from array import array
+from bisect import bisect_left
+from itertools import chain, accumulate
+from collections.abc import MutableMapping
+from pypevue import Point, IcosaGeoPoint, Post, Cylinder, Layout, FunctionList
+
+fileTag = b'PVLAYOUT 1\n'
+geoFields = ('freq', 'rank', 'face', 'step', 'stepInRank', 'num', 'nnbrs', 'dupl')
+# Parameters that name files or runs, or pick output modes, rather
+# than describe a layout
+notSaved = {'f', 'scadFile', 'draftFile', 'hubFile', 'paramTxt', 'date',
+            'saveLayout', 'loadLayout', 'Plugins', 'lodActive', 'lodExtent',
+            'tileMode', 'tileDiv', 'splitOutput', 'labelFile', 'cylGroups',
+            'workers', 'chunkSize', 'stream', 'cacheDir', 'cacheMax',
+            'cacheStats', 'preview', 'clearCheck', 'topoCheck', 'cutList'}
+#---------------------------------------------------------
+class LazyList:
+    '''List-like sequence whose item k is made by make(k) when first
+    used, then kept.  Supports len, indexing, slices, iteration,
+    append, extend, item assignment, and del.'''
+    def __init__(self, n, make):
+        self.items, self.make = [None]*n, make
+    def __len__(self):  return len(self.items)
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[j] for j in range(*k.indices(len(self.items)))]
+        item = self.items[k]
+        if item is None:
+            item = self.items[k] = self.make(k % len(self.items))
+        return item
+    def __setitem__(self, k, v):  self.items[k] = v
+    def __delitem__(self, k):
+        self.materialize()
+        del self.items[k]
+    def __iter__(self):
+        for k in range(len(self.items)):
+            yield self[k]
+    def append(self, v):  self.items.append(v)
+    def extend(self, vs):  self.items.extend(vs)
+    def materialize(self):
+        '''Make every item, so none depend on the mapped file'''
+        for k in range(len(self.items)):  self[k]
+
+class LazyEdges(MutableMapping):
+    '''Dict-like edge list over compressed arrays: keys (sorted), and
+    neighbours of keys[j] in nbrs[starts[j]:starts[j+1]].  A key's
+    neighbour list is made when first used, then kept, so that changes
+    to it persist.'''
+    def __init__(self, keys, starts, nbrs):
+        self.keys0, self.starts, self.nbrs = keys, starts, nbrs
+        self.lists, self.dropped, self.nNew = {}, set(), 0
+    def find(self, k):
+        '''Return index of k in keys0, or -1'''
+        j = bisect_left(self.keys0, k)
+        return j if j < len(self.keys0) and self.keys0[j] == k else -1
+    def __getitem__(self, k):
+        if k in self.lists:  return self.lists[k]
+        j = self.find(k)
+        if j < 0 or k in self.dropped:  raise KeyError(k)
+        v = self.lists[k] = list(self.nbrs[self.starts[j]:self.starts[j+1]])
+        return v
+    def __setitem__(self, k, v):
+        if k not in self.lists and self.find(k) < 0:  self.nNew += 1
+        self.lists[k] = v;  self.dropped.discard(k)
+    def __delitem__(self, k):
+        self[k]
+        del self.lists[k]
+        if self.find(k) < 0:  self.nNew -= 1
+        else:  self.dropped.add(k)
+    def __iter__(self):
+        for k in self.keys0:
+            if k not in self.dropped:  yield k
+        for k in list(self.lists):
+            if self.find(k) < 0:  yield k
+    def __len__(self):
+        return len(self.keys0) - len(self.dropped) + self.nNew
+#---------------------------------------------------------
+def pointXYZ(p):  return (p.x, p.y, p.z)
+
+def snapshotParams():
+    '''Return dict of FunctionList parameter values to save'''
+    return {k: v for k, v in vars(FunctionList).items() if not k.startswith('_')
+            and type(v) in (int, float, str, bool) and k not in notSaved}
+
+def writeSnapshot(fn, layout, params=None):
+    '''Save layout, and params (dict of parameter values; default, the
+    current ones), to snapshot file fn'''
+    params = snapshotParams() if params is None else params
+    posts, cyls = layout.posts, layout.cyls
+    arrays = {}
+    arrays['feet'] = array('d', chain.from_iterable(pointXYZ(p.foot) for p in posts))
+    if any(isinstance(p.top, Point) for p in posts):
+        arrays['tops'] = array('d', chain.from_iterable(
+            pointXYZ(p.top) if isinstance(p.top, Point) else (0, 0, 0) for p in posts))
+    arrays['angles'] = array('d', chain.from_iterable((p.yAngle, p.zAngle) for p in posts))
+    arrays['sizes'] = array('d', chain.from_iterable((p.diam, p.hite) for p in posts))
+    arrays['pnums'] = array('q', [p.num for p in posts])
+    arrays['pdata'] = array('q', [int(p.data or 0) for p in posts])
+    if any(isinstance(p.foot, IcosaGeoPoint) for p in posts):
+        arrays['geo'] = array('q', chain.from_iterable(
+            (-1 if getattr(p.foot, a, None) is None else getattr(p.foot, a) for a in geoFields)
+            for p in posts))
+    ends, letters, diams, gaps, cdata, cnums = array('q'), [], array('d'), array('d'), array('q'), array('q')
+    for c in cyls:
+        ends.append(c.post1);  ends.append(c.post2)
+        letters.append(c.lev1 + c.lev2 + c.colo)
+        diams.append(c.diam);  gaps.append(c.gap)
+        cdata.append(int(c.data or 0));  cnums.append(c.num)
+    arrays.update(ends=ends, letters=array('b', ''.join(letters).encode()),
+                  diams=diams, gaps=gaps, cdata=cdata, cnums=cnums)
+    keys = sorted(layout.edgeList)
+    arrays['ekeys'] = array('q', keys)
+    arrays['estarts'] = array('q', [0])
+    arrays['enbrs'] = array('q')
+    for k in keys:
+        arrays['enbrs'].extend(layout.edgeList[k])
+        arrays['estarts'].append(len(arrays['enbrs']))
+    if getattr(layout, 'faces', None) is not None:
+        arrays['fverts'] = array('q', chain.from_iterable(layout.faces))
+        arrays['fstarts'] = array('q', accumulate(map(len, layout.faces), initial=0))
+    lo = layout
+    head = {'byteorder': sys.byteorder, 'posts': len(posts), 'cyls': len(cyls),
+            'params': params, 'BP': pointXYZ(lo.BP), 'OP': pointXYZ(lo.OP),
+            'instances': lo.instances,
+            'geodesic': {name: pointXYZ(getattr(lo, name)) for name in
+                         ('clip1', 'clip2', 'rotavec') if hasattr(lo, name)},
+            'arrays': []}
+    off = 0
+    for name, a in arrays.items():
+        head['arrays'].append((name, a.typecode, len(a), off))
+        off += -(-len(a)*a.itemsize//8)*8   # Round up to multiple of 8
+    text = json.dumps(head).encode() + b'\n'
+    start = -(-(len(fileTag) + len(text))//8)*8
+    tmp = f'{fn}.{os.getpid()}'
+    with open(tmp, 'wb') as fout:
+        fout.write(fileTag + text)
+        for (name, typecode, n, off), a in zip(head['arrays'], arrays.values()):
+            fout.seek(start + off)
+            a.tofile(fout)
+    os.replace(tmp, fn)
+#---------------------------------------------------------
+def readSnapshot(fn, useMmap=True):
+    '''Return (layout, params) from snapshot file fn.  If useMmap, the
+    file is memory-mapped and layout's posts and cyls are LazyLists;
+    else arrays are read in full.'''
+    with open(fn, 'rb') as fin:
+        if fin.readline() != fileTag:
+            raise ValueError(f'{fn} is not a pypevue layout snapshot')
+        head = json.loads(fin.readline())
+        start = -(-fin.tell()//8)*8
+        swap = head['byteorder'] != sys.byteorder
+        cols = {}
+        if useMmap and not swap:
+            mm = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mm)
+            for name, typecode, n, off in head['arrays']:
+                size = array(typecode).itemsize
+                cols[name] = view[start+off : start+off+n*size].cast(typecode)
+        else:
+            for name, typecode, n, off in head['arrays']:
+                fin.seek(start + off)
+                cols[name] = a = array(typecode)
+                a.fromfile(fin, n)
+                if swap:  a.byteswap()
+    feet, tops, angles, sizes = cols['feet'], cols.get('tops'), cols['angles'], cols['sizes']
+    pnums, pdata, geo = cols['pnums'], cols['pdata'], cols.get('geo')
+    def makePost(k):
+        x, y, z = feet[3*k], feet[3*k+1], feet[3*k+2]
+        if geo is not None:
+            g = [None if v < 0 else v for v in geo[8*k:8*k+8]]
+            foot = IcosaGeoPoint(x, y, z, *g)  # Args in geoFields order
+        else:
+            foot = Point(x, y, z)
+        top = Point(tops[3*k], tops[3*k+1], tops[3*k+2]) if tops is not None else 0
+        return Post(foot, top, sizes[2*k], sizes[2*k+1], angles[2*k], angles[2*k+1],
+                    pnums[k], pdata[k])
+    ends, letters, diams, gaps = cols['ends'], cols['letters'], cols['diams'], cols['gaps']
+    cdata, cnums = cols['cdata'], cols['cnums']
+    def makeCyl(k):
+        c = Cylinder.__new__(Cylinder)
+        l = bytes(letters[3*k:3*k+3]).decode()
+        c.put9(ends[2*k], ends[2*k+1], l[0], l[1], l[2], diams[k], gaps[k], cdata[k], cnums[k])
+        return c
+    nPosts, nCyls = head['posts'], head['cyls']
+    edgeList = LazyEdges(cols['ekeys'], cols['estarts'], cols['enbrs'])
+    if useMmap:
+        posts, cyls = LazyList(nPosts, makePost), LazyList(nCyls, makeCyl)
+    else:
+        posts = [makePost(k) for k in range(nPosts)]
+        cyls = [makeCyl(k) for k in range(nCyls)]
+        edgeList = dict(edgeList)
+    lo = Layout(Point(*head['BP']), Point(*head['OP']), posts, cyls, edgeList)
+    lo.instances = head['instances']
+    if 'fverts' in cols:
+        fverts, fstarts = cols['fverts'], cols['fstarts']
+        lo.faces = [list(fverts[fstarts[j]:fstarts[j+1]]) for j in range(len(fstarts)-1)]
+    for name, xyz in head['geodesic'].items():
+        setattr(lo, name, Point(*xyz))
+    return lo, head['params']
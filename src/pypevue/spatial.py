@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+'''Spatial-search helpers for pypevue: a uniform-grid spatial hash for
+welding together points that lie within a tolerance of each other.
+
+Points are bucketed into cubic cells of side 2*tol, keyed by integer
+cell coordinates.  A point can only be within tol of points in its
+own cell or in the 7 cells next to the cell corner it is nearest, so
+each lookup examines a small, bounded number of candidates and
+welding n points takes expected time O(n) instead of the O(n^2) of
+all-pairs comparison.'''
+
+from math import floor
+#---------------------------------------------------------
+def weldPoints(coords, tol):
+    '''Weld points that are within distance tol of each other.  coords
+    is a flat sequence of x,y,z values (3 per point).  Returns (remap,
+    reps): remap[k] is the new index of point k, and reps lists, in
+    order of first appearance, the old index of the point that
+    represents each group of welded points.  Each point is welded to
+    an earlier representative within tol of it, if there is one.  tol
+    should be > 0.    '''
+    cells = {}                  # cell key -> list of rep numbers
+    remap, reps = [0]*(len(coords)//3), []
+    c = coords.tolist() if hasattr(coords, 'tolist') else coords
+    tol2, inv = tol*tol, 0.5/tol
+    for n in range(len(remap)):
+        x, y, z = c[3*n], c[3*n+1], c[3*n+2]
+        fx, fy, fz = x*inv, y*inv, z*inv
+        cx, cy, cz = floor(fx), floor(fy), floor(fz)
+        # Cells have side 2*tol, so points within tol of x,y,z are in
+        # its own cell or in neighbours on the sides it is nearer to.
+        dx = 1 if fx-cx >= 0.5 else -1
+        dy = 1 if fy-cy >= 0.5 else -1
+        dz = 1 if fz-cz >= 0.5 else -1
+        found = -1
+        for key in ((cx,cy,cz), (cx+dx,cy,cz), (cx,cy+dy,cz), (cx,cy,cz+dz),
+                    (cx+dx,cy+dy,cz), (cx+dx,cy,cz+dz), (cx,cy+dy,cz+dz),
+                    (cx+dx,cy+dy,cz+dz)):
+            for r in cells.get(key, ()):
+                q = 3*reps[r]
+                ex, ey, ez = c[q]-x, c[q+1]-y, c[q+2]-z
+                if ex*ex + ey*ey + ez*ez <= tol2:
+                    found = r;  break
+            if found >= 0: break
+        if found < 0:           # No rep nearby, so point is a new rep
+            found = len(reps)
+            reps.append(n)
+            cells.setdefault((cx, cy, cz), []).append(found)
+        remap[n] = found
+    return remap, reps
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+'''Cylinder spool for streaming output (parameter stream=t).
+
+A CylSpool stands in for the LO.cyls list: cylinders appended to it
+are packed into fixed-size binary records, buffered, and written to
+an unnamed temporary file in blocks, so a script's cylinders take
+constant memory no matter how many there are.  len(), iteration, and
+slices work as for a list; a slice or a block of an iteration reads
+just its own records back, as new Cylinder objects, via os.pread, so
+that forked output workers can read chunks concurrently.  Thus
+cylinders flow from script parsing through to output in chunks of
+chunkSize records.
+
+Records hold post1, post2, lev1, lev2, colo, diam, gap, data, and num;
+data is kept as an int.  Changes made to cylinders read back from a
+spool don't change the spool.'''
+
+import os, struct, tempfile
+from pypevue import Cylinder
+
+recFormat = struct.Struct('<qq3sddqq')
+#---------------------------------------------------------
+class CylSpool:
+    def __init__(self, cyls=(), bufMax=4096):
+        self.file = tempfile.TemporaryFile()
+        self.n, self.nFile = 0, 0       # records in all; in file
+        self.buf, self.bufMax = [], bufMax
+        self.extend(cyls)
+    def append(self, c):
+        self.buf.append(recFormat.pack(c.post1, c.post2,
+            (c.lev1 + c.lev2 + c.colo).encode(), c.diam, c.gap,
+            int(c.data or 0), c.num))
+        self.n += 1
+        if len(self.buf) >= self.bufMax:  self.flush()
+    def extend(self, cyls):
+        for c in cyls:  self.append(c)
+    def flush(self):
+        '''Write buffered records to the spool file'''
+        if self.buf:
+            os.pwrite(self.file.fileno(), b''.join(self.buf), self.nFile*recFormat.size)
+            self.nFile += len(self.buf);  self.buf = []
+    def __len__(self):  return self.n
+    def read(self, lo, hi):
+        '''Return list of Cylinders for records lo to hi-1'''
+        self.flush()
+        lo, hi = max(0, lo), min(hi, self.n)
+        if lo >= hi: return []
+        size = recFormat.size
+        data = os.pread(self.file.fileno(), (hi-lo)*size, lo*size)
+        out = []
+        for post1, post2, lcc, diam, gap, data, num in recFormat.iter_unpack(data):
+            c = Cylinder.__new__(Cylinder)
+            l = lcc.decode()
+            c.put9(post1, post2, l[0], l[1], l[2], diam, gap, data, num)
+            out.append(c)
+        return out
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            lo, hi, step = k.indices(self.n)
+            return self.read(lo, hi)[::step]
+        if k < 0:  k += self.n
+        if not 0 <= k < self.n:  raise IndexError('spool index out of range')
+        return self.read(k, k+1)[0]
+    def __iter__(self):
+        for lo in range(0, self.n, self.bufMax):
+            yield from self.read(lo, lo+self.bufMax)
+    def close(self):
+        self.file.close()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+'''Content-addressed on-disk cache for expensive pypevue pipeline
+stages, eg geodesic generation (layout code G), autoAdder
+triangulation, and OBJ parsing.
+
+A stage's cache key is a hash of the stage name, its code version,
+the machine byte order, and its inputs (see stageKey), so a cache entry
+is reused only when all of those are unchanged.  Each entry is one
+file in directory FunctionList.cacheDir (no caching happens if that
+is empty), holding a json line of metadata and then a few flat
+binary arrays from the array module.  Entries are written under a
+temporary name and then renamed, so readers never see partial files.
+
+The cache is kept under FunctionList.cacheMax megabytes by evicting
+least-recently-used entries: a hit touches its file's modification
+time, and store() removes entries with the oldest times when the
+total is over the cap.  Counts of hits, misses, stores, and evictions
+are kept in dict stats.'''
+
+import os, sys, json, hashlib
+from array import array
+from pypevue import FunctionList
+
+fileTag = b'PVSTAGE\n'
+stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+#---------------------------------------------------------
+def cacheDirectory():
+    '''Return name of on-disk cache directory, or None if none is set'''
+    d = getattr(FunctionList, 'cacheDir', '')
+    return os.path.expanduser(d) if d else None
+
+def stageKey(stage, version, *inputs):
+    '''Return hex hash of stage name, version, byte order, and inputs.
+    Inputs that are arrays or bytes are hashed as raw bytes; others
+    are hashed via repr().'''
+    h = hashlib.sha1(f'{stage} {version} {sys.byteorder}'.encode())
+    for u in inputs:
+        h.update(b'\0')
+        h.update(u.tobytes() if isinstance(u, array) else
+                 u if isinstance(u, bytes) else repr(u).encode())
+    return h.hexdigest()
+
+def entryName(stage, key):
+    cdir = cacheDirectory()
+    return os.path.join(cdir, f'{stage}-{key}.pvc') if cdir else None
+#---------------------------------------------------------
+def load(stage, key):
+    '''Return (meta, arrays) for cache entry of stage and key, or None
+    if there isn't one (or it can't be read).  arrays is a dict
+    mapping names to arrays.'''
+    fn = entryName(stage, key)
+    if fn:
+        try:
+            with open(fn, 'rb') as fin:
+                if fin.readline() != fileTag:
+                    raise ValueError(f'{fn} is not a stage-cache file')
+                head = json.loads(fin.readline())
+                arrays = {}
+                for name, typecode, n in head['arrays']:
+                    arrays[name] = a = array(typecode)
+                    a.fromfile(fin, n)
+            os.utime(fn)        # Mark as recently used
+            stats['hits'] += 1
+            return head['meta'], arrays
+        except (OSError, ValueError, EOFError, KeyError):
+            pass                # Missing or unreadable; recompute
+    stats['misses'] += 1
+    return None
+
+def store(stage, key, meta, arrays):
+    '''Save meta (json-able data) and arrays (dict of names to arrays)
+    as cache entry for stage and key, then evict old entries if the
+    cache is over its size cap.  Failures to write are reported, not
+    raised, since the cache is optional.'''
+    fn = entryName(stage, key)
+    if not fn: return
+    head = json.dumps({'meta': meta, 'arrays':
+                       [(name, a.typecode, len(a)) for name, a in arrays.items()]})
+    tmp = f'{fn}.{os.getpid()}'
+    try:
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        with open(tmp, 'wb') as fout:
+            fout.write(fileTag + head.encode() + b'\n')
+            for a in arrays.values():
+                a.tofile(fout)
+        os.replace(tmp, fn)     # Readers never see a partial file
+        stats['stores'] += 1
+    except OSError as e:
+        print (f'Could not cache {stage} data in {os.path.dirname(fn)}: {e}')
+        return
+    evict(float(getattr(FunctionList, 'cacheMax', 0)) * (1 << 20))
+
+def evict(capBytes):
+    '''Remove least-recently-used entries until the cache holds at most
+    capBytes bytes; no limit if capBytes <= 0'''
+    cdir = cacheDirectory()
+    if capBytes <= 0 or not cdir: return
+    entries = []
+    with os.scandir(cdir) as it:
+        for e in it:
+            if e.name.endswith('.pvc'):
+                st = e.stat()
+                entries.append((st.st_mtime_ns, st.st_size, e.path))
+    total = sum(size for t, size, path in entries)
+    for t, size, path in sorted(entries):
+        if total <= capBytes: break
+        try:
+            os.remove(path)
+            stats['evictions'] += 1
+        except OSError:
+            pass
+        total -= size
+
+def statsText():
+    '''Return a one-line summary of cache counts'''
+    return ',  '.join(f'{n} {k}' for k, n in stats.items())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+'''Strut-class analysis for pypevue layouts, eg geodesic domes made
+by layout code G.
+
+strutClasses() groups edges into strut classes by length: it sorts
+edge numbers by length and starts a new class wherever a length
+exceeds the first length of the current class by more than a relative
+tolerance.  That takes O(E log E) time for E edges, rather than a
+comparison of each edge against every class.  valenceCounts() counts
+hubs by number of struts meeting at them, and cutListText() formats
+classes and hub counts as a cut list for builders.
+
+hubAngles() computes connector angles, ie nutation and precession as
+in Point.nutation and Point.precession, for every strut end at every
+hub in one pass, with per-hub vectors computed once per hub and plain
+float arithmetic in place of temporary Points.  hubAnglesCSV() makes a
+table of the results for connector fabrication.'''
+
+from math import sqrt, asin, pi, degrees, nan
+from collections import Counter
+from pypevue import Point
+#---------------------------------------------------------
+def strutLengths(points, ends1, ends2):
+    '''Return list of lengths of edges from points[ends1[e]] to
+    points[ends2[e]]; points have x, y, z attributes.'''
+    out = []
+    for a, b in zip(ends1, ends2):
+        p, q = points[a], points[b]
+        dx, dy, dz = p.x-q.x, p.y-q.y, p.z-q.z
+        out.append(sqrt(dx*dx + dy*dy + dz*dz))
+    return out
+#---------------------------------------------------------
+def strutClasses(lengths, tol):
+    '''Group lengths into classes, numbered from 0 in order of
+    increasing length.  A class includes lengths up to (1+tol) times
+    its shortest length.  Returns (classOf, classes): classOf[e] is
+    the class of lengths[e], and classes[c] is a pair (mean length,
+    count) for class c.'''
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    classOf, classes = [0]*len(lengths), []
+    top, tot, n = -1, 0, 0      # top = longest length in current class
+    for e in order:
+        L = lengths[e]
+        if L > top:             # Start a new class?
+            if n:  classes.append((tot/n, n))
+            top, tot, n = L*(1+tol), 0, 0
+        classOf[e] = len(classes)
+        tot += L;  n += 1
+    if n:  classes.append((tot/n, n))
+    return classOf, classes
+#---------------------------------------------------------
+def valenceCounts(ends1, ends2):
+    '''Return dict mapping valence v to number of hubs with v struts'''
+    return dict(sorted(Counter(Counter(ends1 + ends2).values()).items()))
+#---------------------------------------------------------
+def cutListText(classes, valences, scale=1):
+    '''Return text of a cut list, with a line per strut class (name,
+    length times scale, count) and a line of hub counts by valence'''
+    out = ['Strut  Length      Count']
+    for c, (L, n) in enumerate(classes):
+        out.append(f'{className(c):5}  {L*scale:<10.4f}  {n}')
+    out.append(f'Total  {sum(n for L, n in classes)} struts in {len(classes)} classes')
+    out.append('Hubs   ' + ',  '.join(f'{n} of valence {v}' for v, n in valences.items()))
+    return '\n'.join(out) + '\n'
+
+def className(c):
+    '''Return name for class number c: A, B, ... Z, AA, AB, ...'''
+    name = ''
+    while True:
+        name = chr(ord('A') + c%26) + name
+        c = c//26 - 1
+        if c < 0: return name
+#---------------------------------------------------------
+def hubAngles(points, edgeList):
+    '''Return (hubs, nbrs, nutations, precessions), lists with an entry
+    for each hub j and each neighbour k of j in edgeList, in order by
+    j and then k.  Angles are in degrees, and match those from
+    points[j].nutation(points[k]) and points[j].precession(points[k]),
+    with the sphere centered at the origin.  Angles that those methods
+    cannot compute (eg for a zero-length strut) are nan.    '''
+    hubs, nbrs, nuts, precs = [], [], [], []
+    dx = 0.1
+    for j in sorted(edgeList):
+        p = points[j];  px, py, pz = p.x, p.y, p.z
+        pm = sqrt(px*px + py*py + pz*pz)
+        nx, ny, nz = (px/pm, py/pm, pz/pm) if pm else (0, 0, 0)
+        # Get normal c of plane of reference for precession, and p x c
+        if -dx < px < dx and -dx < py < dx:
+            cx, cy, cz = -1, 0, 0
+        else:                   # c = 2 p x t, t = point on tangent line
+            tx, ty, tz = px-py, py+px, pz
+            cx, cy, cz = 2*(py*tz-pz*ty), 2*(pz*tx-px*tz), 2*(px*ty-py*tx)
+        cm = sqrt(cx*cx + cy*cy + cz*cz)
+        ex, ey, ez = py*cz-pz*cy, pz*cx-px*cz, px*cy-py*cx
+        for k in sorted(edgeList[j]):
+            q = points[k]
+            ux, uy, uz = q.x-px, q.y-py, q.z-pz      # u = q-p
+            um = sqrt(ux*ux + uy*uy + uz*uz)
+            hubs.append(j);  nbrs.append(k)
+            if not (um and pm):
+                nuts.append(nan);  precs.append(nan);  continue
+            dot = nx*ux + ny*uy + nz*uz
+            nut = asin(min(1, abs(dot)/um))
+            nuts.append(degrees(-nut if dot < 0 else nut))
+            # m = part of u in tangent plane at p; angle is from c to m
+            mx, my, mz = ux-dot*nx, uy-dot*ny, uz-dot*nz
+            mm = sqrt(mx*mx + my*my + mz*mz)
+            if not (mm and cm):
+                precs.append(nan);  continue
+            angle = asin(min(1, abs(cx*mx + cy*my + cz*mz)/(cm*mm)))
+            rx, ry, rz = px+mx, py+my, pz+mz          # projection of q
+            if cx*rx + cy*ry + cz*rz >= 0:   # 0-180 degrees
+                if ex*rx + ey*ry + ez*rz > 0:  angle = pi - angle
+            else:                            # 180-360 degrees
+                if ex*rx + ey*ry + ez*rz < 0:  angle = pi - angle
+                angle += pi
+            if angle >= 2*pi:  angle -= 2*pi
+            precs.append(degrees(angle))
+    return hubs, nbrs, nuts, precs
+#---------------------------------------------------------
+def hubAnglesCSV(table):
+    '''Return CSV text, with a header line, for a table from hubAngles'''
+    return 'hub,nbr,nutation,precession\n' + ''.join(
+        f'{j},{k},{n:.4f},{p:.4f}\n' for j, k, n, p in zip(*table))
+
+def layoutHubAngles(layout):
+    '''Return hubAngles table for layout's posts, with post feet taken
+    relative to layout.OP, and struts given by layout's cylinders'''
+    O = layout.OP
+    pts = [Point(p.foot.x-O.x, p.foot.y-O.y, p.foot.z-O.z) for p in layout.posts]
+    edges = {}
+    for c in layout.cyls:
+        if c.post1 != c.post2 and max(c.post1, c.post2) < len(pts):
+            edges.setdefault(c.post1, set()).add(c.post2)
+            edges.setdefault(c.post2, set()).add(c.post1)
+    return hubAngles(pts, edges)
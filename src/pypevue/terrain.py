@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+'''Terrain (point-cloud) generator for pypevue, for trying out
+triangulation functionality and timing.  This is a bulk version of
+makeBaseData from examples/eg-zrough3e.py, and makes the same points.
+
+makeTerrain(ngrid, edgew, paramsets, smooth) evaluates parametric
+curves in (-1,1)x(-1,1) and histograms the points they pass through
+into a square grid of z counts; then it smooths the grid, and returns
+a flat list of x,y,z values (3 per point) for grid cells whose z
+differs from their neighbours'.  Curve points are computed via map()
+chains over all t values at once and counted via a Counter, rather
+than one at a time; smoothing works on a flat list of cells.
+
+The points can be written as a pypevu script by writeScript, in one
+write, or added to the layout directly by the zrough user function:
+with `=P Plugins=pypevue.terrain` in a script, a layout line like
+`=L U zrough 50 2 1 0 1 4;` adds posts for grid size 50, trapi 2,
+tpow 1, tadd 0, tmul 1, and 4 smoothing sweeps.  -- See
+eg-zrough3e.py for more about parameters.'''
+
+from math import pi, sin, cos
+from array import array
+from itertools import repeat
+from operator import add, mul, truediv
+from collections import Counter
+from pypevue import FunctionList
+#---------------------------------------------------------
+def sampleCurves(ngrid, edgew, paramsets):
+    '''Return (zc, scell): zc is a flat list of scell*scell counts, with
+    cell (j,k) at zc[j*scell+k], of points of curves (cos(t),
+    sin(tmul*t**tpow+tadd)) for t from 0 to trapi*pi, in cells at
+    indices edgew to edgew+ngrid.  Each tuple in paramsets has values
+    for trapi, tpow, tadd, tmul.'''
+    snil  = edgew + ngrid//2  # Zero is at center of banded grid
+    edgeu = edgew + ngrid     # Upper edge of grid
+    scell = 2*snil + 1        # Want odd cell count for smoothing
+    sstep = 2/ngrid           # x or y step per cell with (-1,1) range
+    zc = [0]*(scell*scell)
+    for trapi, tpow, tadd, tmul in paramsets:
+        ntvals = int(trapi*ngrid*ngrid)
+        tstep = trapi*pi/ntvals
+        print (f'Processing t from 0 to {trapi}*pi in {ntvals} steps;  tpow {tpow}, tmul {tmul}, tadd {tadd}')
+        ts = list(map(mul, range(ntvals), repeat(tstep)))
+        ys = map(sin, map(add, map(mul, map(pow, ts, repeat(tpow)), repeat(tmul)), repeat(tadd)))
+        ixs = map(int, map(truediv, map(cos, ts), repeat(sstep)))
+        iys = map(int, map(truediv, ys, repeat(sstep)))
+        # Since |cos| and |sin| <= 1, cells are within the grid, so
+        # code cell (snil+ix, snil+iy) as one int and count codes
+        base = snil*scell + snil
+        for c, n in Counter(map(add, map(mul, ixs, repeat(scell)), iys)).items():
+            zc[base+c] += n
+    return zc, scell
+#---------------------------------------------------------
+def relax(zc, scell, smooth):
+    '''Smooth flat grid zc in place via smooth relaxation sweeps, each
+    moving cell values toward the mean of a cell and 3 neighbours'''
+    x = y = 1;  dj = dk = 1
+    # Both ranges are odd in size so a cell's x,y differs each sweep
+    for sweepn in range(smooth):
+        dj, dk = -dk, dj
+        for aj in range(1, scell-1):
+            j = aj if dj>0 else scell-1-aj
+            row = j*scell
+            for ak in range(1, scell-1):
+                k = ak if dk>0 else scell-1-ak
+                x, y = -y, x    # Gen.  -+  --  +-  ++  sequence
+                # Kernel has 1 diagonal nbr and 2 opposite adjacent
+                c, d, a, b = row+k, row+x*scell+k+y, row-x*scell+k, row+k-y
+                tot = zc[c] + zc[d] + zc[a] + zc[b]
+                qot = tot//4
+                if qot:
+                    zc[d] = zc[a] = zc[b] = qot
+                    zc[c] = tot-3*qot
+#---------------------------------------------------------
+def boxSmooth(zc, scell, passes):
+    '''Smooth flat grid zc in place via passes of a 3x3 box filter
+    (integer mean of a cell and its 8 neighbours) on interior cells.
+    Each pass works on whole rows via map() over shifted slices.'''
+    for p in range(passes):
+        rows = [zc[j*scell:(j+1)*scell] for j in range(scell)]
+        hs = [list(map(add, map(add, r[:-2], r[1:-1]), r[2:])) for r in rows]
+        for j in range(1, scell-1):
+            tot = map(add, map(add, hs[j-1], hs[j]), hs[j+1])
+            zc[j*scell+1:(j+1)*scell-1] = map(int.__floordiv__, tot, repeat(9))
+#---------------------------------------------------------
+def edgePoints(zc, scell):
+    '''Return flat list of j,k,z values for interior cells (j,k) whose
+    z differs from cells at j+1 and k+1, or from cells at j-1 and k-1'''
+    out = []
+    for j in range(1, scell-1):
+        r, rd, ru = j*scell, (j-1)*scell, (j+1)*scell
+        for k in range(1, scell-1):
+            z = zc[r+k]
+            if z != zc[ru+k] and z != zc[r+k+1] or z != zc[rd+k] and z != zc[r+k-1]:
+                out += (j, k, z)
+    return out
+#---------------------------------------------------------
+def makeTerrain(ngrid, edgew, paramsets, smooth, kernel='relax'):
+    '''Make a square grid of cells, set z counts in it from parametric
+    curves, smooth it, and return a flat list of x,y,z values of
+    points (see edgePoints).  kernel is 'relax' for relaxation sweeps
+    as in eg-zrough3e.py, or 'box' for 3x3 box-filter passes.'''
+    zc, scell = sampleCurves(ngrid, edgew, paramsets)
+    (boxSmooth if kernel=='box' else relax)(zc, scell, smooth)
+    return edgePoints(zc, scell)
+#---------------------------------------------------------
+def writeScript(fn, coords):
+    '''Write coords (flat x,y,z list) to binary file fn.f64, and write
+    file fn as a pypevu script that makes posts at those points (via
+    layout code F) and triangulates them; return number of points
+    written.'''
+    with open(f'{fn}.f64', 'wb') as f:
+        array('d', coords).tofile(f)
+    with open(fn, 'w') as f:
+        # Make autoMax non-zero so writeCylinders doesn't close module
+        f.write(f'=P Plugins=examples.autoAdder3e\n=P postHi=.4     postDiam=.4   autoList=f   pDiam=.3  autoMax=1\n=L F {fn}.f64;\n=C Bpbb 0 0;\n')
+    return len(coords)//3
+#---------------------------------------------------------
+def zrough(ngrid=20, trapi=2, tpow=1, tadd=0, tmul=1, smooth=4, edgew=10):
+    '''Add terrain posts (see makeTerrain) to the layout, relative to
+    the base point, as with layout code C.  Returns number of posts
+    added.'''
+    ref = FunctionList
+    coords = makeTerrain(int(ngrid), int(edgew), [(trapi, tpow, tadd, tmul)], int(smooth))
+    ref.addPosts(coords)
+    return len(coords)//3
+#---------------------------------------------------------
+def tell(): return (zrough,)
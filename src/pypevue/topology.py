@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+'''Topology report for pypevue layouts: connected components, hub
+valences, duplicate struts, boundary loops, and Euler characteristic
+per component, computed from a Layout's posts and cylinders (unlike
+examples/euler-calc.sh, which counts lines of SCAD output and assumes
+one closed surface).
+
+Struts are the distinct post pairs joined by cylinders; cylinders
+beyond the first on a pair count as duplicates, and cylinders from a
+post to itself are ignored.  Faces are taken to be the triangles of
+the strut graph, as in geodesic and autoAdder layouts, except that a
+layout may record some faces (layout.faces, eg the hexagons and
+pentagons made by layout code V); those of them whose edges are all
+struts are used, along with the triangles of the struts not on them.
+Triangles on each strut are counted by intersecting the neighbour
+sets of its ends, which takes O(E*d) time for E struts and maximum
+valence d, ie linear time for domes.  A strut on one face is a
+boundary strut, one on no face is a wire, and one on more than two
+faces is non-manifold.  Components come from union-find over struts,
+and boundary loops from union-find over boundary struts.
+
+For a component made of faces, chi = V - E + F should be 2 - 2g - b
+for genus g and b boundary loops, eg 2 for a closed dome and 1 for an
+open cap.  Parameter topoCheck=report prints the report, and
+topoCheck=strict also ends the run with an error if there are
+duplicate or non-manifold struts, or a surface component whose chi
+and loops don't fit that formula.'''
+
+from collections import Counter
+from pypevue import FunctionList
+#---------------------------------------------------------
+def findRoot(parent, k):
+    '''Return root of k in union-find forest parent, halving paths'''
+    while parent[k] != k:
+        parent[k] = k = parent[parent[k]]
+    return k
+
+def unionAll(parent, pairs):
+    '''Join the sets of a and b in parent for each pair a, b'''
+    for a, b in pairs:
+        ra, rb = findRoot(parent, a), findRoot(parent, b)
+        if ra != rb:
+            if ra < rb:  parent[rb] = ra
+            else:        parent[ra] = rb
+#---------------------------------------------------------
+def graphTopology(nPosts, ends1, ends2, faces=None):
+    '''Return topology dict for a graph of nPosts posts with edges from
+    ends1[e] to ends2[e], whose faces are the given faces (lists of
+    post numbers), if any, and the triangles of the other struts.  Keys: posts, struts, duplicates, selfLoops,
+    valences (dict of valence: count), nonManifold, and components (a
+    list of dicts with keys first, posts, struts, faces, boundary,
+    wires, loops, and chi, in order by first post number).'''
+    n = nPosts
+    codes = Counter(a*n + b if a < b else b*n + a for a, b in zip(ends1, ends2)
+                    if a != b and a < n and b < n)
+    selfLoops = sum(1 for a, b in zip(ends1, ends2) if a == b)
+    duplicates = sum(codes.values()) - len(codes)
+    nbrs = [set() for k in range(n)]
+    pairs = [divmod(code, n) for code in codes]
+    for a, b in pairs:
+        nbrs[a].add(b);  nbrs[b].add(a)
+    parent = list(range(n))
+    unionAll(parent, pairs)
+    comps = {}
+    for k in range(n):
+        r = findRoot(parent, k)
+        if r not in comps:
+            comps[r] = {'first': r, 'posts': 0, 'struts': 0, 'faces': 0,
+                        'boundary': 0, 'wires': 0, 'loops': 0}
+        comps[r]['posts'] += 1
+    # Struts on given faces are on those faces.  The faces on another
+    # strut a-b are the triangles a-b-c for c in both neighbour sets,
+    # counting only struts not on given faces.  Each triangle is
+    # counted at its three struts, and each given face three times at
+    # its first post.
+    onFace, tnbrs = Counter(), nbrs
+    if faces:
+        for vs in faces:
+            onFace.update(min(u, v)*n + max(u, v) for u, v in zip(vs, vs[1:] + vs[:1]))
+            comps[findRoot(parent, vs[0])]['faces'] += 3
+        tnbrs = [set() for k in range(n)]
+        for a, b in pairs:
+            if a*n + b not in onFace:
+                tnbrs[a].add(b);  tnbrs[b].add(a)
+    nonManifold, bEnds = 0, []
+    for a, b in pairs:
+        c = comps[findRoot(parent, a)]
+        f = onFace.get(a*n + b)
+        if f is None:
+            f = len(tnbrs[a] & tnbrs[b])
+            c['faces'] += f
+        c['struts'] += 1
+        if f == 0:    c['wires'] += 1
+        elif f == 1:  c['boundary'] += 1;  bEnds.append((a, b))
+        elif f > 2:   nonManifold += 1
+    bpar = list(range(n))       # Boundary loops: components of boundary struts
+    unionAll(bpar, bEnds)
+    for r in {findRoot(bpar, a) for a, b in bEnds}:
+        comps[findRoot(parent, r)]['loops'] += 1
+    for c in comps.values():
+        c['faces'] //= 3
+        c['chi'] = c['posts'] - c['struts'] + c['faces']
+    return {'posts': n, 'struts': len(codes), 'duplicates': duplicates,
+            'selfLoops': selfLoops, 'nonManifold': nonManifold,
+            'valences': dict(sorted(Counter(map(len, nbrs)).items())),
+            'components': sorted(comps.values(), key=lambda c: c['first'])}
+
+def recordedFaces(layout, ends1, ends2):
+    '''Return list of layout's recorded faces whose edges are all struts
+    (from ends1[e] to ends2[e]), or None if it has no recorded faces'''
+    faces, n = getattr(layout, 'faces', None), len(layout.posts)
+    if faces is None: return None
+    struts = set(zip(ends1, ends2))     # Skip faces that lost posts or struts
+    return [vs for vs in faces if len(vs) > 2 and max(vs) < n and
+            all((u, v) in struts or (v, u) in struts for u, v in zip(vs, vs[1:] + vs[:1]))]
+
+def layoutTopology(layout):
+    '''Return graphTopology dict for layout's posts and cylinders, and
+    its recorded faces, if any'''
+    cyls = layout.cyls
+    ends1, ends2 = [c.post1 for c in cyls], [c.post2 for c in cyls]
+    return graphTopology(len(layout.posts), ends1, ends2,
+                         recordedFaces(layout, ends1, ends2))
+#---------------------------------------------------------
+def componentKind(c):
+    '''Return 'post', 'wire', or 'surface' for a component dict'''
+    if c['posts'] == 1:  return 'post'
+    return 'surface' if c['faces'] else 'wire'
+
+def topologyProblems(topo):
+    '''Return list of messages about broken invariants in topo'''
+    out = []
+    if topo['duplicates']:
+        out.append(f"{topo['duplicates']} duplicate cylinders")
+    if topo['nonManifold']:
+        out.append(f"{topo['nonManifold']} struts on more than two faces")
+    for c in topo['components']:
+        twoG = 2 - c['chi'] - c['loops']        # Twice the genus
+        if componentKind(c) == 'surface' and not c['wires'] and (twoG < 0 or twoG % 2):
+            out.append(f"component at post {c['first']} has chi {c['chi']} "
+                       f"and {c['loops']} boundary loops")
+    return out
+
+def topologyText(topo, maxComps=20):
+    '''Return text of a topology report, listing at most maxComps
+    components that are not single posts'''
+    comps = topo['components']
+    kinds = Counter(componentKind(c) for c in comps)
+    out = [f"Topology: {topo['posts']} posts, {topo['struts']} struts, "
+           f"{topo['duplicates']} duplicate and {topo['selfLoops']} zero-length cylinders",
+           f"Components: {len(comps)} ({kinds['surface']} surface, "
+           f"{kinds['wire']} wire, {kinds['post']} lone posts)",
+           'Valences: ' + ',  '.join(f'{n} of {v}' for v, n in topo['valences'].items())]
+    shown = [c for c in comps if c['posts'] > 1]
+    for c in shown[:maxComps]:
+        out.append(f"  from post {c['first']:<6} V {c['posts']}  E {c['struts']}  "
+                   f"F {c['faces']}  chi {c['chi']}  boundary loops {c['loops']}  "
+                   f"boundary struts {c['boundary']}  wires {c['wires']}")
+    if len(shown) > maxComps:
+        out.append(f'  ... and {len(shown)-maxComps} more components')
+    return '\n'.join(out) + '\n'
+#---------------------------------------------------------
+def checkTopology(layout):
+    '''Print topology report for layout; if topoCheck is strict,
+    return list of problems found, else an empty list'''
+    ref = FunctionList
+    mode = ref.topoCheck
+    if mode not in ('report', 'strict'):
+        print (f'=  Error: topoCheck={mode} is not report or strict')
+        return []
+    topo = layoutTopology(layout)
+    print (topologyText(topo), end='')
+    problems = topologyProblems(topo)
+    for p in problems:
+        print (f'Anomaly: {p}')
+    return problems if mode == 'strict' else []
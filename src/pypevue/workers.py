@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+'''Helpers for spreading pypevu work across worker processes.
+
+mapRanges() splits an index range into chunks and applies a function
+to each chunk, either in this process or on a pool of worker
+processes.  Workers are forked from the current process when a pool
+is made, so they see pypevu's data (eg FunctionList.LO, plugins, and
+parameters) as it is at that moment, read-only, without pickling it.
+Results come back in chunk order, so output written from them is
+identical to output from sequential processing.  Where fork is not
+available (eg Windows), work is done sequentially.'''
+
+import multiprocessing
+#---------------------------------------------------------
+def chunkRanges(lo, hi, size):
+    '''Return list of (a,b) pairs that split range [lo,hi) into chunks
+    of at most size items'''
+    size = max(1, size)
+    return [(a, min(a+size, hi)) for a in range(lo, hi, size)]
+#---------------------------------------------------------
+def runChunk(job):
+    func, a, b, args = job
+    return func(a, b, *args)
+#---------------------------------------------------------
+def mapRanges(func, lo, hi, workers, size, *args):
+    '''Generate func(a, b, *args) for successive chunks [a,b) of range
+    [lo,hi), in order.  If workers > 1 and there is more than one
+    chunk, chunks get processed by a pool of that many forked worker
+    processes; func should then be a module-level function (so it can
+    be named to the workers) and it should return its results rather
+    than change data, since changes made in workers are not seen by
+    this process.    '''
+    chunks = chunkRanges(lo, hi, size)
+    if workers > 1 and len(chunks) > 1 and \
+       'fork' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('fork')
+        with ctx.Pool(min(workers, len(chunks))) as pool:
+            yield from pool.imap(runChunk, [(func, a, b, args) for a, b in chunks])
+    else:
+        for a, b in chunks:
+            yield func(a, b, *args)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+'''Tests for addPosts and addCylinders, the bulk-insertion API'''
+
+import unittest
+import os, tempfile
+from array import array
+from pypevue import Point, Post, Layout, FunctionList
+from pypevue.pypevu import setupData
+from base_test import BaseTest
+
+class BulkAdd_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p bulkAdd_test.py
+    '''
+    def setUp(self):
+        ref = FunctionList
+        ref.registrar('')
+        setupData(ref, False)
+        ref.LO = Layout(BP=Point(1,2,3), posts=[], cyls=[], edgeList={})
+
+    def feet(self):
+        return [(p.foot.x, p.foot.y, p.foot.z) for p in FunctionList.LO.posts]
+
+    def test_01_posts(self):
+        print('\nBulk posts from flat, triple, and Point sequences')
+        ref = FunctionList
+        self.assertEqual(ref.addPosts(array('d', [0, 0, 0, 1, 1, 1])), 0)
+        self.assertEqual(ref.addPosts([(5, 5, 5)], relative=False), 2)
+        self.assertEqual(ref.addPosts(p for p in [Point(0, 0, 1)]), 3)
+        ref.generatePosts('C', ['2', '0', '0', '7'], None)
+        self.assertEqual(self.feet(), [(1,2,3), (2,3,4), (5,5,5), (1,2,4), (3,2,3)])
+
+    def test_02_cylinders(self):
+        print('\nBulk cylinders from flat and pair sequences')
+        ref = FunctionList
+        ref.addPosts([0]*12)
+        self.assertEqual(ref.addCylinders([0, 1, 1, 2], colo='R'), 0)
+        self.assertEqual(ref.addCylinders([(0, 1)], thix='q', offset=2), 2)
+        cyls = ref.LO.cyls
+        self.assertEqual([(c.post1, c.post2, c.colo, c.num) for c in cyls],
+                         [(0, 1, 'R', 0), (1, 2, 'R', 1), (2, 3, 'G', 2)])
+        self.assertEqual(cyls[2].diam, ref.thickLet('q'))
+        self.assertEqual(ref.LO.edgeList, {0: [1], 1: [0, 2], 2: [1, 3], 3: [2]})
+
+    def test_03_codes(self):
+        print('\nBulk posts from layout codes L, P, R, T')
+        ref = FunctionList
+        ref.generatePosts('L', ['3', '1', '0', '.5'], None)
+        self.assertEqual(self.feet(), [(1,2,3), (2,2,3.5), (3,2,4)])
+        ref.LO.posts = []
+        ref.generatePosts('P', ['4', '2', '90'], None)
+        self.assertEqual([(round(x, 9), round(y, 9), z) for x, y, z in self.feet()],
+                         [(1,4,3), (-1,2,3), (1,0,3), (3,2,3)])
+        ref.LO.posts = []
+        ref.generatePosts('T', ['3', '2', '1', '2'], None)
+        self.assertEqual(self.feet(), [(1,2,3), (2,2,3), (0.5,4,3), (1.5,4,3),
+                                       (2.5,4,3), (1,6,3), (2,6,3)])
+
+    def test_04_file(self):
+        print('\nPosts from point files via layout code F')
+        ref = FunctionList
+        pts = [0, 0, 0, 1.5, 2, 3, -1, 4, 0.25]
+        want = [(1,2,3), (2.5,4,6), (0,6,3.25)]
+        with tempfile.TemporaryDirectory() as tmp:
+            files = {}
+            for ext, typecode in (('f64', 'd'), ('f32', 'f')):
+                files[ext] = os.path.join(tmp, f'pts.{ext}')
+                with open(files[ext], 'wb') as f:
+                    array(typecode, pts).tofile(f)
+            files['txt'] = os.path.join(tmp, 'pts.txt')
+            with open(files['txt'], 'w') as f:
+                f.write('# x, y, z\n0,0,0\n1.5 2 3\n-1, 4, .25  # last\n')
+            head = b"{'descr': '<f8', 'fortran_order': True, 'shape': (3, 3), }"
+            head += b' '*(-(len(head)+11) % 64) + b'\n'
+            files['npy'] = os.path.join(tmp, 'pts.npy')
+            with open(files['npy'], 'wb') as f:    # Column-major .npy
+                f.write(b'\x93NUMPY\x01\x00' + len(head).to_bytes(2, 'little') + head)
+                array('d', pts[0::3] + pts[1::3] + pts[2::3]).tofile(f)
+            for ext, fn in files.items():
+                ref.LO.posts = []
+                ref.scriptPost(f'F {fn};', Post(0, data=[]))
+                self.assertEqual(self.feet(), want)
+
+    def test_05_glom(self):
+        print('\nFunction names in code U are not read as codes or numbers')
+        ref = FunctionList
+        got = []
+        ref.uDict['f2C'] = lambda *nums: got.append(nums)
+        ref.scriptPost('U f2C 5, 7; U f2C;', Post(0, data=[]))
+        self.assertEqual(got, [(5, 7), ()])
+        self.assertEqual(ref.LO.posts, [])
+
+if __name__ == '__main__':
+    unittest.main()
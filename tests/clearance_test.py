@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+'''Tests for clearance.py, the strut clearance check'''
+
+import unittest
+import random
+from math import sqrt
+from pypevue import Layout, FunctionList
+from pypevue.pypevu import setupData
+from pypevue.clearance import segSegDist2, clearancePairs, checkClearance, layoutClearances
+from base_test import BaseTest
+
+class Clearance_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p clearance_test.py
+    '''
+    def setUp(self):
+        ref = FunctionList
+        ref.registrar('')
+        setupData(ref, False)
+        ref.LO = Layout(posts=[], cyls=[], edgeList={})
+
+    def test_01_segdist(self):
+        print('\nSegment-segment distances')
+        d = lambda *a: round(sqrt(segSegDist2(*a)), 9)
+        self.assertEqual(d((0,0,0), (2,0,0), (1,-1,1), (1,1,1)), 1)  # Crossing
+        self.assertEqual(d((0,0,0), (1,0,0), (3,0,0), (4,0,0)), 2)   # Collinear
+        self.assertEqual(d((0,0,0), (1,0,0), (0,1,0), (1,1,0)), 1)   # Parallel
+        self.assertEqual(d((0,0,0), (0,0,0), (3,4,0), (3,4,0)), 5)   # Points
+
+    def test_02_pairs(self):
+        print('\nBVH pairs match all-pairs test')
+        random.seed(4413)
+        segs = []
+        for k in range(600):
+            p = tuple(random.uniform(0, 20) for i in range(3))
+            segs.append((p, tuple(u + random.uniform(-2, 2) for u in p)))
+        radii = [random.uniform(0.05, 0.2) for s in segs]
+        got = [(j, k) for j, k, gap in clearancePairs(segs, radii, 0.1)]
+        want = [(j, k) for j in range(600) for k in range(j+1, 600)
+                if sqrt(segSegDist2(*segs[j], *segs[k])) - radii[j] - radii[k] < 0.1]
+        self.assertTrue(want)
+        self.assertEqual(got, want)
+
+    def test_03_layout(self):
+        print('\nClearance check colors and drops crossing struts')
+        ref = FunctionList
+        ref.generatePosts('C', '0,0,0, 1,1,0, 1,0,0, 0,1,0, 3,3,0'.split(','), None)
+        for mode, colors in (('color', 'RRR'), ('drop', 'G')):
+            ref.LO.cyls, ref.LO.edgeList = [], {}
+            ref.addCylinders([0, 1, 2, 3, 0, 4], lev1='c', lev2='c')
+            ref.clearCheck = mode
+            checkClearance(ref.LO)
+            self.assertEqual(''.join(c.colo for c in ref.LO.cyls), colors)
+        self.assertEqual(ref.LO.edgeList, {0: [1], 1: [0], 2: [], 3: [], 4: []})
+
+    def test_04_near_end(self):
+        print('\nClearance check reports overlaps within endGap of a strut end')
+        ref = FunctionList
+        # Strut 2-3 passes 0.01 from the end of strut 0-1, where the
+        # struts (each 0.06 thick) overlap by about 0.05
+        ref.generatePosts('C', '0,0,0, 1,0,0, 0.01,-0.5,0.01, 0.01,0.5,0.01'.split(','), None)
+        ref.addCylinders([0, 1, 2, 3], lev1='c', lev2='c')
+        for gap in (0.03, 0.0003):
+            for c in ref.LO.cyls:  c.gap = gap
+            pairs = [(j, k) for j, k, g in layoutClearances(ref.LO) if g < -0.04]
+            self.assertEqual(pairs, [(0, 1)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+'''Tests for grouped cylinder output (cylGroups=t)'''
+
+import unittest
+import io
+from pypevue import Point, Layout, FunctionList
+from pypevue.pypevu import setupData
+from base_test import BaseTest
+
+class Groups_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p groups_test.py
+    '''
+    def setUp(self):
+        ref = FunctionList
+        ref.registrar('')
+        setupData(ref, False)
+        ref.LO = Layout(BP=Point(0,0,0), posts=[], cyls=[], edgeList={})
+
+    def test_01_rounding(self):
+        print('\nGrouped output puts diameters that round alike in one group')
+        ref = FunctionList
+        ref.pDiam, ref.cylGroups = 0.07, True   # 'p' gives 7.000000000000001
+        ref.addPosts([0, 0, 0, 1, 0, 0, 0, 1, 0])
+        ref.addCylinders([0, 1], thix='p')
+        ref.addCylinders([1, 2], thix=7.0)
+        ref.preparePosts()
+        fout = io.StringIO()
+        ref.writeCylinders(fout, 0, len(ref.LO.cyls), False, 3)
+        lines = fout.getvalue().splitlines()
+        self.assertEqual(1, len([l for l in lines if l.startswith('module cyls_G_7p000()')]))
+        self.assertIn('module cyls_G() { cyls_G_7p000(); }', lines)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+'''Tests for halfEdge.py, half-edge meshes and layout code V (duals)'''
+
+import unittest
+from math import sqrt
+from pypevue import FunctionList
+from pypevue.pypevu import setupData
+from pypevue.halfEdge import HalfEdgeMesh, meshFromEdges, layoutMesh
+from pypevue.topology import layoutTopology
+from base_test import BaseTest
+
+class HalfEdge_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p halfEdge_test.py
+    '''
+    def test_01_navigation(self):
+        print('\nHalf-edge navigation on an open strip of two triangles')
+        # Strip 0-1-2, 1-3-2: strut 1-2 is interior, the rest boundary
+        mesh = HalfEdgeMesh(4, [[0, 1, 2], [1, 3, 2]])
+        self.assertEqual(mesh.nFaces(), 2)
+        self.assertEqual(mesh.faceVerts(1), [1, 3, 2])
+        for h in range(6):
+            self.assertEqual(mesh.prev[mesh.nxt[h]], h)
+            self.assertEqual(mesh.face[mesh.nxt[h]], mesh.face[h])
+            t = mesh.twin[h]
+            if t >= 0:
+                self.assertEqual(mesh.twin[t], h)
+                self.assertEqual((mesh.origin[t], mesh.dest(t)), (mesh.dest(h), mesh.origin[h]))
+        self.assertEqual(sum(1 for t in mesh.twin if t >= 0), 2)
+        self.assertEqual([mesh.valence(v) for v in range(4)], [2, 3, 3, 2])
+        self.assertEqual([mesh.dest(h) for h in mesh.vertexEdges(1)], [3, 2])
+        with self.assertRaises(ValueError):
+            HalfEdgeMesh(3, [[0, 1, 2], [0, 1, 2]])
+
+    def test_02_tetrahedron(self):
+        print('\nHalf-edge mesh of a tetrahedron, oriented outward')
+        pts = [(1, 1, 1), (1, -1, -1), (-1, 1, -1), (-1, -1, 1)]
+        mesh = meshFromEdges(pts, [0, 0, 0, 1, 1, 2], [1, 2, 3, 2, 3, 3])
+        self.assertEqual(mesh.nFaces(), 4)
+        self.assertTrue(all(t >= 0 for t in mesh.twin))
+        self.assertEqual([mesh.valence(v) for v in range(4)], [3]*4)
+        for f in range(4):      # Normals point away from the origin
+            a, b, c = (pts[v] for v in mesh.faceVerts(f))
+            u = [b[i]-a[i] for i in range(3)];  w = [c[i]-a[i] for i in range(3)]
+            n = (u[1]*w[2]-u[2]*w[1], u[2]*w[0]-u[0]*w[2], u[0]*w[1]-u[1]*w[0])
+            self.assertGreater(sum(n[i]*(a[i]+b[i]+c[i]) for i in range(3)), 0)
+
+    def test_03_dual(self):
+        print('\nDual of an icosahedron is a dodecahedron, and back')
+        ref = FunctionList
+        ref.registrar('')
+        setupData(ref, False)
+        ref.setClipAndRota(ref)
+        ref.generatePosts('H', ['-9', '-9', '-9', '9', '9', '9'], None)
+        ref.generatePosts('G', ['1', '2'], None)
+        self.assertEqual((len(ref.LO.posts), len(ref.LO.cyls)), (12, 30))
+        ref.generatePosts('V', [], None)
+        LO = ref.LO
+        self.assertEqual((len(LO.posts), len(LO.cyls)), (20, 30))
+        self.assertEqual(sorted(len(LO.edgeList[k]) for k in LO.edgeList), [3]*20)
+        OP = LO.OP
+        rads = [sqrt((p.foot.x-OP.x)**2 + (p.foot.y-OP.y)**2 + (p.foot.z-OP.z)**2)
+                for p in LO.posts]
+        self.assertAlmostEqual(min(rads), max(rads), places=6)
+        self.assertEqual({c.colo for c in LO.cyls}, {ref.geoColors[0]})
+        self.assertEqual(sorted(map(len, LO.faces)), [5]*12)
+        [c] = layoutTopology(LO)['components']
+        self.assertEqual((c['faces'], c['chi'], c['wires']), (12, 2, 0))
+        ref.generatePosts('V', [], None)    # Dual of dual
+        self.assertEqual((len(ref.LO.posts), len(ref.LO.cyls)), (12, 30))
+        self.assertEqual(sorted(map(len, ref.LO.faces)), [3]*20)
+
+    def test_04_mixed(self):
+        print('\nRecorded faces and triangles together')
+        ref = FunctionList
+        ref.registrar('')
+        setupData(ref, False)
+        ref.setClipAndRota(ref)
+        ref.generatePosts('H', ['-9', '-9', '-9', '9', '9', '9'], None)
+        for codes in ('GV', 'VG'):  # Dual kept with geodesic; geodesic after dual
+            ref.LO.posts, ref.LO.cyls, ref.LO.edgeList, ref.LO.faces = [], [], {}, None
+            ref.generatePosts('G', ['2', '1'], None)
+            ref.generatePosts('V', ['1'] if codes == 'GV' else [], None)
+            if codes == 'VG':  ref.generatePosts('G', ['2', '1'], None)
+            got = sorted((c['posts'], c['faces'], c['chi'], c['wires'])
+                         for c in layoutTopology(ref.LO)['components'])
+            self.assertEqual(got, [(42, 80, 2, 0), (80, 42, 2, 0)])
+        mesh, points = layoutMesh(ref.LO)
+        self.assertEqual(mesh.nFaces(), 122)
+        self.assertTrue(all(t >= 0 for t in mesh.twin))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,8 +5,9 @@
 import unittest
 #import shutil
 from pypevue import ssq, sssq, rotate2, isTrue, Point, IcosaGeoPoint
+from pypevue import Layout, FunctionList
 from math import sqrt, degrees, radians, cos, sin, pi
-import os, sys, random
+import os, sys, random, tempfile
 from base_test import BaseTest
 
 class Init_Test(BaseTest):
@@ -77,11 +78,25 @@ class Init_Test(BaseTest):
             self.checkAE(c-b, a)
             self.checkAE(c.diff(a), b)
             self.checkAE(c.diff(b), a)
-            
+
+    def test_04_layouts(self):
+        print('\nLayouts do not share default posts or OP')
+        a, b = Layout(), Layout()
+        self.assertIsNot(a.OP, b.OP)
+        a.posts.append(1);  a.cyls.append(2);  a.edgeList[0] = [1]
+        self.assertEqual((b.posts, b.cyls, b.edgeList), ([], [], {}))
+        from pypevue.pypevu import main
+        with tempfile.TemporaryDirectory() as tmp:
+            script, scad = f'{tmp}/eg-two', f'{tmp}/to-two.scad'
+            with open(script, 'w') as fs:
+                fs.write('=L C 0,0,0, 1,0,0;\n=C Gpcc 0,1;\n')
+            counts = []
+            for k in range(2):
+                main([f'f={script}', f'scadFile={scad}'])
+                counts.append(len(FunctionList.LO.posts))
+        self.assertEqual(counts, [2, 2])
         
     '''
-    def test_04_(self): pass        
-    
     def test_05_(self): pass
         
     def test_06_(self): pass        
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+'''Tests for objMesh.py, the bulk OBJ-file reader'''
+
+import unittest
+import os, tempfile
+from pypevue import FunctionList
+from pypevue import objMesh
+from base_test import BaseTest
+
+objText = '''# Test file
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0 1.0
+g top
+usemtl green
+f 1/1/1 2/2/2 3/3/3 4/4/4
+v 0 0 1
+f 1 2 5
+bogus line
+f -1 -2 -4
+g
+'''
+
+class ObjMesh_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p objMesh_test.py
+    '''
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fn = os.path.join(self.tmp.name, 't.obj')
+        with open(self.fn, 'w') as fout:
+            fout.write(objText)
+        objMesh.memCache.clear()
+        FunctionList.cacheDir = os.path.join(self.tmp.name, 'cache')
+
+    def tearDown(self):
+        FunctionList.cacheDir = ''
+        self.tmp.cleanup()
+
+    def checkMesh(self, m):
+        self.assertEqual(m.nVerts, 5)
+        self.assertEqual(list(m.coords[9:15]), [0, 1, 0, 0, 0, 1])
+        self.assertEqual([m.face(f) for f in range(m.nFaces)],
+                         [[0, 1, 2, 3], [0, 1, 4], [4, 3, 1]])
+        self.assertEqual(m.group, [(0, 'top'), (3, '')])
+        self.assertEqual(m.stuff, [(0, 'green')])
+        self.assertEqual(m.drops, [11])
+        self.assertEqual(m.linesIn, 13)
+
+    def test_01_parse(self):
+        print('\nOBJ parse, line by line and in bulk')
+        for chunk in (7, 1 << 24):   # Chunk size 7 splits lines apart
+            objMesh.chunkBytes = chunk
+            with open(self.fn) as fin:
+                self.checkMesh(objMesh.parseObj(fin))
+        objMesh.chunkBytes = 1 << 24
+
+    def test_02_cache(self):
+        print('\nOBJ parse cache')
+        before = dict(objMesh.stats)
+        m1 = objMesh.readObj(self.fn)
+        m2 = objMesh.readObj(self.fn)
+        self.assertIs(m1, m2)
+        objMesh.memCache.clear()
+        m3 = objMesh.readObj(self.fn)
+        self.checkMesh(m3)
+        self.assertEqual(objMesh.stats['parses'] - before['parses'], 1)
+        self.assertEqual(objMesh.stats['memHits'] - before['memHits'], 1)
+        self.assertEqual(objMesh.stats['diskHits'] - before['diskHits'], 1)
+        self.assertEqual(list(m3.scaled(2).coords[12:15]), [0, 0, 2])
+
+    def test_03_text(self):
+        print('\nOpenSCAD code for OBJ faces')
+        with open(self.fn, 'w') as fout:
+            fout.write('v 1 2 3\nv 5 2 3\nv 1 5 3\nf 1 2 3\n')
+        objMesh.shared['mesh'] = objMesh.readObj(self.fn)
+        self.assertEqual(objMesh.objFatText(0, 1, 3),
+            '// For face [0, 1, 2],  vnorm = 0.0, 0.0, -3.0\npolyhedron(points=[\n'
+            '    [1.0, 2.0, 3.0], [5.0, 2.0, 3.0], [1.0, 5.0, 3.0],\n'
+            '    [1.0, 2.0, 0.0], [5.0, 2.0, 0.0], [1.0, 5.0, 0.0]],\n'
+            'faces=[[0, 1, 2], [3, 4, 5], [2, 0, 3, 5], [0, 1, 4, 3], [1, 2, 5, 4]]);\n\n')
+        self.assertEqual(objMesh.objManyText(0, 1),
+            'polyhedron(points=[\n   [1.0, 2.0, 3.0], [5.0, 2.0, 3.0], [1.0, 5.0, 3.0]],\n'
+            '   faces=[[0, 1, 2]]);\n')
+
+    def test_04_edges(self):
+        print('\nUnique edges of OBJ faces')
+        e1, e2 = objMesh.meshEdges(objMesh.readObj(self.fn))
+        self.assertEqual(list(zip(e1, e2)), [(0,1), (1,2), (2,3), (0,3),
+                                             (1,4), (0,4), (3,4), (1,3)])
+
+    def test_05_clean(self):
+        print('\nOBJ mesh cleanup')
+        with open(self.fn, 'w') as fout:
+            fout.write('v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1e-5 0 0\nv 5 5 5\nv 2 0 0\n'
+                       'f 1 2 3\nf 4 3 2\nf 1 2 6\ng top\nf 1 4 2\nf 2 6 3\n')
+        m, counts = objMesh.cleanMesh(objMesh.readObj(self.fn), 1e-3)
+        self.assertEqual(counts, (1, 2, 1, 1))
+        self.assertEqual(list(m.coords[9:]), [2, 0, 0])
+        self.assertEqual([m.face(f) for f in range(m.nFaces)], [[0, 1, 2], [1, 3, 2]])
+        self.assertEqual(m.group, [(1, 'top')])
+
+if __name__ == '__main__':
+    unittest.main()
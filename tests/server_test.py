@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+'''Tests for server.py, the pypevu render server'''
+
+import unittest
+import os, sys, time, json, socket, tempfile, subprocess
+from pypevue.server import request, serverOptions
+from base_test import BaseTest
+
+class Server_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p server_test.py
+    '''
+    testPath = os.path.dirname(__file__)
+    examplesPath = os.path.normpath(f'{testPath}/../src/pypevue/examples')
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sock = os.path.join(self.tmp.name, 'pv.sock')
+        env = dict(os.environ, PYTHONPATH=os.path.normpath(f'{self.testPath}/../src'))
+        self.proc = subprocess.Popen([sys.executable, '-m', 'pypevue.pypevu', 'serve',
+                                      f'socket={self.sock}', 'workers=2'],
+                                     env=env, stdout=subprocess.DEVNULL)
+        for k in range(100):    # Wait for server to start listening
+            if os.path.exists(self.sock): break
+            time.sleep(0.05)
+
+    def tearDown(self):
+        self.proc.terminate()
+        self.proc.wait()
+        self.tmp.cleanup()
+
+    def test_01_render(self):
+        print('\nRender server requests')
+        with open(f'{self.examplesPath}/eg-pentagon-script') as fin:
+            script = fin.read()
+        with open(f'{self.testPath}/gm-eg-pentagon-script') as fg:
+            golden = fg.readlines()[2:]
+        for k in range(2):      # Workers get reused
+            head, text = request(script, 'SF=100', socket=self.sock)
+            self.assertTrue(head['ok'])
+            self.assertEqual(golden, text.splitlines(True)[2:])
+            self.assertGreaterEqual(head['total'], head['run'])
+        # Two requests in a row on one connection, then a bad one
+        c = socket.socket(socket.AF_UNIX)
+        with c:
+            c.connect(self.sock)
+            r = json.dumps({'script': script}).encode() + b'\n'
+            c.sendall(r + r + b'{}\n')
+            f = c.makefile('rb')
+            for k in range(2):
+                head = json.loads(f.readline())
+                self.assertEqual(golden, f.read(head['bytes']).decode().splitlines(True)[2:])
+            self.assertFalse(json.loads(f.readline())['ok'])
+
+    def test_02_options(self):
+        print('\nRender server options')
+        self.assertEqual(serverOptions(['workers=3'])['workers'], '3')
+        with self.assertRaises(ValueError):
+            serverOptions(['bogus=1'])
+
+    def test_03_side_files(self):
+        print('\nRender server refuses output modes that write side files')
+        script = '=L C 0,0,0; P5,1,0;\n=C Gpae 1,2;;;;1;\n'
+        for params in ('splitOutput=t', 'labelFile=t', 'tileMode=space'):
+            head, text = request(script, params, socket=self.sock)
+            self.assertFalse(head['ok'])
+            self.assertIn(params.split('=')[0], head['error'])
+        head, text = request('=P splitOutput=t\n' + script, socket=self.sock)
+        self.assertFalse(head['ok'])
+        self.assertIn('out-posts.scad', head['error'])
+        head, text = request(script, 'splitOutput=f', socket=self.sock)
+        self.assertTrue(head['ok'])
+
+if __name__ == '__main__':
+    unittest.main()
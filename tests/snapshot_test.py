@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+'''Tests for snapshot.py, binary layout save and load'''
+
+import unittest
+import os, tempfile
+from pypevue import Layout, FunctionList, IcosaGeoPoint
+from pypevue.pypevu import setupData
+from pypevue.snapshot import writeSnapshot, readSnapshot, LazyList
+from pypevue.topology import layoutTopology
+from base_test import BaseTest
+
+class Snapshot_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p snapshot_test.py
+    '''
+    def setUp(self):
+        ref = FunctionList
+        ref.registrar('')
+        setupData(ref, False)
+        ref.setClipAndRota(ref)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fn = os.path.join(self.tmp.name, 'lo.pvl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_01_roundtrip(self):
+        print('\nSnapshot of a geodesic, read with and without mmap')
+        ref = FunctionList
+        ref.generatePosts('G', ['3', '2'], None)
+        ref.LO.posts[4].data = 17
+        ref.LO.instances = [[1, 0, 0, 5, 0, 1, 0, 0, 0, 0, 1, 0]]
+        writeSnapshot(self.fn, ref.LO, {'SF': 42})
+        for useMmap in (True, False):
+            lo, params = readSnapshot(self.fn, useMmap)
+            self.assertEqual(params, {'SF': 42})
+            self.assertEqual(isinstance(lo.posts, LazyList), useMmap)
+            self.assertEqual([(repr(p.foot), p.num, p.data) for p in ref.LO.posts],
+                             [(repr(p.foot), p.num, p.data) for p in lo.posts])
+            f, g = ref.LO.posts[7].foot, lo.posts[7].foot
+            self.assertIsInstance(g, IcosaGeoPoint)
+            self.assertEqual((f.rank, f.face, f.nnbrs, f.dupl), (g.rank, g.face, g.nnbrs, g.dupl))
+            self.assertEqual([str(c) for c in ref.LO.cyls], [str(c) for c in lo.cyls])
+            self.assertEqual(dict(ref.LO.edgeList), dict(lo.edgeList))
+            self.assertEqual(lo.instances, ref.LO.instances)
+            self.assertEqual(repr(lo.clip1), repr(ref.LO.clip1))
+            self.assertIsNone(lo.faces)
+
+    def test_02_lazy(self):
+        print('\nChanges to a mapped snapshot layout persist')
+        ref = FunctionList
+        ref.LO = Layout(posts=[], cyls=[], edgeList={})
+        ref.addPosts([0, 0, 0, 1, 0, 0, 0, 1, 0])
+        ref.addCylinders([0, 1, 1, 2])
+        ref.tileMode, ref.workers = 'color', 3
+        writeSnapshot(self.fn, ref.LO)
+        lo, params = readSnapshot(self.fn)
+        self.assertEqual(params['SF'], ref.SF)
+        self.assertFalse({'tileMode', 'workers', 'splitOutput', 'cacheDir'} & set(params))
+        lo.posts[1].foot.scale(2)
+        lo.edgeList[1].remove(0)
+        lo.edgeList[5] = [0]
+        del lo.edgeList[2]
+        del lo.cyls[0]
+        self.assertEqual(lo.posts[1].foot.x, 2)
+        self.assertEqual(dict(lo.edgeList), {0: [1], 1: [2], 5: [0]})
+        lo.edgeList[2] = [1]        # Put back a deleted key
+        lo.edgeList[2] = [1]
+        self.assertEqual(len(lo.edgeList), 4)
+        self.assertEqual(sorted(lo.edgeList), [0, 1, 2, 5])
+        self.assertEqual([(c.post1, c.post2) for c in lo.cyls], [(1, 2)])
+
+    def test_03_faces(self):
+        print('\nSnapshot of a dual keeps its recorded faces')
+        ref = FunctionList
+        ref.generatePosts('H', ['-9', '-9', '-9', '9', '9', '9'], None)
+        ref.generatePosts('G', ['2', '1'], None)
+        ref.generatePosts('V', [], None)
+        writeSnapshot(self.fn, ref.LO)
+        for useMmap in (True, False):
+            lo, params = readSnapshot(self.fn, useMmap)
+            self.assertEqual(lo.faces, ref.LO.faces)
+            [c] = layoutTopology(lo)['components']
+            self.assertEqual((c['faces'], c['chi'], c['wires']), (42, 2, 0))
+
+if __name__ == '__main__':
+    unittest.main()
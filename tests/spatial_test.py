@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+'''Tests for spatial.py and for layout operations that use it'''
+
+import unittest
+import random
+from pypevue import Point, Post, Cylinder, Layout, FunctionList
+from pypevue.spatial import weldPoints
+from pypevue.baseFuncs import mergePosts
+from base_test import BaseTest
+
+class Spatial_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p spatial_test.py
+    '''
+    def test_01_weld(self):
+        print('\nweldPoints test')
+        random.seed(2711)
+        base = [random.uniform(-5, 5) for i in range(300)] # 100 points
+        # Append jittered copies of every other point
+        coords = base[:]
+        for k in range(0, 100, 2):
+            coords += [u + random.uniform(-1e-4, 1e-4) for u in base[3*k:3*k+3]]
+        remap, reps = weldPoints(coords, 1e-3)
+        self.assertEqual(reps, list(range(100)))
+        for j, k in enumerate(range(0, 100, 2)):
+            self.assertEqual(remap[100+j], k)
+
+    def test_02_merge(self):
+        print('\nmergePosts test')
+        FunctionList.registrar('')
+        lo = Layout(posts=[], cyls=[], edgeList={})
+        for x, y, z in ((0,0,0), (1,0,0), (0,1,0), (1,0,1e-6), (0,1,0)):
+            lo.posts.append(Post(Point(x,y,z)))
+        for p1, p2, l1, l2 in ((0,1,'c','c'), (0,3,'c','c'), (3,0,'c','c'),
+                               (1,3,'c','c'), (1,3,'a','e'), (2,4,'c','c'),
+                               (1,2,'c','c')):
+            lo.cyls.append(Cylinder(p1, p2, l1, l2, 'G', 1.0, 0, 0, 0))
+            FunctionList.addEdges(p1, p2, lo)
+        self.assertEqual(mergePosts(lo, 0.001), (2, 2, 2))
+        self.assertEqual(len(lo.posts), 3)
+        self.assertEqual([(c.post1, c.post2) for c in lo.cyls],
+                         [(0,1), (1,1), (1,2)])
+        self.assertEqual(sorted(lo.edgeList[1]), [0, 2])
+
+if __name__ == '__main__':
+    unittest.main()
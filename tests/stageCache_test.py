@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+'''Tests for stageCache.py, the on-disk cache of pipeline stages'''
+
+import unittest
+import os, io, tempfile, time
+from array import array
+from pypevue import FunctionList, Point, Layout
+from pypevue import stageCache
+from pypevue.makeIcosaGeo import genIcosahedron, cachedIcosahedron
+from pypevue.pypevu import setupData
+from base_test import BaseTest
+
+class StageCache_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p stageCache_test.py
+    '''
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        FunctionList.registrar('')
+        setupData(FunctionList, False)
+        FunctionList.cacheDir = self.tmp.name
+        FunctionList.cacheMax = 0
+
+    def tearDown(self):
+        FunctionList.cacheDir = ''
+        self.tmp.cleanup()
+
+    def test_01_store(self):
+        print('\nStage cache store, load, and keys')
+        key = stageCache.stageKey('t', 1, 2.5, array('d', [1, 2]))
+        self.assertNotEqual(key, stageCache.stageKey('t', 2, 2.5, array('d', [1, 2])))
+        self.assertNotEqual(key, stageCache.stageKey('t', 1, 2.5, array('d', [1, 3])))
+        before = dict(stageCache.stats)
+        self.assertIsNone(stageCache.load('t', key))
+        stageCache.store('t', key, {'n': 2}, {'a': array('d', [1.5, 2]), 'b': array('q', [7])})
+        meta, arrays = stageCache.load('t', key)
+        self.assertEqual(meta, {'n': 2})
+        self.assertEqual(arrays, {'a': array('d', [1.5, 2]), 'b': array('q', [7])})
+        self.assertEqual(stageCache.stats['hits'] - before['hits'], 1)
+        self.assertEqual(stageCache.stats['misses'] - before['misses'], 1)
+
+    def test_02_evict(self):
+        print('\nStage cache LRU eviction')
+        big = {'a': array('d', bytes(400000))}      # 400KB per entry
+        for k in range(3):
+            stageCache.store('t', f'{k}', {}, big)
+            time.sleep(0.01)
+        stageCache.load('t', '0')                   # Makes entry 1 oldest
+        FunctionList.cacheMax = 1.2                 # 1.2 MB holds 3 entries
+        stageCache.store('t', '3', {}, big)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)),
+                         ['t-0.pvc', 't-2.pvc', 't-3.pvc'])
+
+    def test_03_icosa(self):
+        print('\nCached geodesic points and edges')
+        c1, c2 = Point(-2, -2, -0.01), Point(2, 2, 2)
+        plain = Layout(posts=[], cyls=[], edgeList={})
+        genIcosahedron(plain, 4, c1, c2, 58.28, 0)
+        for k in range(2):      # Once to store, once from cache
+            lo = Layout(posts=[], cyls=[], edgeList={})
+            cachedIcosahedron(lo, 4, c1, c2, 58.28, 0)
+            self.assertEqual([repr(p) for p in plain.posts], [repr(p) for p in lo.posts])
+            self.assertEqual(plain.edgeList, lo.edgeList)
+
+    def test_04_auto(self):
+        print('\nCached autoAdder edges, used without nearby')
+        from pypevue.examples import autoAdder3e
+        ref = FunctionList
+        ref.LO = Layout(BP=Point(0,0,0), posts=[], cyls=[], edgeList={})
+        ref.addPosts([0,0,0, 1,0,0, 0,1,0, 1,1,0])
+        feet = array('d', [0,0,0, 100,0,0, 0,100,0, 100,100,0])  # Scaled by SF
+        key = stageCache.stageKey('auto3e', autoAdder3e.autoVersion, feet)
+        stageCache.store('auto3e', key, {}, {'edges': array('q', [1, 2, 6, 7, 11])})
+        ref.addEdges(0, 1, ref.LO)
+        ref.preparePosts()
+        fout = io.StringIO()
+        autoAdder3e.autoAdder(fout)
+        self.assertEqual([(c.post1, c.post2) for c in ref.LO.cyls],
+                         [(0, 2), (1, 2), (1, 3), (2, 3)])
+        self.assertEqual(fout.getvalue().count('oneCyl ('), 4)
+        key = stageCache.stageKey('auto3e', autoAdder3e.autoVersion + 1, feet)
+        self.assertIsNone(stageCache.load('auto3e', key))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+'''Tests for struts.py, strut classes and cut lists'''
+
+import unittest
+from pypevue import Point, Layout, FunctionList
+from pypevue.makeIcosaGeo import genIcosahedron
+from pypevue import struts
+from base_test import BaseTest
+
+class Struts_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p struts_test.py
+    '''
+    def test_01_classes(self):
+        print('\nStrut classes by length')
+        pts = [Point(0,0,0), Point(1,0,0), Point(1,1,0), Point(0,1,0)]
+        ends1, ends2 = [0, 1, 2, 3, 0], [1, 2, 3, 0, 2]
+        lengths = struts.strutLengths(pts, ends1, ends2)
+        lengths[1] += 1e-6      # Within tolerance of the others
+        classOf, classes = struts.strutClasses(lengths, 1e-4)
+        self.assertEqual(classOf, [0, 0, 0, 0, 1])
+        self.assertEqual([n for L, n in classes], [4, 1])
+        self.assertAlmostEqual(classes[1][0], 2**0.5)
+        self.assertEqual(struts.valenceCounts(ends1, ends2), {2: 2, 3: 2})
+
+    def test_02_names(self):
+        print('\nStrut class names')
+        self.assertEqual([struts.className(c) for c in (0, 25, 26, 27, 701, 702)],
+                         ['A', 'Z', 'AA', 'AB', 'ZZ', 'AAA'])
+
+    def test_03_hubAngles(self):
+        print('\nHub angles in bulk')
+        FunctionList.registrar('')
+        lo = Layout(posts=[], cyls=[], edgeList={})
+        genIcosahedron(lo, 4, Point(-2,-2,-0.01), Point(2,2,2), 58.28, 0)
+        pts = lo.posts
+        table = struts.hubAngles(pts, lo.edgeList)
+        self.assertEqual(len(table[0]), sum(len(v) for v in lo.edgeList.values()))
+        for j, k, nut, prec in zip(*table):
+            self.assertAlmostEqual(nut, pts[j].nutation(pts[k]), places=5)
+            self.assertAlmostEqual(prec, pts[j].precession(pts[k]), places=5)
+        csv = struts.hubAnglesCSV(([0], [1], [-45], [90])).split('\n')
+        self.assertEqual(csv[:2], ['hub,nbr,nutation,precession', '0,1,-45.0000,90.0000'])
+
+if __name__ == '__main__':
+    unittest.main()
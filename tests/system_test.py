@@ -75,6 +75,223 @@ class SystemTest(BaseTest):
                             self.assertEqual(tline, gline)
 
 
+    def test_draft(self):
+        '''Check that a draft file leaves the main output unchanged'''
+        print (f'\nTest draftFile output')
+        scriptPath = os.path.normpath(f'{self.examplesPath}/eg-pentagon-script')
+        scadf = os.path.normpath(f'{self.scadPath}/to-eg-pentagon-script')
+        draft = os.path.normpath(f'{self.scadPath}/to-draft-pentagon')
+        err = os.system(f'{self.pypePath}/pypevu.py f={scriptPath} draftFile={draft} lodLabels=4; mv pypevu.scad {scadf}')
+        self.assertEqual(0, err)
+        with open(f'{self.testPath}/gm-eg-pentagon-script') as fg:
+            with open(scadf) as ft:
+                self.assertEqual(fg.readlines()[2:], ft.readlines()[2:])
+        with open(draft) as fd:
+            dlines = fd.readlines()
+        self.assertIn('module oneCyl(diam, cylLen, rota, trans, colo, fn)\n', dlines)
+        self.assertEqual(4, len([l for l in dlines if l.startswith('  oneLabel(')]))
+
+    def test_workers(self):
+        '''Check that output made by worker processes matches sequential'''
+        print (f'\nTest output made in chunks by worker processes')
+        scriptPath = os.path.normpath(f'{self.examplesPath}/eg-geo-6c')
+        scadf = os.path.normpath(f'{self.scadPath}/to-workers-geo-6c')
+        err = os.system(f'{self.pypePath}/pypevu.py f={scriptPath} workers=3 chunkSize=400; mv pypevu.scad {scadf}')
+        self.assertEqual(0, err)
+        with open(f'{self.testPath}/gm-eg-geo-6c') as fg:
+            with open(scadf) as ft:
+                self.assertEqual(fg.readlines()[2:], ft.readlines()[2:])
+
+    def test_stream(self):
+        '''Check that output with cylinders spooled to a file matches'''
+        print (f'\nTest streaming output')
+        scriptPath = os.path.normpath(f'{self.examplesPath}/eg-geo-6c')
+        scadf = os.path.normpath(f'{self.scadPath}/to-stream-geo-6c')
+        err = os.system(f'{self.pypePath}/pypevu.py f={scriptPath} stream=t workers=3 chunkSize=400; mv pypevu.scad {scadf}')
+        self.assertEqual(0, err)
+        with open(f'{self.testPath}/gm-eg-geo-6c') as fg:
+            with open(scadf) as ft:
+                self.assertEqual(fg.readlines()[2:], ft.readlines()[2:])
+
+    def test_stream_edits(self):
+        '''Check that D and E codes work on spooled cylinders'''
+        print (f'\nTest D and E codes with streaming')
+        scriptPath = os.path.normpath(f'{self.scadPath}/eg-stream-edits')
+        with open(scriptPath, 'w') as fs:
+            fs.write('=L H 2 2 2 -2 -2 -.4; G 4 1; E 57,58; D 78 97 98; E 41,60 61,41 60,61;\n')
+        outs = []
+        for opt in ('', 'stream=t chunkSize=100'):
+            scadf = os.path.normpath(f'{self.scadPath}/to-stream-edits{len(outs)}')
+            err = os.system(f'{self.pypePath}/pypevu.py f={scriptPath} {opt}; mv pypevu.scad {scadf}')
+            self.assertEqual(0, err)
+            with open(scadf) as ft:
+                outs.append(ft.readlines()[2:])
+        self.assertEqual(outs[0], outs[1])
+        self.assertTrue(any(l.startswith('  oneCyl (') for l in outs[0]))
+
+    def test_tiles(self):
+        '''Check that tiles hold the same items as plain output, and that
+        unchanged tiles are not rewritten'''
+        print (f'\nTest tiled output')
+        scriptPath = os.path.normpath(f'{self.examplesPath}/eg-geo-6c')
+        scadf = os.path.normpath(f'{self.scadPath}/to-tiles-geo-6c.scad')
+        cmd = f'{self.pypePath}/pypevu.py f={scriptPath} scadFile={scadf} tileMode=space tileDiv=2'
+        self.assertEqual(0, os.system(cmd))
+        tiles = [f'{scadf[:-5]}-tile-x{i}y{j}.scad' for i in (0,1) for j in (0,1)]
+        items = []
+        for fn in tiles:
+            with open(fn) as ft:
+                items += [l for l in ft if l.startswith('  one')]
+        with open(f'{self.testPath}/gm-eg-geo-6c') as fg:
+            self.assertEqual(sorted(l for l in fg if l.startswith('  one')), sorted(items))
+        times = [os.stat(fn).st_mtime_ns for fn in tiles]
+        self.assertEqual(0, os.system(cmd))
+        self.assertEqual(times, [os.stat(fn).st_mtime_ns for fn in tiles])
+
+    def test_tiles_hook(self):
+        '''Check that color tiles follow a hookCylRecords that filters
+        cylinders'''
+        print (f'\nTest color tiles with a filtering hook')
+        with open(f'{self.scadPath}/dropYellow.py', 'w') as fp:
+            fp.write("def hookCylRecords(cyls): return [c for c in cyls if c.colo != 'Y']\n"
+                     "def tell(): return (hookCylRecords,)\n")
+        scriptPath = os.path.normpath(f'{self.scadPath}/eg-tiles-hook')
+        with open(f'{self.examplesPath}/eg-geo-6c') as fin, open(scriptPath, 'w') as fs:
+            fs.write('=P Plugins=dropYellow\n' + fin.read())
+        scadf = os.path.normpath(f'{self.scadPath}/to-tiles-hook-geo-6c.scad')
+        for fn in os.listdir(self.scadPath):    # Clear tiles of earlier runs
+            if fn.startswith('to-tiles-hook-geo-6c-tile-'):
+                os.remove(f'{self.scadPath}/{fn}')
+        path = os.pathsep.join([self.scadPath] + sys.path)   # So the plugin can be found
+        cmd = f'PYTHONPATH={path} {self.pypePath}/pypevu.py f={scriptPath} scadFile={scadf} tileMode=color'
+        self.assertEqual(0, os.system(cmd))
+        names = {'cG': '"Green"', 'cR': '"Red"', 'cB': '"Blue"', 'cC': '"Cyan"',
+                 'cM': '"Magenta"', 'cA': '"Coral"', 'cP': '[.5,0,.5]'}
+        items = []
+        for name, color in names.items():
+            with open(f'{scadf[:-5]}-tile-{name}.scad') as ft:
+                lines = [l for l in ft if l.startswith('  oneCyl')]
+            self.assertTrue(lines)
+            self.assertTrue(all(l.endswith(f'{color});\n') for l in lines))
+            items += lines
+        self.assertFalse(os.path.exists(f'{scadf[:-5]}-tile-cY.scad'))
+        with open(f'{self.testPath}/gm-eg-geo-6c') as fg:
+            want = [l for l in fg if l.startswith('  oneCyl') and '"Yellow"' not in l]
+        self.assertEqual(sorted(want), sorted(items))
+
+    def test_instances(self):
+        '''Check that copy codes write the layout once, plus a
+        multmatrix line per copy'''
+        print (f'\nTest copy codes A, M, Q')
+        scriptPath = os.path.normpath(f'{self.scadPath}/eg-instances')
+        scadf = os.path.normpath(f'{self.scadPath}/to-instances')
+        with open(scriptPath, 'w') as fs:
+            fs.write('=L C 0,0,0, 1,0,0; B 5,0,0; Q 3, 0,0,1; M 0,1,0; A 2, 0,0,3;\n=C Gpcc 0,1;\n')
+        err = os.system(f'{self.pypePath}/pypevu.py f={scriptPath}; mv pypevu.scad {scadf}')
+        self.assertEqual(0, err)
+        with open(scadf) as ft:
+            lines = ft.readlines()
+        self.assertEqual(1, len([l for l in lines if l.startswith('  oneCyl (')]))
+        mats = [l for l in lines if l.startswith('multmatrix(')]
+        self.assertEqual(12, len(mats))
+        self.assertIn('multmatrix([[-0.5, 0.866025, 0.0, 750.0], [0.866025, 0.5, 0.0, -433.012702], [0.0, 0.0, 1.0, 300.0], [0, 0, 0, 1]]) makeInstance();\n', mats)
+
+    def test_no_copies(self):
+        '''Check that code A with a count below 1 makes no copies and
+        reports an anomaly'''
+        print (f'\nTest copy code A with bad counts')
+        scriptPath = os.path.normpath(f'{self.scadPath}/eg-no-copies')
+        scadf = os.path.normpath(f'{self.scadPath}/to-no-copies.scad')
+        with open(scriptPath, 'w') as fs:
+            fs.write('=L C 0,0,0, 1,0,0; A 0, 0,0,3; A -2, 1,0,0;\n=C Gpcc 0,1;\n')
+        with os.popen(f'{self.pypePath}/pypevu.py f={scriptPath} scadFile={scadf}') as fp:
+            out = fp.read()
+        self.assertEqual(2, out.count('Anomaly: code A'))
+        with open(scadf) as ft:
+            self.assertEqual([], [l for l in ft if l.startswith('multmatrix(')])
+
+    def test_split(self):
+        '''Check that module files hold the same items as plain output,
+        and that only changed module files get rewritten'''
+        print (f'\nTest split output')
+        scriptPath = os.path.normpath(f'{self.examplesPath}/eg-geo-6c')
+        scadf = os.path.normpath(f'{self.scadPath}/to-split-geo-6c.scad')
+        cmd = f'{self.pypePath}/pypevu.py f={scriptPath} scadFile={scadf} splitOutput=t'
+        self.assertEqual(0, os.system(cmd))
+        parts = [f'{scadf[:-5]}-{name}.scad' for name in ('posts', 'labels', 'cylinders')]
+        items = []
+        for fn in parts:
+            with open(fn) as ft:
+                items += [l for l in ft if l.startswith('  one')]
+        with open(f'{self.testPath}/gm-eg-geo-6c') as fg:
+            self.assertEqual([l for l in fg if l.startswith('  one')], items)
+        times = [os.stat(fn).st_mtime_ns for fn in parts]
+        self.assertEqual(0, os.system(f'{cmd} pDiam=.08'))
+        newTimes = [os.stat(fn).st_mtime_ns for fn in parts]
+        self.assertEqual(times[:2], newTimes[:2])
+        self.assertNotEqual(times[2], newTimes[2])
+
+    def test_labels(self):
+        '''Check that a label subset in a label file matches the same
+        labels in plain output, and that makeLabels can turn them off'''
+        print (f'\nTest label subsets and label file')
+        scriptPath = os.path.normpath(f'{self.examplesPath}/eg-cap-5')
+        scadf = os.path.normpath(f'{self.scadPath}/to-label-cap-5.scad')
+        cmd = f'{self.pypePath}/pypevu.py f={scriptPath} scadFile={scadf} labelPosts=2-9,20 labelEvery=2 labelFile=t'
+        self.assertEqual(0, os.system(cmd))
+        with open(f'{scadf[:-5]}-labeltext.scad') as ft:
+            labels = [l for l in ft if l.startswith('  oneLabel')]
+        with open(f'{self.testPath}/gm-eg-cap-5') as fg:
+            want = [l for l in fg if l.startswith('  oneLabel')]
+        self.assertEqual([want[k] for k in (2, 4, 6, 8)], labels)
+        with open(scadf) as fs:
+            self.assertIn('if (showLabels) allLabels();', fs.read())
+
+    def test_label_ranks(self):
+        '''Check that labelRanks labels geodesic posts of given ranks,
+        and all posts that have no rank'''
+        print (f'\nTest labels by rank')
+        scriptPath = os.path.normpath(f'{self.scadPath}/eg-label-ranks')
+        scadf = os.path.normpath(f'{self.scadPath}/to-label-ranks.scad')
+        with open(scriptPath, 'w') as fs:
+            fs.write('=L G 3 1;  C 5,5,0;\n')
+        for ranks, want in (('0-1', 1+5+1), ('1,3', 5+15+1), ('', 47)):
+            cmd = f'{self.pypePath}/pypevu.py f={scriptPath} scadFile={scadf} labelRanks={ranks}'
+            self.assertEqual(0, os.system(cmd))
+            with open(scadf) as fs:
+                self.assertEqual(want, len([l for l in fs if l.startswith('  oneLabel')]))
+
+    def test_snapshot(self):
+        '''Check that output from a saved layout matches the original'''
+        print (f'\nTest layout snapshot')
+        scriptPath = os.path.normpath(f'{self.examplesPath}/eg-freq-6-woven-norm')
+        snap = os.path.normpath(f'{self.scadPath}/woven.pvl')
+        scadf = os.path.normpath(f'{self.scadPath}/to-snap-freq-6-woven.scad')
+        cmd = f'{self.pypePath}/pypevu.py f={scriptPath} saveLayout={snap}'
+        self.assertEqual(0, os.system(f'{cmd} scadFile={scadf}.1'))
+        self.assertEqual(0, os.system(f'{self.pypePath}/pypevu.py f={scriptPath} loadLayout={snap} scadFile={scadf}'))
+        with open(f'{self.testPath}/gm-eg-freq-6-woven-norm') as fg:
+            with open(scadf) as ft:
+                self.assertEqual(fg.readlines()[2:], ft.readlines()[2:])
+
+    def test_groups(self):
+        '''Check that grouped output has the same cylinders, in color
+        groups, and the same labels'''
+        print (f'\nTest cylinders grouped by color')
+        scriptPath = os.path.normpath(f'{self.examplesPath}/eg-cap-5')
+        scadf = os.path.normpath(f'{self.scadPath}/to-group-cap-5.scad')
+        self.assertEqual(0, os.system(f'{self.pypePath}/pypevu.py f={scriptPath} scadFile={scadf} cylGroups=t'))
+        with open(f'{self.testPath}/gm-eg-cap-5') as fg:
+            gm = fg.readlines()
+        with open(scadf) as ft:
+            out = ft.readlines()
+        want = sorted(l.replace('oneCyl', 'bareCyl').rsplit(',', 1)[0] + ');\n'
+                      for l in gm if l.startswith('  oneCyl'))
+        self.assertEqual(want, sorted(l for l in out if l.startswith('  bareCyl')))
+        self.assertEqual([l for l in gm if l.startswith('  oneLabel')],
+                         [l for l in out if l.startswith('  oneLabel')])
+        self.assertIn('module cyls_G_6p000() color(c="Green") {\n', out)
+
     def test_aap(self):     self.doRegexGroup('arith|auto|pentagon')
     def test_fts(self):     self.doRegexGroup('fat|two|several')
     def test_cap(self):     self.doRegexGroup('cap')
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+'''Tests for terrain.py, the terrain point-cloud generator'''
+
+import unittest
+from pypevue import Point, Layout, FunctionList
+from pypevue import terrain
+from base_test import BaseTest
+
+class Terrain_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p terrain_test.py
+    '''
+    def test_01_terrain(self):
+        print('\nTerrain points')
+        zc, scell = terrain.sampleCurves(12, 10, [(2, 1.5, 0, 1)])
+        self.assertEqual((scell, sum(zc)), (33, 288))
+        # Same points as the old eg-zrough3e.py gave for `12 2 1.5 0 1 3`
+        c = terrain.makeTerrain(12, 10, [(2, 1.5, 0, 1)], 3)
+        self.assertEqual(len(c), 3*114)
+        self.assertEqual(c[:9], [8, 8, 1, 8, 10, 0, 8, 11, 1])
+        c = terrain.makeTerrain(12, 10, [(2, 1.5, 0, 1)], 3, 'box')
+        self.assertEqual(c[:9], [10, 11, 0, 10, 12, 1, 11, 11, 1])
+
+    def test_02_zrough(self):
+        print('\nTerrain posts in layout')
+        FunctionList.registrar('')
+        FunctionList.LO = Layout(BP=Point(1,2,3), posts=[], cyls=[], edgeList={})
+        self.assertEqual(terrain.zrough(12, 2, 1.5, 0, 1, 3), 114)
+        foot = FunctionList.LO.posts[0].foot
+        self.assertEqual((foot.x, foot.y, foot.z), (9, 10, 4))
+
+if __name__ == '__main__':
+    unittest.main()
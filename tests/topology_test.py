@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+'''Tests for topology.py, the layout topology report'''
+
+import unittest
+from pypevue import FunctionList
+from pypevue.pypevu import setupData
+from pypevue.topology import graphTopology, layoutTopology, topologyProblems
+from base_test import BaseTest
+
+class Topology_Test(BaseTest):
+    '''to run:
+      - cd pypeVue   (The project dir, not pypeVue/src/pypeVue)
+      - to run just this test:
+           python3 -m unittest discover tests -p topology_test.py
+    '''
+    def test_01_graphs(self):
+        print('\nTopology of tetrahedron, open strip, and wire')
+        # Tetrahedron 0-3 (with a duplicate edge), strip 4-7 of two
+        # triangles, wire 8-9-10, and lone post 11
+        ends1 = [0, 0, 0, 1, 1, 2, 1,   4, 5, 4, 5, 6,   8, 9]
+        ends2 = [1, 2, 3, 2, 3, 3, 0,   5, 6, 6, 7, 7,   9, 10]
+        topo = graphTopology(12, ends1, ends2)
+        self.assertEqual(topo['struts'], 13)
+        self.assertEqual(topo['duplicates'], 1)
+        self.assertEqual(topo['valences'], {0: 1, 1: 2, 2: 3, 3: 6})
+        got = [(c['first'], c['posts'], c['struts'], c['faces'], c['loops'], c['chi'])
+               for c in topo['components']]
+        self.assertEqual(got, [(0, 4, 6, 4, 0, 2), (4, 4, 5, 2, 1, 1),
+                               (8, 3, 2, 0, 0, 1), (11, 1, 0, 0, 0, 1)])
+        self.assertEqual(topologyProblems(topo), ['1 duplicate cylinders'])
+
+    def test_02_dome(self):
+        print('\nTopology of a geodesic cap')
+        ref = FunctionList
+        ref.registrar('')
+        setupData(ref, False)
+        ref.setClipAndRota(ref)
+        ref.generatePosts('G', ['3', '2'], None)
+        topo = layoutTopology(ref.LO)
+        [c] = topo['components']
+        self.assertEqual((c['chi'], c['loops'], c['wires']), (1, 1, 0))
+        self.assertEqual(topologyProblems(topo), [])
+
+if __name__ == '__main__':
+    unittest.main()